@@ -1,7 +1,9 @@
 import networkx as nx
 import pytest
 
-from src.algorithms.edge_weights import calculate_spc, calculate_splc_fast, calculate_splc, calculate_splc_optimized
+from src.algorithms.csr import from_networkx
+from src.algorithms.edge_weights import calculate_spc, calculate_splc_fast, calculate_splc, calculate_splc_optimized, \
+    calculate_splc_array
 from src.algorithms.dag import get_syncs, get_sources
 
 
@@ -47,3 +49,12 @@ def test_calc_splc_optimized(benchmark, di_G):
     @benchmark
     def splc_fast():
         calculate_splc_optimized(di_G.G, di_G.syncs)
+
+
+@pytest.mark.benchmark(group="SPLC")
+def test_calc_splc_array(benchmark, di_G):
+    csr = from_networkx(di_G.G)
+
+    @benchmark
+    def splc_array():
+        calculate_splc_array(csr)
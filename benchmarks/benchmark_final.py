@@ -1,11 +1,11 @@
 # pytest --benchmark-timer=time.process_time --benchmark-save=final --benchmark-warmup=OFF --benchmark-warmup-iterations=0 --benchmark-min-rounds=1 --benchmark-save-data --benchmark-verbose benchmarks/benchmark_final.py
-import networkx as nx
-import pandas as pd
 import pytest
-from src.algorithms.edge_weights import calculate_splc_optimized
+from src.algorithms.csr import from_networkx, topological_levels
+from src.algorithms.edge_weights import calculate_splc_optimized, calculate_splc_array
 from src.algorithms.dag import get_syncs
-from src.algorithms.paths import main_path
+from src.algorithms.paths import main_path, main_path_array
 from utils.loading import get_file
+from utils.snapshot import load_snapshot
 
 
 class HugeGraph:
@@ -13,38 +13,17 @@ class HugeGraph:
         file_dir = 'benchmarks/data/input/'
         file_name = '392k_nodes_642k_edges_without_cycles.csv'
         file_path = get_file(file_dir, file_name)
-        data = pd.read_csv(file_path)
-        self.G1 = nx.from_pandas_edgelist(
-            data,
-            source='Source',
-            target='Target',
-            create_using=nx.DiGraph(),
-            edge_attr=["pln_date"]
-        )
+        self.G1 = load_snapshot(file_path).to_networkx(node_dates=False)
         self.syncs = get_syncs(self.G1)
 
         file_name = '844k_nodes_1.6m_edges_without_cycles.csv'
         file_path = get_file(file_dir, file_name)
-        data = pd.read_csv(file_path)
-        self.G2 = nx.from_pandas_edgelist(
-            data,
-            source='Source',
-            target='Target',
-            create_using=nx.DiGraph(),
-            edge_attr=["pln_date"]
-        )
+        self.G2 = load_snapshot(file_path).to_networkx(node_dates=False)
         self.syncs2 = get_syncs(self.G2)
 
         file_name = 'gigante_without_cycles.csv'
         file_path = get_file(file_dir, file_name)
-        data = pd.read_csv(file_path)
-        self.G3 = nx.from_pandas_edgelist(
-            data,
-            source='Source',
-            target='Target',
-            create_using=nx.DiGraph(),
-            edge_attr=["pln_date"]
-        )
+        self.G3 = load_snapshot(file_path).to_networkx(node_dates=False)
         self.syncs3 = get_syncs(self.G3)
 
 
@@ -72,3 +51,13 @@ def test_main_path_f3(benchmark, di_G):
     def file1_844n_1me():
         calculate_splc_optimized(di_G.G3, di_G.syncs3)
         main_path(di_G.G3)
+
+
+def test_main_path_arrays_f3(benchmark, di_G):
+    csr = from_networkx(di_G.G3)
+
+    @benchmark
+    def file1_844n_1me_arrays():
+        levels = topological_levels(csr)
+        splc = calculate_splc_array(csr, levels=levels)
+        main_path_array(csr, splc, levels)
@@ -1,10 +1,9 @@
-import networkx as nx
-import pandas as pd
 import pytest
 
 from src.algorithms.edge_weights import calculate_splc_optimized
 from src.algorithms.dag import get_syncs
 from utils.loading import get_file
+from utils.snapshot import load_snapshot
 
 
 class HugeGraph:
@@ -12,26 +11,12 @@ class HugeGraph:
         file_dir = 'benchmarks/data/input/'
         file_name = '392k_nodes_642k_edges_without_cycles.csv'
         file_path = get_file(file_dir, file_name)
-        data = pd.read_csv(file_path)
-        self.G = nx.from_pandas_edgelist(
-            data,
-            source='Source',
-            target='Target',
-            create_using=nx.DiGraph(),
-            edge_attr=["pln_date"]
-        )
+        self.G = load_snapshot(file_path).to_networkx(node_dates=False)
         self.syncs = get_syncs(self.G)
 
         file_name = '844k_nodes_1.6m_edges_without_cycles.csv'
         file_path = get_file(file_dir, file_name)
-        data = pd.read_csv(file_path)
-        self.G1 = nx.from_pandas_edgelist(
-            data,
-            source='Source',
-            target='Target',
-            create_using=nx.DiGraph(),
-            edge_attr=["pln_date"]
-        )
+        self.G1 = load_snapshot(file_path).to_networkx(node_dates=False)
         self.syncs1 = get_syncs(self.G1)
 
 
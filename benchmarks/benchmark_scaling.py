@@ -0,0 +1,197 @@
+# python benchmarks/benchmark_scaling.py --max-edges 1000000 --output scaling.json
+# pytest --benchmark-verbose benchmarks/benchmark_scaling.py
+"""
+Scaling benchmark of the Main Path Analysis stages on synthetic citation graphs.
+
+Every stage runs at each size, from 10k to 10M edges, and its wall time and
+peak traced memory are fitted to `a * edges ** k`. The exponent `k` of each
+stage is reported, so a stage growing super-linearly shows up at the small
+sizes already, without the large input files.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.algorithms.dag import date_levels
+from src.algorithms.edge_weights import calculate_splc_array
+from src.algorithms.instrumentation import record
+from src.algorithms.paths import main_path_array
+from utils.generators import random_citation_edges
+from utils.loading import load_edge_list, remove_edge_anomalies, remove_edge_cycles
+
+SIZES = (10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+REFERENCES = 4.0
+CYCLE_RATE = 0.001
+# A stage is skipped once its time at the next size is expected above this.
+TIME_BUDGET = 600.0
+
+
+def write_citation_csv(path, n_edges, seed=0, references=REFERENCES, cycle_rate=CYCLE_RATE):
+    """Writes a random citation graph with about `n_edges` edges, `cycle_rate`
+    of them closing a cycle, to the .csv file `path`."""
+    heads, tails, years = random_citation_edges(int(n_edges / references), references, sink_fraction=0.1,
+                                                n_cycles=int(n_edges * cycle_rate), seed=seed)
+    pd.DataFrame({"Source": heads, "Target": tails, "pln_date": years[heads]}).to_csv(path, index=False)
+
+
+def _stages(path, cycles=("scc",)):
+    """Yields the name and the function of every stage, each one taking the
+    output of the previous ones.
+
+    The injected cycles mostly go against time, so the cycle removal runs on
+    the loaded graph: removing the anomalies first would leave only the
+    cycles within a single year. The DAG comes from the first `cycles`
+    method, or from the anomaly removal of a graph without cycles.
+    """
+    state: dict = {}
+    yield "load", lambda: state.update(graph=load_edge_list(path))
+    yield "anomalies", lambda: state.update(dag=remove_edge_anomalies(state["graph"])[0])
+    for method in cycles:
+        yield "cycles_" + method, lambda method=method: state.update(
+            dag=remove_edge_cycles(state["graph"], method)[0]) if method == cycles[0] \
+            else remove_edge_cycles(state["graph"], method)
+    yield "order", lambda: state.update(levels=date_levels(state["dag"].csr, state["dag"].node_pln_date))
+    yield "splc", lambda: state.update(
+        splc=calculate_splc_array(state["dag"].csr, levels=state["levels"], overflow="log"))
+    yield "main_path", lambda: main_path_array(state["dag"].csr, state["splc"], state["levels"])
+
+
+def measure(path, cycles=("scc",), skip=()):
+    """Runs every stage on the .csv file `path` and returns its wall time in
+    seconds, peak traced memory in bytes and counters, or None for the
+    `skip` stages and the stages that need their output."""
+    results: dict = {}
+    dag = "cycles_" + cycles[0] if cycles else "anomalies"
+    needed = {"anomalies": "load", "order": dag, "splc": dag, "main_path": dag}
+    with record(trace_memory=True) as recorder:
+        for name, run in _stages(path, cycles):
+            if name in skip or results.get(needed.get(name, "load"), True) is None:
+                results[name] = None
+                continue
+            with recorder.stage(name) as entry:
+                run()
+            counters: dict = {}
+            for nested in recorder.stages:
+                if nested["path"] == name or nested["path"].startswith(name + "/"):
+                    for counter, value in nested["counters"].items():
+                        counters[counter] = counters.get(counter, 0) + value
+            results[name] = {"time": entry["wall_time"], "memory": entry["peak_traced"],
+                             "counters": counters}
+    return results
+
+
+def fit_exponent(sizes, values):
+    """Returns the exponent `k` of the least squares fit of `values` to
+    `a * sizes ** k` in log-log scale, or None with fewer than two points."""
+    points = [(size, value) for size, value in zip(sizes, values) if value]
+    if len(points) < 2:
+        return None
+    x, y = np.log([size for size, _ in points]), np.log([value for _, value in points])
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def run_scaling(sizes=SIZES, directory=None, cycles=("scc", "simple", "fas"), budget=TIME_BUDGET, seed=0,
+                cycle_rate=CYCLE_RATE):
+    """Measures every stage at every size and fits its scaling exponents.
+
+    Returns a dict with the measured `sizes` and, for every stage, its
+    `time` and `memory` at each size, None once skipped, and their fitted
+    `time_exponent` and `memory_exponent`. A stage is skipped when its
+    time at the previous size, scaled quadratically, exceeds `budget`.
+    """
+    curves: dict = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = directory or tmp
+        previous = None
+        for size in sizes:
+            path = os.path.join(directory, "citations_{}_{}_{}.csv".format(size, seed, cycle_rate))
+            if not os.path.exists(path):
+                write_citation_csv(path, size, seed, cycle_rate=cycle_rate)
+            skip = [name for name, curve in curves.items()
+                    if curve["time"][-1] is None or curve["time"][-1] * (size / previous) ** 2 > budget]
+            for name, result in measure(path, cycles, skip).items():
+                curve = curves.setdefault(name, {"time": [], "memory": [], "counters": []})
+                for key in curve:
+                    curve[key].append(result[key] if result else None)
+            previous = size
+
+    for curve in curves.values():
+        curve["time_exponent"] = fit_exponent(sizes, curve["time"])
+        curve["memory_exponent"] = fit_exponent(sizes, curve["memory"])
+    return {"sizes": list(sizes), "stages": curves}
+
+
+def _print_report(report):
+    header = "{:<14}".format("stage") + "".join("{:>12}".format(size) for size in report["sizes"])
+    print(header + "{:>8}{:>8}".format("k_time", "k_mem"))
+    for name, curve in report["stages"].items():
+        cells = "".join("{:>11.3f}s".format(time) if time is not None else "{:>12}".format("-")
+                        for time in curve["time"])
+        exponents = "".join("{:>8.2f}".format(k) if k is not None else "{:>8}".format("-")
+                            for k in (curve["time_exponent"], curve["memory_exponent"]))
+        print("{:<14}".format(name) + cells + exponents)
+    # The cycle policies trade time for removed edges, so both are reported.
+    for name, curve in report["stages"].items():
+        if name.startswith("cycles_"):
+            cells = "".join("{:>12}".format(counters.get("edges_removed", 0) if counters is not None else "-")
+                            for counters in curve["counters"])
+            print("{:<14}".format(name[len("cycles_"):] + " removed") + cells)
+
+
+@pytest.fixture(scope="module")
+def citation_files(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("citations")
+    paths = {}
+    for size in SIZES[:2]:
+        paths[size] = str(directory / "citations_{}.csv".format(size))
+        write_citation_csv(paths[size], size)
+    return paths
+
+
+@pytest.mark.benchmark(group="Scaling")
+@pytest.mark.parametrize("size", SIZES[:2])
+@pytest.mark.parametrize("stage", ["load", "anomalies", "cycles_scc", "order", "splc", "main_path"])
+def test_stage_scaling(benchmark, citation_files, size, stage):
+    stages = dict(_stages(citation_files[size]))
+    for name, run in stages.items():
+        if name == stage:
+            break
+        run()
+    benchmark(stages[stage])
+
+
+@pytest.mark.benchmark(group="Scaling")
+def test_linear_stages():
+    report = run_scaling(SIZES[:3], cycles=(), cycle_rate=0)
+    for name in ("load", "anomalies", "order", "splc", "main_path"):
+        assert report["stages"][name]["time_exponent"] < 1.3, name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling curves of the Main Path Analysis stages.")
+    parser.add_argument("--max-edges", type=float, default=10 ** 6)
+    parser.add_argument("--cycles", nargs="*", choices=("scc", "simple", "fas"),
+                        default=["scc", "simple", "fas"],
+                        help="cycle removal methods, the first one gives the DAG of the later stages")
+    parser.add_argument("--cycle-rate", type=float, default=CYCLE_RATE,
+                        help="fraction of the edges closing a cycle; use 0 without --cycles")
+    parser.add_argument("--budget", type=float, default=TIME_BUDGET,
+                        help="skip a stage once its next size is expected to take longer (seconds)")
+    parser.add_argument("--data-dir", help="directory to keep the generated .csv files in")
+    parser.add_argument("--output", help="file to write the curves and exponents to, as JSON")
+    args = parser.parse_args()
+
+    report = run_scaling([size for size in SIZES if size <= args.max_edges], args.data_dir,
+                         tuple(args.cycles), args.budget, cycle_rate=args.cycle_rate)
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
@@ -0,0 +1,5 @@
+# python mpa.py benchmarks/data/input/gigante_with_cycles.csv --method shortest
+from utils.pipeline import main
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,34 @@
 # Importando todas as funções que precisamos:
 import os
-import pandas as pd
-import networkx as nx
+import tempfile
 
 from src.algorithms.edge_weights import calculate_splc_optimized
-from src.algorithms.dag import get_syncs, add_artificial_source_sync, simplify, remove_anomalies, remove_cycles
+from src.algorithms.dag import get_syncs, add_artificial_source_sync, simplify, remove_cycles
 from src.algorithms.paths import main_path
+from utils.loading import load_edge_list, remove_edge_anomalies
+from utils.writing import write_main_paths, write_node_counts
 
 
 
 # ------ Como carregar um arquivo? ------
 """
 Precisaremos do endereço do arquivo de interesse no formato CSV e em seguida lê-lo
-em um Pandas Dataframe.
+com o load_edge_list, que lê o arquivo em partes e monta direto os arrays do grafo.
 """
 # Encontra o caminho para o diretório do arquivo que estamos rodando (mpa_starting_pack.py)
 local_path = os.path.abspath(os.path.dirname(__file__))
 file_path = os.path.join(local_path, 'benchmarks/data/input/gigante_with_cycles.csv')
 
 # Lê o CSV
-data = pd.read_csv(file_path)
+data = load_edge_list(file_path)
 
-# Cria um grafo (do tipo nx.Digraph) através do Dataframe
-G = nx.from_pandas_edgelist(
-    data,
-    source='Source',
-    target='Target',
-    edge_attr='pln_date',
-    create_using=nx.DiGraph()
-)
+# Vamos remover as arestas anômalas, comparando a pln_date dos nós de todas as arestas
+# de uma vez, antes de montar o grafo. Também recebemos a lista das arestas removidas.
+data, edges_removed, anomalous_edges = remove_edge_anomalies(data)
 
-# Adicionamos a informação da pln_date, salvamos essa informação em seu respectivo nó:
-nx.set_node_attributes(G, pd.Series(data.pln_date.values, index=data.Source).to_dict(), "pln_date")
-
-# Vamos remover as arestas anômalas
-edges_removed = remove_anomalies(G)
+# Cria um grafo (do tipo nx.Digraph) só quando precisamos dele, já com a pln_date
+# nas arestas e em cada nó.
+G = data.to_networkx()
 
 # ------ Como remover o ciclo? ------
 # Para melhorar a performance da remoção de ciclos, criei uma função que simplifica a rede
@@ -56,15 +50,19 @@ add_artificial_source_sync(G)
 syncs = get_syncs(G)
 
 # Calcularemos o SPLC.
-calculate_splc_optimized(G, syncs)
+result = calculate_splc_optimized(G, syncs)
 # Em calculate_splc_optimized salvamos a informação do SPLC dentro do próprio no, portanto para acessá-la precisaremos de uma hash.
-
-
-# Para printar o SPLC, precisamores iterar sobre todas as arestas do grafo e mostrar seus valores:
-edges = list(map(list, G.edges()))
-for edge in edges:
-    print("SPLC({} -> {}) = {}".format(edge[0], edge[1], G[edge[0]][edge[1]]["SPLC"]))
-# É muito aresta para imprimir, seria melhor guardar num arquivo.
+edge = next(iter(G.edges()))
+print("SPLC({} -> {}) = {}".format(edge[0], edge[1], G[edge[0]][edge[1]]["SPLC"]))
+
+# O resultado também guarda os valores em arrays, na ordem de G.edges(). É muito aresta para imprimir,
+# então guardamos todas num arquivo de uma vez. Com write=False, o SPLC só ficaria no resultado, e
+# não no grafo, mas aqui o main_path abaixo precisa dele nas arestas de G.
+# Os arquivos vão para um diretório temporário, para não sobrescrever os dados dos testes.
+output_path = tempfile.mkdtemp(prefix='mpa_')
+print("Arquivos de saída em", output_path)
+result.edge_frame(labels=True).to_csv(os.path.join(output_path, 'splc.csv'), index=False)
+write_node_counts(os.path.join(output_path, 'node_counts.csv.gz'), result)
 
 # ------ Como calcular o Main Path? ------
 path = main_path(G)
@@ -72,3 +70,6 @@ path = main_path(G)
 # Como printar o main path?
 print(*path, sep=" -> ")
 
+
+# E para guardar num arquivo, no formato "a->b->c->":
+write_main_paths(os.path.join(output_path, 'main_path.txt'), [path])
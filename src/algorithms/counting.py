@@ -0,0 +1,322 @@
+"""
+Overflow-aware path counting arrays for Main Path Analysis.
+"""
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+from src.algorithms.instrumentation import count
+
+__all__ = [
+    "OVERFLOW_MODES",
+    "PathCounts",
+    "new_counts",
+    "accumulate",
+    "assign",
+    "take",
+    "multiply",
+    "materialize",
+    "linear_weights"
+]
+
+OVERFLOW_MODES = ("exact", "log", "raise")
+
+# Half of the int64 range. A float64 estimate below this bound guarantees the
+# exact sum fits in int64, since the estimate's relative error is far below 2.
+SAFE_LIMIT = float(2 ** 62)
+
+
+class PathCounts(NamedTuple):
+    """Per-node path counts kept in int64 until they overflow.
+
+    Entries flagged in `promoted` are no longer valid in `values`; their
+    count is held in `exact` as a Python int, or in `logs` as its natural
+    logarithm, depending on the overflow mode. `estimates` holds a float64
+    approximation of every entry and drives the overflow detection.
+    """
+    values: np.ndarray
+    estimates: np.ndarray
+    promoted: np.ndarray
+    exact: Dict[int, int]
+    logs: np.ndarray
+
+
+def _check_mode(overflow: str):
+    if overflow not in OVERFLOW_MODES:
+        raise ValueError(f"overflow mode not supported: {overflow}")
+
+
+def _to_float(value: int) -> float:
+    return float(value) if value.bit_length() < 1024 else np.inf
+
+
+def new_counts(n: int, fill: int = 0) -> PathCounts:
+    """Returns `n` path counts initialized to `fill`.
+
+    Parameters
+    ----------
+    n : int
+
+    fill : int, optional
+
+    Returns
+    -------
+    PathCounts
+    """
+    return PathCounts(
+        np.full(n, fill, dtype=np.int64),
+        np.full(n, fill, dtype=np.float64),
+        np.zeros(n, dtype=bool),
+        {},
+        np.zeros(n, dtype=np.float64)
+    )
+
+
+def assign(counts: PathCounts, nodes: np.ndarray, value: int):
+    """Sets the count of `nodes` to the int64 `value`.
+
+    Parameters
+    ----------
+    counts : PathCounts
+
+    nodes : numpy.ndarray
+
+    value : int
+
+    Returns
+    -------
+    None
+    """
+    counts.values[nodes] = value
+    counts.estimates[nodes] = value
+    if counts.promoted[nodes].any():
+        for node in nodes[counts.promoted[nodes]].tolist():
+            counts.exact.pop(node, None)
+        counts.promoted[nodes] = False
+
+
+def take(counts: PathCounts, index: np.ndarray, size: Optional[int] = None) -> PathCounts:
+    """Returns the counts of `index`, followed by zeros up to `size`.
+
+    Parameters
+    ----------
+    counts : PathCounts
+
+    index : numpy.ndarray
+
+    size : int, optional
+        The length of the result, `len(index)` when not given.
+
+    Returns
+    -------
+    PathCounts
+        Entry `i` holds the count of `index[i]`, promoted or not.
+    """
+    taken = new_counts(len(index) if size is None else size)
+    n = len(index)
+    taken.values[:n] = counts.values[index]
+    taken.estimates[:n] = counts.estimates[index]
+    taken.promoted[:n] = counts.promoted[index]
+    taken.logs[:n] = counts.logs[index]
+    if counts.exact:
+        for i in np.flatnonzero(taken.promoted[:n]).tolist():
+            value = counts.exact.get(int(index[i]))
+            if value is not None:
+                taken.exact[i] = value
+    return taken
+
+
+def _log_values(counts: PathCounts, index: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.log(counts.values[index].astype(np.float64))
+    promoted = counts.promoted[index]
+    logs[promoted] = counts.logs[index[promoted]]
+    return logs
+
+
+def accumulate(counts: PathCounts, nodes: np.ndarray, sources: np.ndarray, lengths: np.ndarray,
+               base: int = 0, overflow: str = "exact") -> int:
+    """Sets the count of each node in `nodes` to `base` plus the sum of the
+    counts of its segment of `sources`.
+
+    Parameters
+    ----------
+    counts : PathCounts
+
+    nodes : numpy.ndarray
+        The nodes to update, none of them in `sources`.
+
+    sources : numpy.ndarray
+        The concatenated segments of nodes summed into each node.
+
+    lengths : numpy.ndarray
+        The length of each segment, all greater than zero.
+
+    base : int, optional
+        The value added to every sum.
+
+    overflow : str, optional (default = 'exact')
+        How to handle sums that do not fit in int64.
+        Supported options: 'exact', 'log', 'raise'.
+
+    Returns
+    -------
+    int
+        The number of nodes promoted out of int64.
+
+    Raises
+    ------
+    OverflowError
+        If a sum does not fit in int64 and `overflow` is 'raise'.
+
+    Notes
+    -----
+    The int64 sums are computed for the whole level and only the entries
+    whose float64 estimate reaches `SAFE_LIMIT` are recomputed, one by one,
+    with Python ints or in log-space.
+    """
+    _check_mode(overflow)
+    offsets = np.cumsum(lengths) - lengths
+    # Estimates beyond the float64 range become inf, which the check below catches.
+    with np.errstate(over="ignore", invalid="ignore"):
+        estimates = base + np.add.reduceat(counts.estimates[sources], offsets)
+    counts.values[nodes] = base + np.add.reduceat(counts.values[sources], offsets)
+    counts.estimates[nodes] = estimates
+    overflowed = estimates >= SAFE_LIMIT
+    if not overflowed.any():
+        return 0
+
+    if overflow == "raise":
+        raise OverflowError("path count does not fit in int64")
+
+    counts.promoted[nodes[overflowed]] = True
+    promoted_nodes = nodes[overflowed].tolist()
+    count("overflow_promotions", len(promoted_nodes))
+    starts = offsets[overflowed].tolist()
+    ends = (offsets + lengths)[overflowed].tolist()
+    if overflow == "exact":
+        for node, start, end in zip(promoted_nodes, starts, ends):
+            total = base + sum(_exact_value(counts, source) for source in sources[start:end].tolist())
+            counts.exact[node] = total
+            counts.estimates[node] = _to_float(total)
+        return len(promoted_nodes)
+
+    for node, start, end in zip(promoted_nodes, starts, ends):
+        logs = _log_values(counts, sources[start:end])
+        total = np.logaddexp.reduce(logs)
+        counts.logs[node] = np.logaddexp(np.log(base), total) if base else total
+    return len(promoted_nodes)
+
+
+def multiply(a: PathCounts, a_index: np.ndarray, b: PathCounts, b_index: np.ndarray,
+             overflow: str = "exact") -> np.ndarray:
+    """Returns the element-wise product of `a[a_index]` and `b[b_index]`.
+
+    Parameters
+    ----------
+    a : PathCounts
+
+    a_index : numpy.ndarray
+
+    b : PathCounts
+
+    b_index : numpy.ndarray
+
+    overflow : str, optional (default = 'exact')
+        Supported options: 'exact', 'log', 'raise'.
+
+    Returns
+    -------
+    numpy.ndarray
+        An int64 array when every product fits, otherwise an object array
+        of Python ints ('exact'). With 'log', the natural logarithm of every
+        product as float64.
+
+    Raises
+    ------
+    OverflowError
+        If a product does not fit in int64 and `overflow` is 'raise'.
+    """
+    _check_mode(overflow)
+    if overflow == "log":
+        return _log_values(a, a_index) + _log_values(b, b_index)
+
+    products = a.values[a_index] * b.values[b_index]
+    with np.errstate(over="ignore", invalid="ignore"):
+        overflowed = a.estimates[a_index] * b.estimates[b_index] >= SAFE_LIMIT
+    if not overflowed.any():
+        return products
+    if overflow == "raise":
+        raise OverflowError("path count product does not fit in int64")
+    count("overflow_products", overflowed.sum())
+
+    products = products.astype(object)
+    for edge, u, v in zip(np.flatnonzero(overflowed).tolist(), a_index[overflowed].tolist(),
+                          b_index[overflowed].tolist()):
+        products[edge] = _exact_value(a, u) * _exact_value(b, v)
+    return products
+
+
+def _exact_value(counts: PathCounts, node: int) -> int:
+    return counts.exact[node] if counts.promoted[node] else int(counts.values[node])
+
+
+def materialize(counts: PathCounts, overflow: str = "exact") -> np.ndarray:
+    """Returns the counts as a single array.
+
+    Parameters
+    ----------
+    counts : PathCounts
+
+    overflow : str, optional (default = 'exact')
+        Supported options: 'exact', 'log', 'raise'.
+
+    Returns
+    -------
+    numpy.ndarray
+        An int64 array when nothing was promoted, otherwise an object array
+        of Python ints ('exact'). With 'log', the natural logarithm of every
+        count as float64.
+    """
+    _check_mode(overflow)
+    if overflow == "log":
+        return _log_values(counts, np.arange(len(counts.values)))
+    if not counts.exact:
+        return counts.values
+
+    values = counts.values.astype(object)
+    for node, value in counts.exact.items():
+        values[node] = value
+    return values
+
+
+def linear_weights(weights: np.ndarray, overflow: str = "exact") -> np.ndarray:
+    """Returns weights whose sums along paths rank the paths as the sums of
+    the counts `weights` hold.
+
+    Parameters
+    ----------
+    weights : numpy.ndarray
+        Counts as `multiply` returns them, e.g., the SPLC of every edge.
+
+    overflow : str, optional (default = 'exact')
+        The overflow mode `weights` were computed with.
+        Supported options: 'exact', 'log', 'raise'.
+
+    Returns
+    -------
+    numpy.ndarray
+        `weights` itself, unless `overflow` is 'log'.
+
+    Notes
+    -----
+    Summing logarithms would rank the paths by the product of their
+    counts instead. The logarithms are turned back into float64 counts
+    divided by the largest one, which scales every path sum alike and stays
+    finite. The counts below about 1e-308 times the largest one become 0.
+    """
+    _check_mode(overflow)
+    if overflow != "log" or not len(weights):
+        return weights
+    weights = np.asarray(weights, dtype=np.float64)
+    return np.exp(weights - weights.max())
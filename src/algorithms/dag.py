@@ -1,7 +1,20 @@
 """
 Directed Acyclic Graph methods for Main Path Analysis.
 """
+import heapq
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import NamedTuple
+
 import networkx as nx
+import numpy as np
+
+from src.algorithms.csr import CSRGraph, TopologicalLevels, OFFSET_DTYPE, edge_sources, edge_subgraph, \
+    from_networkx, node_labels, segment_ranges, strongly_connected_components, topological_levels, \
+    transpose
+from src.algorithms.instrumentation import count, instrumented
 
 __all__ = [
     "compare_graphs",
@@ -9,14 +22,26 @@ __all__ = [
     "get_sources",
     "path_contain_edge",
     "remove_cycles",
+    "remove_cycles_scc",
+    "feedback_arc_set_array",
+    "remove_cycles_fas",
+    "CYCLE_POLICIES",
+    "CycleRemoval",
+    "break_cycles",
     "add_artificial_source_sync",
+    "add_artificial_source_sync_array",
     "simplify",
+    "trim",
+    "trim_array",
     "remove_anomalies",
+    "remove_anomalies_array",
+    "node_dates",
+    "date_levels",
     "add_artificial_sync"
 ]
 
 
-def graph_comparison_helper(edge1: dict, edge2: dict) -> bool:
+def graph_comparison_helper(edge1: dict, edge2: dict, weight="SPLC") -> bool:
     """Checks if both edges have the same SPLC weight
 
     Parameters
@@ -29,18 +54,33 @@ def graph_comparison_helper(edge1: dict, edge2: dict) -> bool:
         A list of size two containing the source and target
         nodes of an edge.
 
+    weight : str, optional (default = 'SPLC')
+        The edge attribute to be compared.
+
     Returns
     -------
     bool
         Return True if both edges have equal SPLC weight value.
     """
-    return edge1["SPLC"] == edge2["SPLC"]
+    return edge1.get(weight) == edge2.get(weight)
+
+
+def _edge_table(G, index: dict, weight: str):
+    """Returns the edge keys of `G` under the node numbering `index`, sorted,
+    and the `weight` of each of those edges."""
+    heads, tails, weights = [], [], []
+    for u, v, w in G.edges(data=weight):
+        heads.append(index[u])
+        tails.append(index[v])
+        weights.append(w)
+    keys = np.array(heads, dtype=np.int64) * len(index) + np.array(tails, dtype=np.int64)
+    order = np.argsort(keys, kind="stable")
+    return keys[order], np.array(weights, dtype=object)[order]
 
 
-def compare_graphs(G1, G2) -> bool:
-    """Checks if graph `G1` and `G2` are isomorphic,
-    in other words, checks if they are equal, and
-    their edge weights as well.
+def compare_graphs(G1, G2, weight="SPLC", isomorphism=False) -> bool:
+    """Checks if graph `G1` and `G2` are equal, with the same
+    node labels and edges, and their edge weights as well.
 
     Parameters
     ----------
@@ -48,12 +88,36 @@ def compare_graphs(G1, G2) -> bool:
 
     G2 : networkx.DiGraph
 
+    weight : str, optional (default = 'SPLC')
+        The edge attribute to be compared.
+
+    isomorphism : bool, optional (default = False)
+        If True, checks if `G1` and `G2` are isomorphic instead,
+        ignoring the node labels.
+
     Returns
     -------
     bool
         Return True if graph `G1` and `G2` are equals.
+
+    Notes
+    -----
+        The node and edge counts are compared first. Then the edges of both
+        graphs are numbered with the node order of `G1`, sorted, and compared
+        with their weights as arrays, in O(E log E), where the isomorphism
+        search can take exponential time.
     """
-    return nx.is_isomorphic(G1, G2, edge_match=graph_comparison_helper)
+    if isomorphism:
+        return nx.is_isomorphic(G1, G2, edge_match=partial(graph_comparison_helper, weight=weight))
+
+    if len(G1) != len(G2) or G1.number_of_edges() != G2.number_of_edges():
+        return False
+    index = {node: i for i, node in enumerate(G1)}
+    if any(node not in index for node in G2):
+        return False
+    keys1, weights1 = _edge_table(G1, index, weight)
+    keys2, weights2 = _edge_table(G2, index, weight)
+    return bool(np.array_equal(keys1, keys2) and (weights1 == weights2).all())
 
 
 def get_syncs(G) -> list:
@@ -111,6 +175,7 @@ def path_contain_edge(edge: list, path: list) -> bool:
     return any(map(lambda x: path[x:x + len(edge)] == edge, range(len(path) - len(edge) + 1)))
 
 
+@instrumented
 def remove_cycles(G, weight="pln_date") -> list:
     """ Remove the cycles of the digraph to convert it an Acyclic Direct Graph (DAG)
 
@@ -136,6 +201,7 @@ def remove_cycles(G, weight="pln_date") -> list:
     edges_removed = []
     while not nx.is_directed_acyclic_graph(G):
         cycle = next(nx.simple_cycles(G))
+        count("cycles_found")
         edges = [(cycle[-1], cycle[0])]
         scores = [(G[cycle[-1]][cycle[0]][weight])]
 
@@ -146,9 +212,321 @@ def remove_cycles(G, weight="pln_date") -> list:
         head, tail = edges[scores.index(min(scores))]
         G.remove_edge(head, tail)
         edges_removed.append((head, tail))
+    count("edges_removed", len(edges_removed))
+    return edges_removed
+
+
+def _is_cyclic_component(G, component) -> bool:
+    if len(component) > 1:
+        return True
+    node = next(iter(component))
+    return G.has_edge(node, node)
+
+
+def _break_component_cycles(G, component, weight) -> list:
+    """Removes from `G` the edges that break every cycle inside the strongly
+    connected `component`, using the heuristic of `remove_cycles`."""
+    edges_removed = []
+    stack = [component]
+    while stack:
+        component = stack.pop()
+        source = next(node for node in G if node in component)
+        cycle = nx.find_cycle(G.subgraph(component), source=source)
+        head, tail = min(cycle, key=lambda edge: G[edge[0]][edge[1]][weight])[:2]
+        G.remove_edge(head, tail)
+        edges_removed.append((head, tail))
+        stack.extend(c for c in nx.strongly_connected_components(G.subgraph(component))
+                     if _is_cyclic_component(G, c))
     return edges_removed
 
 
+def _break_cycles_task(task) -> list:
+    """Breaks the cycles of a single component, given as a weighted edge list."""
+    edges, weight = task
+    H = nx.DiGraph()
+    H.add_weighted_edges_from(edges, weight=weight)
+    return _break_component_cycles(H, set(H), weight)
+
+
+@instrumented
+def remove_cycles_scc(G, weight="pln_date", n_jobs=1) -> list:
+    """ Remove the cycles of the digraph to convert it an Acyclic Direct Graph (DAG)
+    working only inside its strongly connected components.
+
+    The heuristic is the same as in `remove_cycles`: for each cycle found,
+    remove the edge with the lowest weight of the cycle.
+
+    Parameters
+    ----------
+    G : networkx.DiGraph
+
+    weight : str
+        The edge attribute to be considered.
+
+    n_jobs : int, optional (default = 1)
+        Number of worker processes. With more than one, the independent
+        strongly connected components are processed in parallel.
+
+    Returns
+    -------
+    list
+        The list of edges removed
+
+    Notes
+    -----
+        The strongly connected components are computed once, and each
+        non-trivial one is copied into its own small graph. A cycle is found
+        with a depth-first search in that graph, and after each removal only
+        the touched component is split again, so the acyclic part of the
+        graph is never searched twice.
+
+        The cycle found in a component may differ from the first cycle of
+        `networkx.simple_cycles`, therefore the removed edges may differ from
+        the ones of `remove_cycles`.
+    """
+    components = [c for c in nx.strongly_connected_components(G) if _is_cyclic_component(G, c)]
+    # Largest components first, so that they do not end up last in the pool.
+    components.sort(key=len, reverse=True)
+    tasks = []
+    for component in components:
+        edges = [(u, v, data[weight]) for u, v, data in G.subgraph(component).edges(data=True)]
+        tasks.append((edges, weight))
+
+    if n_jobs == 1 or len(tasks) < 2:
+        results = list(map(_break_cycles_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(_break_cycles_task, tasks))
+    edges_removed = [edge for removed in results for edge in removed]
+    G.remove_edges_from(edges_removed)
+    # Every removal breaks the cycle found in its component.
+    count("components", len(tasks))
+    count("cycles_found", len(edges_removed))
+    count("edges_removed", len(edges_removed))
+    return edges_removed
+
+
+def _date_costs(edge_dates: np.ndarray) -> np.ndarray:
+    """Returns the removal cost of every edge: 1 plus its date scaled into
+    [0, 1), so fewer edges always cost less and older ones break the ties.
+    Undated edges cost 1."""
+    dates = np.asarray(edge_dates, dtype=np.float64)
+    dated = ~np.isnan(dates)
+    costs = np.ones(len(dates))
+    if dated.any():
+        first, last = dates[dated].min(), dates[dated].max()
+        costs[dated] += (dates[dated] - first) / (last - first + 1)
+    return costs
+
+
+def _eades_order(csr: CSRGraph, costs: np.ndarray) -> np.ndarray:
+    """Returns the position of every node in the vertex sequence of the greedy
+    heuristic of Eades, Lin and Smyth, on edges weighted by `costs`.
+
+    Sinks go to the end of the sequence and sources to its start as they
+    appear; otherwise the node with the largest out-weight minus in-weight
+    goes to the start, leaving its cheapest edges pointing backwards.
+    """
+    n = csr.number_of_nodes
+    reverse, edge_ids = transpose(csr)
+    out_ptr, out_nodes = csr.indptr.tolist(), csr.indices.tolist()
+    in_ptr, in_nodes = reverse.indptr.tolist(), reverse.indices.tolist()
+    out_costs, in_costs = costs.tolist(), costs[edge_ids].tolist()
+    out_degree, in_degree = np.diff(csr.indptr).tolist(), np.diff(reverse.indptr).tolist()
+    heads = edge_sources(csr)
+    out_weight = np.bincount(heads, costs, minlength=n).tolist()
+    in_weight = np.bincount(csr.indices, costs, minlength=n).tolist()
+
+    removed = [False] * n
+    sinks = [v for v in range(n) if out_degree[v] == 0]
+    sources = [v for v in range(n) if in_degree[v] == 0 and out_degree[v] > 0]
+    heap = [(in_weight[v] - out_weight[v], v) for v in range(n) if in_degree[v] and out_degree[v]]
+    heapq.heapify(heap)
+    first, last = [], []
+
+    def remove(v):
+        removed[v] = True
+        for i in range(out_ptr[v], out_ptr[v + 1]):
+            w = out_nodes[i]
+            if not removed[w]:
+                in_degree[w] -= 1
+                in_weight[w] -= out_costs[i]
+                if in_degree[w] == 0:
+                    (sinks if out_degree[w] == 0 else sources).append(w)
+                else:
+                    heapq.heappush(heap, (in_weight[w] - out_weight[w], w))
+        for i in range(in_ptr[v], in_ptr[v + 1]):
+            u = in_nodes[i]
+            if not removed[u]:
+                out_degree[u] -= 1
+                out_weight[u] -= in_costs[i]
+                if out_degree[u] == 0:
+                    sinks.append(u)
+                elif in_degree[u]:
+                    heapq.heappush(heap, (in_weight[u] - out_weight[u], u))
+
+    while True:
+        while sinks or sources:
+            while sinks:
+                v = sinks.pop()
+                if not removed[v]:
+                    last.append(v)
+                    remove(v)
+            while sources:
+                v = sources.pop()
+                if not removed[v]:
+                    first.append(v)
+                    remove(v)
+        while heap and (removed[heap[0][1]]
+                        or heap[0][0] != in_weight[heap[0][1]] - out_weight[heap[0][1]]):
+            heapq.heappop(heap)
+        if not heap:
+            break
+        v = heapq.heappop(heap)[1]
+        first.append(v)
+        remove(v)
+
+    position = np.empty(n, dtype=np.int64)
+    position[np.array(first + last[::-1], dtype=np.int64)] = np.arange(n)
+    return position
+
+
+@instrumented
+def feedback_arc_set_array(csr: CSRGraph, edge_dates=None) -> np.ndarray:
+    """ Returns the edge indices of `csr` whose removal leaves a DAG, found with
+    the greedy feedback arc set heuristic of Eades, Lin and Smyth.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+
+    edge_dates : numpy.ndarray, optional
+        The pln_date of every edge index. When given, among the sets of
+        edges of the same size the heuristic prefers removing older edges,
+        like the min-pln_date rule of `remove_cycles`.
+
+    Returns
+    -------
+    numpy.ndarray
+        The sorted edge indices to remove.
+
+    Notes
+    -----
+    An edge outside every strongly connected component is in no cycle, so
+    the heuristic only orders the edges inside the components and removes
+    those pointing backwards in its vertex sequence, plus the self-loops.
+    Every node is removed once from a heap of weighted degree differences,
+    so it runs in O(E log V) instead of the O(E) of the unweighted bucket
+    version, and never searches for single cycles.
+    """
+    labels = strongly_connected_components(csr)
+    heads = edge_sources(csr)
+    inside = labels[heads] == labels[csr.indices]
+    loops = heads == csr.indices
+    core, core_edges = edge_subgraph(csr, inside & ~loops)
+    costs = np.ones(len(core_edges)) if edge_dates is None else \
+        _date_costs(np.asarray(edge_dates)[core_edges])
+    position = _eades_order(core, costs)
+    backward = position[edge_sources(core)] > position[core.indices]
+    removed = np.sort(np.concatenate((core_edges[backward], np.flatnonzero(loops))))
+    count("components", int(np.count_nonzero(np.bincount(labels[heads[inside]]))))
+    count("edges_removed", len(removed))
+    return removed
+
+
+@instrumented
+def remove_cycles_fas(G, weight="pln_date") -> list:
+    """ Remove the cycles of the digraph to convert it an Acyclic Direct Graph (DAG)
+    with the greedy feedback arc set heuristic of `feedback_arc_set_array`.
+
+    Parameters
+    ----------
+    G : networkx.DiGraph
+
+    weight : str, optional (default = 'pln_date')
+        The edge attribute to be considered, older edges being removed first.
+        None removes the fewest edges regardless of their dates.
+
+    Returns
+    -------
+    list
+        The list of edges removed
+
+    Notes
+    -----
+        Where `remove_cycles` removes the oldest edge of one cycle at a time,
+        this heuristic orders all the nodes at once and removes the edges
+        against the order, which usually takes fewer edges on large strongly
+        connected components and does not depend on the number of cycles.
+    """
+    csr = from_networkx(G)
+    dates = None
+    if weight is not None:
+        dates = np.fromiter((date for _, _, date in G.edges(data=weight, default=np.nan)),
+                            dtype=np.float64, count=csr.number_of_edges)
+    edge_ids = feedback_arc_set_array(csr, dates)
+    heads = edge_sources(csr)[edge_ids]
+    edges_removed = list(zip(node_labels(csr, heads), node_labels(csr, csr.indices[edge_ids])))
+    G.remove_edges_from(edges_removed)
+    return edges_removed
+
+
+CYCLE_POLICIES = {
+    "simple": remove_cycles,
+    "scc": remove_cycles_scc,
+    "fas": remove_cycles_fas
+}
+
+
+class CycleRemoval(NamedTuple):
+    """The edges a cycle `policy` removed, and the seconds it took."""
+    policy: str
+    removed: list
+    seconds: float
+
+    @property
+    def edges_removed(self) -> int:
+        return len(self.removed)
+
+
+def break_cycles(G, policy="scc", weight="pln_date", **options) -> CycleRemoval:
+    """ Remove the cycles of the digraph with one of the `CYCLE_POLICIES`, and
+    report how many edges it removed and how long it took.
+
+    Parameters
+    ----------
+    G : networkx.DiGraph
+
+    policy : str, optional (default = 'scc')
+        Supported options: 'simple' (`remove_cycles`), 'scc'
+        (`remove_cycles_scc`) and 'fas' (`remove_cycles_fas`).
+
+    weight : str, optional (default = 'pln_date')
+        The edge attribute to be considered.
+
+    **options
+        Further keyword arguments of the policy, e.g. `n_jobs` of 'scc'.
+
+    Returns
+    -------
+    CycleRemoval
+
+    Raises
+    ------
+    ValueError
+        If `policy` is not among the supported options.
+
+    Notes
+    -----
+        Running every policy on copies of a dataset tells which one suits it.
+    """
+    if policy not in CYCLE_POLICIES:
+        raise ValueError(f"cycle policy not supported: {policy}")
+    start = time.perf_counter()
+    removed = CYCLE_POLICIES[policy](G, weight, **options)
+    return CycleRemoval(policy, removed, time.perf_counter() - start)
+
+
 def add_artificial_source_sync(G):  # pragma: no cover
     """ Add two artificial vertices, `source` and `sync` vertex such that reduces
     the graph set of sources to a single source and syncs to a single sync vertex.
@@ -179,6 +557,49 @@ def add_artificial_source_sync(G):  # pragma: no cover
         G.add_edge(sync, "sync")
 
 
+def add_artificial_source_sync_array(csr: CSRGraph) -> CSRGraph:
+    """ Returns `csr` with the two artificial vertices of `add_artificial_source_sync`.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+
+    Returns
+    -------
+    CSRGraph
+        The nodes of `csr` followed by `source` and `sync`, with the edges in
+        the order `to_networkx` gives after `add_artificial_source_sync`:
+        every sync of `csr` gets its edge to `sync` after its own out-edges,
+        and `source` lists the sources of `csr` in node order. `csr` itself
+        if it has no edges, as `add_artificial_source_sync` does.
+    """
+    n = csr.number_of_nodes
+    if not csr.number_of_edges:
+        return csr
+    out_degree = np.diff(csr.indptr)
+    sources = np.flatnonzero(np.bincount(csr.indices, minlength=n) == 0)
+    syncs = out_degree == 0
+
+    indptr = np.zeros(n + 3, dtype=OFFSET_DTYPE)
+    np.cumsum(out_degree + syncs, out=indptr[1:n + 1])
+    indptr[n + 1] = indptr[n + 2] = indptr[n] + len(sources)
+    indices = np.empty(indptr[-1], dtype=csr.indices.dtype)
+    kept = np.ones(indptr[n], dtype=bool)
+    kept[indptr[1:n + 1][syncs] - 1] = False
+    indices[:indptr[n]][kept] = csr.indices
+    indices[:indptr[n]][~kept] = n + 1
+    indices[indptr[n]:] = sources
+    if isinstance(csr.nodes, np.ndarray) and csr.nodes.dtype.kind in "US":
+        # Promoted to the longer string type, e.g., of memory-mapped labels.
+        nodes = np.concatenate((csr.nodes, np.array(["source", "sync"])))
+    elif isinstance(csr.nodes, np.ndarray):
+        # Other labels, e.g., integers, are kept as they are next to the strings.
+        nodes = np.concatenate((csr.nodes.astype(object), np.array(["source", "sync"], dtype=object)))
+    else:
+        nodes = list(csr.nodes) + ["source", "sync"]
+    return CSRGraph(nodes, indptr, indices)
+
+
 def add_artificial_sync(G):  # pragma: no cover
     """ Add an artificial `sync` vertex such that reduces the graph set
     of syncs to a single sync vertex.
@@ -203,7 +624,7 @@ def add_artificial_sync(G):  # pragma: no cover
 
 def simplify(G) -> nx.DiGraph:  # pragma: no cover
     """ Simplifies creating a subgraph of `G` by deleting the vertices and arcs from each source and
-    to each sync.
+    to each sync, until none is left.
 
     Parameters
     ----------
@@ -217,20 +638,95 @@ def simplify(G) -> nx.DiGraph:  # pragma: no cover
     Notes
     -----
         It aims to decrease the scale of the graph, especially when `G` is sparse.
+        Only the nodes kept by `trim` are copied. Use `G.subgraph(trim(G))` to
+        get a read-only view instead.
     """
     if nx.is_empty(G):
         return None
 
-    H = G.copy()
+    return G.subgraph(trim(G)).copy()
+
 
-    nodes_to_remove = [node for node in H.nodes if H.in_degree(node) == 0 or H.out_degree(node) == 0]
+@instrumented
+def trim(G) -> list:
+    """ Returns the nodes of `G` left after repeatedly removing the nodes without
+    in-edges or without out-edges.
 
-    for node in nodes_to_remove:
-        H.remove_node(node)
+    Parameters
+    ----------
+    G : networkx.DiGraph
 
-    return H
+    Returns
+    -------
+    list
+        The remaining nodes, in `G` order. Every cycle of `G` goes only
+        through them, and every one of them has in-edges and out-edges
+        from and to the others.
 
+    Notes
+    -----
+        Each node keeps counters of its in and out degree among the remaining
+        nodes, and the removed ones go through a queue that decrements the
+        counters of their neighbours, so the cost is O(V + E). `G` is not
+        copied nor modified.
+    """
+    in_degree = dict(G.in_degree())
+    out_degree = dict(G.out_degree())
+    queue = deque(node for node in G if not in_degree[node] or not out_degree[node])
+    removed = set(queue)
+    while queue:
+        node = queue.popleft()
+        for degree, neighbours in ((in_degree, G.succ[node]), (out_degree, G.pred[node])):
+            for neighbour in neighbours:
+                if neighbour in removed:
+                    continue
+                degree[neighbour] -= 1
+                if not degree[neighbour]:
+                    removed.add(neighbour)
+                    queue.append(neighbour)
+    count("nodes_trimmed", len(removed))
+    return [node for node in G if node not in removed]
+
+
+@instrumented
+def trim_array(csr: CSRGraph) -> np.ndarray:
+    """ Returns the node indices of `csr` left after repeatedly removing the nodes
+    without in-edges or without out-edges.
 
+    Parameters
+    ----------
+    csr : CSRGraph
+
+    Returns
+    -------
+    numpy.ndarray
+        The remaining node indices, sorted. See `trim`.
+
+    Notes
+    -----
+        All the removable nodes of a round are removed at once, with
+        vectorized degree updates, as in `topological_levels`.
+    """
+    reverse, _ = transpose(csr)
+    out_edges, in_edges = np.diff(csr.indptr), np.diff(reverse.indptr)
+    out_degree, in_degree = out_edges.copy(), in_edges.copy()
+    alive = np.ones(csr.number_of_nodes, dtype=bool)
+    frontier = np.flatnonzero((in_degree == 0) | (out_degree == 0))
+    while len(frontier):
+        alive[frontier] = False
+        touched = []
+        for graph, lengths, degree in ((csr, out_edges, in_degree), (reverse, in_edges, out_degree)):
+            neighbours = graph.indices[segment_ranges(graph.indptr[frontier], lengths[frontier])]
+            neighbours, counts = np.unique(neighbours[alive[neighbours]], return_counts=True)
+            degree[neighbours] -= counts
+            touched.append(neighbours)
+        touched = np.unique(np.concatenate(touched))
+        frontier = touched[(in_degree[touched] == 0) | (out_degree[touched] == 0)]
+    count("nodes_trimmed", int((~alive).sum()))
+    return np.flatnonzero(alive)
+
+
+@instrumented
 def remove_anomalies(G, weight="pln_date") -> int:  # pragma: no cover
     """ Given two edges remove the edges to future nodes, i.e., given `e1` and `e2`,
     with `e1[weight]` < `e2[weight]`.
@@ -263,4 +759,113 @@ def remove_anomalies(G, weight="pln_date") -> int:  # pragma: no cover
                 G.remove_edge(source, target)
                 edges_removed += 1
 
+    count("anomalies_removed", edges_removed)
     return edges_removed
+
+
+@instrumented
+def remove_anomalies_array(csr: CSRGraph, node_dates: np.ndarray):
+    """ Removes the edges of `csr` whose source is older than their target, as
+    `remove_anomalies` does, with a boolean mask over the whole edge list.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+
+    node_dates : numpy.ndarray
+        The pln_date of every node index, NaN for nodes without date.
+
+    Returns
+    -------
+    sub : CSRGraph
+        `csr` without the anomalous edges.
+
+    edge_ids : numpy.ndarray
+        The edge index in `csr` of every edge of `sub`, to select the edge
+        attributes that are kept.
+
+    removed : list
+        The removed edges as (source, target) labels. Its length is the count
+        returned by `remove_anomalies`.
+
+    Notes
+    -----
+        Edges with an undated endpoint are kept, since NaN never compares
+        lower. Running it on the edge list, before any NetworkX graph is
+        built, avoids removing the edges one by one.
+    """
+    node_dates = np.asarray(node_dates, dtype=np.float64)
+    heads = edge_sources(csr)
+    anomalous = node_dates[heads] < node_dates[csr.indices]
+    sub, edge_ids = edge_subgraph(csr, ~anomalous)
+    removed = list(zip(node_labels(csr, heads[anomalous]), node_labels(csr, csr.indices[anomalous])))
+    count("anomalies_removed", len(removed))
+    return sub, edge_ids, removed
+
+
+def node_dates(G, nodes, date="pln_date") -> np.ndarray:
+    """ Returns the `date` attribute of `nodes` in `G` as a float64 array, NaN
+    for the nodes without it, e.g., the artificial `source` and `sync`."""
+    return np.array([G.nodes[node].get(date, np.nan) for node in nodes], dtype=np.float64)
+
+
+@instrumented
+def date_levels(csr: CSRGraph, node_dates: np.ndarray) -> TopologicalLevels:
+    """ Returns topological levels of `csr` derived from the pln_date of its
+    nodes, for the stages that take `levels`.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+        A directed acyclic graph (DAG), e.g., after `remove_anomalies_array`.
+
+    node_dates : numpy.ndarray
+        The pln_date of every node index, NaN for nodes without date.
+
+    Returns
+    -------
+    TopologicalLevels
+        The nodes from the newest to the oldest date. Undated nodes come
+        first when nothing cites them, as the artificial `source`, and last
+        otherwise, as `sync` and the nodes only cited.
+
+    Raises
+    ------
+    networkx.NetworkXUnfeasible
+        If `csr` contains a cycle.
+
+    Notes
+    -----
+    Citations point back in time, so once the anomalies are removed every
+    edge goes to an older or equal date. The nodes are sorted by date, and
+    only the edges between nodes of equal date are sorted topologically,
+    to split each date into levels. The order is verified over all the
+    edges in one vectorized pass: where an edge goes to a newer date, the
+    levels of `topological_levels` are returned instead. Unlike those,
+    the level of a node is not its longest path from a source.
+    """
+    node_dates = np.array(node_dates, dtype=np.float64)
+    undated = np.isnan(node_dates)
+    if undated.any():
+        cited = np.bincount(csr.indices, minlength=csr.number_of_nodes) > 0
+        node_dates[undated] = np.where(cited[undated], -np.inf, np.inf)
+    _, rank = np.unique(-node_dates, return_inverse=True)
+    rank = rank.reshape(-1)
+
+    heads = edge_sources(csr)
+    same_date, _ = edge_subgraph(csr, rank[heads] == rank[csr.indices])
+    local = topological_levels(same_date)
+    local_level = np.empty(csr.number_of_nodes, dtype=np.int64)
+    local_level[local.order] = np.repeat(np.arange(local.number_of_levels), np.diff(local.level_ptr))
+
+    keys = rank * local.number_of_levels + local_level
+    order = np.argsort(keys, kind="stable")
+    starts = np.flatnonzero(np.diff(keys[order])) + 1
+    level_ptr = np.concatenate(([0], starts, [len(order)])).astype(OFFSET_DTYPE) if len(order) \
+        else np.zeros(1, dtype=OFFSET_DTYPE)
+    level_of = np.empty(csr.number_of_nodes, dtype=np.int64)
+    level_of[order] = np.repeat(np.arange(len(level_ptr) - 1), np.diff(level_ptr))
+    if not np.all(level_of[heads] < level_of[csr.indices]):
+        count("date_order_fallbacks")
+        return topological_levels(csr)
+    return TopologicalLevels(order.astype(local.order.dtype), level_ptr)
@@ -1,19 +1,100 @@
 """
 Edge weight calculation methods for Main Path Analysis.
 """
+from typing import NamedTuple
+
 import networkx as nx
+import numpy as np
+import pandas as pd
 
-from src.algorithms.dag import path_contain_edge
-from src.algorithms.node_weights import calculate_n_all_minus, calculate_n_plus
+from src.algorithms.csr import CSRGraph, edge_sources, from_networkx, topological_levels
+from src.algorithms.dag import date_levels, node_dates, path_contain_edge
+from src.algorithms.counting import materialize, multiply
+from src.algorithms.instrumentation import instrumented
+from src.algorithms.node_weights import calculate_n_all_minus_counts, calculate_n_plus_counts, \
+    calculate_traversal_counts, calculate_reach_counts
 
 __all__ = [
     "calculate_spc",
     "calculate_splc_fast",
     "calculate_splc",
-    "calculate_splc_optimized"
+    "calculate_splc_optimized",
+    "calculate_splc_array",
+    "SPLCResult",
+    "calculate_splc_result",
+    "calculate_traversal_weights",
+    "calculate_traversal_weights_array"
 ]
 
+TRAVERSAL_WEIGHTS = {
+    "SPC": ("N-", "N+"),
+    "SPLC": ("Nall-", "N+"),
+    "SPNP": ("Nall-", "Nall+"),
+    "NPPC": None
+}
+
+
+class SPLCResult(NamedTuple):
+    """The SPLC of every edge of `csr` and the node counts it is made of, in
+    contiguous arrays aligned with the node and edge indices of `csr`.
+
+    `node_counts` holds the `Nall-` and `N+` columns of every node, and
+    `splc` the value of every edge. They are int64 arrays, object arrays of
+    Python ints once a count does not fit in int64, or float64 natural
+    logarithms with the 'log' `overflow`.
+    """
+    csr: CSRGraph
+    node_counts: np.ndarray
+    splc: np.ndarray
+    overflow: str
+
+    @property
+    def n_all_minus(self) -> np.ndarray:
+        return self.node_counts[:, 0]
+
+    @property
+    def n_plus(self) -> np.ndarray:
+        return self.node_counts[:, 1]
+
+    def node_frame(self) -> pd.DataFrame:
+        """Returns the `Nall-` and `N+` columns indexed by the node labels,
+        as views of `node_counts`."""
+        return pd.DataFrame(self.node_counts, index=pd.Index(self.csr.nodes), columns=["Nall-", "N+"],
+                            copy=False)
+
+    def edge_frame(self, labels=False) -> pd.DataFrame:
+        """Returns the `source`, `target` and `SPLC` columns of every edge
+        index. `SPLC` is a view of `splc`; the ends are node indices, or the
+        node labels with `labels`."""
+        frame = pd.DataFrame(self.splc.reshape(-1, 1), columns=["SPLC"], copy=False)
+        heads, tails = edge_sources(self.csr), self.csr.indices
+        if labels:
+            nodes = np.empty(self.csr.number_of_nodes, dtype=object)
+            nodes[:] = self.csr.nodes
+            heads, tails = nodes[heads], nodes[tails]
+        frame.insert(0, "target", tails)
+        frame.insert(0, "source", heads)
+        return frame
+
+    def write_back(self, G):
+        """Stores the `Nall-` and `N+` node attributes and the `SPLC` edge
+        attribute in `G`, the graph `csr` was built from by `from_networkx`.
+
+        Raises
+        ----------
+        ValueError
+            If `G` does not have the nodes and edges of `csr`.
+        """
+        if len(G) != self.csr.number_of_nodes or G.number_of_edges() != self.csr.number_of_edges:
+            raise ValueError("G does not match the graph of the result")
+        nodes = self.csr.nodes
+        nx.set_node_attributes(G, dict(zip(nodes, self.n_all_minus.tolist())), "Nall-")
+        nx.set_node_attributes(G, dict(zip(nodes, self.n_plus.tolist())), "N+")
+        for (_, _, data), value in zip(G.edges(data=True), self.splc.tolist()):
+            data["SPLC"] = value
+
 
+@instrumented
 def calculate_spc(G, sources, syncs):
     """Calculate the edge weight SPC for all edges in `G` and stores
     its value in a hash inside `G where its key is the edge and value
@@ -48,6 +129,7 @@ def calculate_spc(G, sources, syncs):
             G[edge[0]][edge[1]]["SPC"] = spc
 
 
+@instrumented
 def calculate_splc_fast(G, sources, syncs):
     """Calculate the edge weight SPLC for all edges in `G` and stores
     its values in a hash inside `G where its key is the edge and value
@@ -93,6 +175,7 @@ def calculate_splc_fast(G, sources, syncs):
         G[edge[0]][edge[1]]["SPLC"] = len(all_paths_containing_edge)
 
 
+@instrumented
 def calculate_splc(G, syncs):
     """Calculate the edge weight SPLC for all edges in `G` and stores
     its values in a hash inside `G where its key is the edge and value
@@ -133,7 +216,8 @@ def calculate_splc(G, syncs):
         G[edge_head][edge_tail]["SPLC"] = paths_containing_edge
 
 
-def calculate_splc_optimized(G, syncs):
+@instrumented
+def calculate_splc_optimized(G, syncs, overflow="exact", date=None, write=True, n_jobs=1) -> SPLCResult:
     """Calculate optimally, using topological sorting and dynamic programming,
     the edge weight SPLC for all edges in `G` and stores its values in a hash
     inside `G where its key is the edge and value is the `SPLC` calculated.
@@ -145,24 +229,256 @@ def calculate_splc_optimized(G, syncs):
         syncs:  list
                 Sync nodes list
 
+        overflow: str, optional (default = 'exact')
+                  How to handle counts that do not fit in int64.
+                  Supported options: 'exact', 'log', 'raise'. With 'log'
+                  the stored values are natural logarithms.
+
+        date: str, optional
+              A node attribute, e.g., 'pln_date', to derive the topological
+              order from with `date_levels` instead of sorting the graph.
+
+        write: bool, optional (default = True)
+               Whether to store the values in `G`. Without it, `G` is left
+               untouched and `SPLCResult.write_back` stores them later.
+
+        n_jobs: int, optional (default = 1)
+                Number of worker processes. With more than one, the weakly
+                connected components are solved in parallel by
+                `calculate_splc_result_parallel`, each with its own
+                topological order, so `date` is not used.
+
         Returns
         ----------
-        None
+        SPLCResult
+            The values as arrays, aligned with `G.nodes` and `G.edges()`.
 
         Notes
         ----------
         It is important to note that this function uses topological ordering
         to calculate the `SPLC` values, and for it to work correctly, the graph
         must be acyclic.
+
+        The values are computed by `calculate_splc_result` over the CSR form
+        of `G`, and only then written back as the `Nall-` and `N+` node
+        attributes and the `SPLC` edge attribute. On large graphs these hold
+        a Python object per node and edge, so `write=False` keeps the
+        arrays only.
     """
-    topologic_order = list(nx.topological_sort(G))
-    for node in topologic_order:
-        calculate_n_all_minus(G, node)
+    csr = from_networkx(G)
+    sync_set = set(syncs)
+    sync_mask = np.fromiter((node in sync_set for node in csr.nodes), dtype=bool, count=len(csr.nodes))
+    if n_jobs != 1:
+        # The parallel module builds on this one, so it is only imported here.
+        from src.algorithms.parallel import calculate_splc_result_parallel
+        result = calculate_splc_result_parallel(csr, sync_mask, n_jobs, overflow)
+    else:
+        levels = date_levels(csr, node_dates(G, csr.nodes, date)) if date else topological_levels(csr)
+        result = calculate_splc_result(csr, sync_mask, levels, overflow)
+    if write:
+        result.write_back(G)
+    return result
+
+
+def _splc_counts(csr: CSRGraph, sync_mask, levels, overflow: str):
+    """Returns the Nall- and N+ `PathCounts` of `csr` and the SPLC of its edges."""
+    if levels is None:
+        levels = topological_levels(csr)
+    n_all_minus = calculate_n_all_minus_counts(csr, levels, overflow)
+    n_plus = calculate_n_plus_counts(csr, levels, sync_mask, overflow)
+    return n_all_minus, n_plus, multiply(n_all_minus, edge_sources(csr), n_plus, csr.indices, overflow)
+
+
+@instrumented
+def calculate_splc_array(csr: CSRGraph, sync_mask=None, levels=None, overflow="exact") -> np.ndarray:
+    """Calculate the edge weight SPLC for all edges in `csr`.
+
+        Parameters
+        ----------
+        csr: CSRGraph
 
-    reversed_top_order = list(reversed(topologic_order))
-    for node in reversed_top_order:
-        calculate_n_plus(G, node, syncs)
+        sync_mask: numpy.ndarray, optional
+                   Boolean array flagging the sync nodes. Defaults to the
+                   nodes without out-edges.
 
-    edges = list(map(list, G.edges()))
-    for edge in edges:
-        G[edge[0]][edge[1]]["SPLC"] = G.nodes[edge[0]]["Nall-"] * G.nodes[edge[1]]["N+"]
+        levels: TopologicalLevels, optional
+                The topological levels of `csr`. Computed when not given.
+
+        overflow: str, optional (default = 'exact')
+                  How to handle counts that do not fit in int64.
+                  Supported options: 'exact', 'log', 'raise'.
+
+        Returns
+        ----------
+        numpy.ndarray
+            The `SPLC` value of each edge index. An int64 array, or an object
+            array of Python ints when a value does not fit in int64. With
+            'log', the natural logarithm of the values.
+
+        Raises
+        ----------
+        networkx.NetworkXUnfeasible
+            If `csr` contains a cycle.
+
+        OverflowError
+            If a value does not fit in int64 and `overflow` is 'raise'.
+
+        Notes
+        ----------
+        Overflow is detected per topological level from a float64 estimate
+        of the counts, so only the nodes and edges that overflow leave the
+        vectorized int64 path.
+    """
+    return _splc_counts(csr, sync_mask, levels, overflow)[2]
+
+
+@instrumented
+def calculate_splc_result(csr: CSRGraph, sync_mask=None, levels=None, overflow="exact") -> SPLCResult:
+    """Calculate the edge weight SPLC for all edges in `csr`, keeping the node
+    counts it is made of.
+
+        Parameters
+        ----------
+        csr: CSRGraph
+
+        sync_mask: numpy.ndarray, optional
+                   Boolean array flagging the sync nodes. Defaults to the
+                   nodes without out-edges.
+
+        levels: TopologicalLevels, optional
+                The topological levels of `csr`. Computed when not given.
+
+        overflow: str, optional (default = 'exact')
+                  Supported options: 'exact', 'log', 'raise'.
+
+        Returns
+        ----------
+        SPLCResult
+    """
+    n_all_minus, n_plus, splc = _splc_counts(csr, sync_mask, levels, overflow)
+    node_counts = np.column_stack((materialize(n_all_minus, overflow), materialize(n_plus, overflow)))
+    return SPLCResult(csr, node_counts, splc, overflow)
+
+
+@instrumented
+def calculate_traversal_weights_array(csr: CSRGraph, kinds=("SPC", "SPLC", "SPNP"),
+                                      source_mask=None, sync_mask=None, levels=None,
+                                      overflow="exact") -> dict:
+    """Calculate the traversal edge weights `kinds` for all edges in `csr`.
+
+        Parameters
+        ----------
+        csr: CSRGraph
+
+        kinds: iterable, optional (default = ('SPC', 'SPLC', 'SPNP'))
+               The weights to calculate, among `SPC`, `SPLC`, `SPNP` and `NPPC`.
+               `NPPC` is only calculated when requested, see the Notes.
+
+        source_mask: numpy.ndarray, optional
+                     Boolean array flagging the source nodes. Defaults to the
+                     nodes without in-edges.
+
+        sync_mask: numpy.ndarray, optional
+                   Boolean array flagging the sync nodes. Defaults to the
+                   nodes without out-edges.
+
+        levels: TopologicalLevels, optional
+                The topological levels of `csr`. Computed when not given.
+
+        overflow: str, optional (default = 'exact')
+                  Supported options: 'exact', 'log', 'raise'.
+
+        Returns
+        ----------
+        dict
+            Maps each requested weight to an array with its value per edge index.
+
+        Raises
+        ----------
+        ValueError
+            If a weight is not supported.
+
+        Notes
+        ----------
+        With `u -> v` the edge, `SPC = N-(u) * N+(v)`, `SPLC = Nall-(u) * N+(v)`
+        and `SPNP = Nall-(u) * Nall+(v)`. The node counts they need are shared
+        and calculated with a single forward and a single backward sweep.
+
+        `NPPC` is the number of node pairs connected through the edge, i.e.,
+        the nodes reaching `u` times the nodes reached from `v`. It relies on
+        `calculate_reach_counts`, which takes O(V * E / 64) time and
+        O(V² / 8) bytes of memory in the worst case, so it is left out of the
+        default `kinds`. The other weights take time linear in the edges.
+    """
+    kinds = list(kinds)
+    for kind in kinds:
+        if kind not in TRAVERSAL_WEIGHTS:
+            raise ValueError(f"traversal weight not supported: {kind}")
+    if levels is None:
+        levels = topological_levels(csr)
+
+    node_kinds = {node_kind for kind in kinds if TRAVERSAL_WEIGHTS[kind]
+                  for node_kind in TRAVERSAL_WEIGHTS[kind]}
+    counts = calculate_traversal_counts(csr, node_kinds, levels, source_mask, sync_mask, overflow)
+    heads = edge_sources(csr)
+    weights = {}
+    for kind in kinds:
+        if kind == "NPPC":
+            n_ancestors, n_descendants = calculate_reach_counts(csr, levels)
+            weights[kind] = n_ancestors[heads] * n_descendants[csr.indices]
+            if overflow == "log":
+                weights[kind] = np.log(weights[kind].astype(np.float64))
+            continue
+        head_kind, tail_kind = TRAVERSAL_WEIGHTS[kind]
+        weights[kind] = multiply(counts[head_kind], heads, counts[tail_kind], csr.indices, overflow)
+    return weights
+
+
+@instrumented
+def calculate_traversal_weights(G, kinds=("SPC", "SPLC", "SPNP"), sources=None, syncs=None,
+                                overflow="exact"):
+    """Calculate the traversal edge weights `kinds` for all edges in `G`, and
+    stores each of them as an edge attribute named after the weight.
+
+        Parameters
+        ----------
+        G: networkx.DiGraph
+
+        kinds: iterable, optional (default = ('SPC', 'SPLC', 'SPNP'))
+               The weights to calculate, among `SPC`, `SPLC`, `SPNP` and `NPPC`.
+               `NPPC` is only calculated when requested: it takes O(V * E / 64)
+               time and O(V² / 8) bytes of memory, unlike the linear others.
+
+        sources: list, optional
+                 Source nodes list. Defaults to the nodes without in-edges.
+
+        syncs:  list, optional
+                Sync nodes list. Defaults to the nodes without out-edges.
+
+        overflow: str, optional (default = 'exact')
+                  Supported options: 'exact', 'log', 'raise'.
+
+        Returns
+        ----------
+        None
+
+        Notes
+        ----------
+        Unlike `calculate_spc` and `calculate_splc_fast`, no path is enumerated.
+        See `calculate_traversal_weights_array` for the definitions.
+    """
+    csr = from_networkx(G)
+    masks = []
+    for selected in (sources, syncs):
+        if selected is None:
+            masks.append(None)
+            continue
+        selected = set(selected)
+        masks.append(np.fromiter((node in selected for node in csr.nodes), dtype=bool,
+                                 count=len(csr.nodes)))
+
+    weights = calculate_traversal_weights_array(csr, kinds, masks[0], masks[1], overflow=overflow)
+    columns = [(kind, values.tolist()) for kind, values in weights.items()]
+    for index, (_, _, data) in enumerate(G.edges(data=True)):
+        for kind, values in columns:
+            data[kind] = values[index]
@@ -0,0 +1,231 @@
+"""
+Incremental SPLC and main path updates for Main Path Analysis.
+"""
+from collections import deque
+from typing import NamedTuple
+
+import networkx as nx
+
+from src.algorithms.instrumentation import instrumented
+
+__all__ = [
+    "MainPathState",
+    "update_splc",
+    "main_path_state",
+    "update_main_path"
+]
+
+
+class MainPathState(NamedTuple):
+    """The global longest path of a DAG and the dynamic programming table behind it.
+
+    `distance` maps every node to a `(length, predecessor)` pair, where
+    `length` is the weight of the longest path ending at the node and
+    `predecessor` is the node before it, or the node itself if the path
+    starts there.
+    """
+    path: list
+    distance: dict
+
+
+def _reachable(adjacency, starts) -> set:
+    """Returns the nodes reachable from `starts` in `adjacency`, including `starts`."""
+    seen = set(starts)
+    queue = deque(seen)
+    while queue:
+        node = queue.popleft()
+        for neighbour in adjacency[node]:
+            if neighbour not in seen:
+                seen.add(neighbour)
+                queue.append(neighbour)
+    return seen
+
+
+@instrumented
+def update_splc(G, edges, nodes=None, syncs=None) -> dict:
+    """Adds `nodes` and `edges` to `G` and updates its `Nall-`, `N+` and
+    `SPLC` attributes, previously calculated by `calculate_splc_optimized`.
+
+    Parameters
+    ----------
+    G : networkx.DiGraph
+        A DAG whose nodes hold `Nall-` and `N+`, and whose edges hold `SPLC`.
+
+    edges : list
+        The new edges, as `(u, v)` or `(u, v, data)` tuples.
+
+    nodes : list, optional
+        The new nodes, as labels or `(node, data)` tuples. The endpoints of
+        `edges` are added anyway.
+
+    syncs : list, optional
+        Sync nodes list. Defaults to the nodes without out-edges.
+
+    Returns
+    -------
+    dict
+        Maps every edge whose `SPLC` was written to its previous value, or
+        None for the new edges.
+
+    Raises
+    ------
+    networkx.NetworkXUnfeasible
+        If the new edges close a cycle. `G` is left unchanged.
+
+    Notes
+    -----
+    Only the descendants of the new edges' targets have their `Nall-`
+    recalculated, and only the ancestors of the new edges' sources have
+    their `N+` recalculated, in topological order of the affected subgraph.
+    The `SPLC` is then rewritten for the new edges, and for the edges leaving
+    a node of the first set or entering a node of the second one.
+    """
+    edges = list(edges)
+    nodes = list(nodes) if nodes is not None else []
+    existing_nodes = set(G)
+    new_edges = [edge[:2] for edge in edges if not G.has_edge(*edge[:2])]
+    # The data of the existing nodes and edges is updated in place, so it is kept to roll back.
+    edge_data = {edge[:2]: dict(G.edges[edge[:2]]) for edge in edges if G.has_edge(*edge[:2])}
+    node_data = {node[0]: dict(G.nodes[node[0]]) for node in nodes
+                 if isinstance(node, tuple) and len(node) == 2 and isinstance(node[1], dict)
+                 and node[0] in existing_nodes}
+    G.add_nodes_from(nodes)
+    G.add_edges_from(edges)
+    added_nodes = []
+    if len(G) > len(existing_nodes):
+        added_nodes = [node for node in G if node not in existing_nodes]
+
+    forward = _reachable(G.succ, [v for _, v in new_edges] + added_nodes)
+    backward = _reachable(G.pred, [u for u, _ in new_edges] + added_nodes)
+    try:
+        forward_order = list(nx.topological_sort(G.subgraph(forward)))
+    except nx.NetworkXUnfeasible:
+        G.remove_edges_from(new_edges)
+        G.remove_nodes_from(added_nodes)
+        for views, saved in ((G.edges, edge_data), (G.nodes, node_data)):
+            for key, data in saved.items():
+                views[key].clear()
+                views[key].update(data)
+        raise
+
+    sync_set = set(syncs) if syncs is not None else None
+    for node in forward_order:
+        G.nodes[node]["Nall-"] = 1 + sum(G.nodes[u]["Nall-"] for u in G.pred[node])
+    for node in reversed(list(nx.topological_sort(G.subgraph(backward)))):
+        is_sync = node in sync_set if sync_set is not None else not G.succ[node]
+        G.nodes[node]["N+"] = 1 if is_sync else sum(G.nodes[v]["N+"] for v in G.succ[node])
+
+    changes = {}
+    # A new edge between two old nodes leaves none of them nor enters the other.
+    touched = set(new_edges)
+    touched.update((u, v) for u in forward for v in G.succ[u])
+    touched.update((u, v) for v in backward for u in G.pred[v])
+    for u, v in touched:
+        data = G[u][v]
+        changes[(u, v)] = data.get("SPLC")
+        data["SPLC"] = G.nodes[u]["Nall-"] * G.nodes[v]["N+"]
+    return changes
+
+
+def _relax(G, node, distance, weight, default_weight):
+    candidates = [(distance[u][0] + data.get(weight, default_weight), u)
+                  for u, data in G.pred[node].items()]
+    best = max(candidates, key=lambda x: x[0]) if candidates else (0, node)
+    distance[node] = best if best[0] >= 0 else (0, node)
+
+
+def _backtrack(distance, end) -> list:
+    path = [end]
+    node = end
+    while distance[node][1] != node:
+        node = distance[node][1]
+        path.append(node)
+    path.reverse()
+    return path
+
+
+@instrumented
+def main_path_state(G, weight="SPLC", default_weight=1) -> MainPathState:
+    """Returns the global longest path of `G` with its dynamic programming table.
+
+    Parameters
+    ----------
+    G : networkx.DiGraph
+        A weighted directed acyclic graph (DAG)
+
+    weight : string, optional (default = 'SPLC')
+        Edge data key to use for weight
+
+    default_weight : int, optional
+        The weight of edges that do not have a weight attribute
+
+    Returns
+    -------
+    MainPathState
+        Its path is the one returned by `networkx.dag_longest_path`.
+    """
+    distance: dict = {}
+    for node in nx.topological_sort(G):
+        _relax(G, node, distance, weight, default_weight)
+    if not distance:
+        return MainPathState([], distance)
+    end = max(distance, key=lambda node: distance[node][0])
+    return MainPathState(_backtrack(distance, end), distance)
+
+
+@instrumented
+def update_main_path(G, state: MainPathState, changes: dict, weight="SPLC", default_weight=1):
+    """Updates `state` after the edge weights in `changes` were modified.
+
+    Parameters
+    ----------
+    G : networkx.DiGraph
+        A weighted directed acyclic graph (DAG)
+
+    state : MainPathState
+        The state of `G` before the changes, updated in place.
+
+    changes : dict
+        Maps every modified or new edge to its previous weight, or None for
+        new edges, as returned by `update_splc`.
+
+    weight : string, optional (default = 'SPLC')
+        Edge data key to use for weight
+
+    default_weight : int, optional
+        The weight of edges that do not have a weight attribute
+
+    Returns
+    -------
+    state : MainPathState
+        The updated state.
+
+    changed : bool
+        Whether the main path changed.
+
+    Notes
+    -----
+    Only the descendants of the changed edges have their longest path
+    length recalculated. When no weight decreased, lengths only grow, so
+    the new path ends either at the previous end or at one of those nodes,
+    and the whole graph is not scanned. The path is rebuilt only if its end
+    or one of its nodes was affected.
+    """
+    distance = state.distance
+    affected = _reachable(G.succ, {v for _, v in changes} | {u for u, _ in changes if u not in distance})
+    order = list(nx.topological_sort(G.subgraph(affected)))
+    for node in order:
+        _relax(G, node, distance, weight, default_weight)
+
+    decreased = any(old is not None and G[u][v].get(weight, default_weight) < old
+                    for (u, v), old in changes.items())
+    if decreased or not state.path:
+        candidates = distance
+    else:
+        candidates = [state.path[-1]] + order
+    end = max(candidates, key=lambda node: distance[node][0])
+    if state.path and end == state.path[-1] and affected.isdisjoint(state.path):
+        return state, False
+
+    path = _backtrack(distance, end)
+    return MainPathState(path, distance), path != state.path
@@ -0,0 +1,179 @@
+"""
+Opt-in instrumentation of the Main Path Analysis algorithms.
+
+Nothing is measured unless a `Recorder` is active:
+
+    with record(trace_memory=True) as recorder:
+        calculate_splc_optimized(G, syncs)
+    recorder.to_json("metrics.json")
+
+While it is active, every `stage` records its wall and CPU time and peak
+memory, and `count` adds domain counters, e.g., the edges removed, to the
+innermost open stage. The instrumented algorithms open a stage named after
+themselves, nested in the stages of the caller.
+"""
+import functools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+__all__ = [
+    "Recorder",
+    "record",
+    "stage",
+    "count",
+    "instrumented",
+    "peak_rss"
+]
+
+# The active recorder, if any, of the current thread or task.
+_recorder: ContextVar[Optional["Recorder"]] = ContextVar("recorder", default=None)
+
+
+def peak_rss():
+    """Returns the peak resident set size of the process in bytes, or None
+    where the `resource` module is not available."""
+    if resource is None:  # pragma: no cover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Recorder:
+    """Collects the stages and counters of an instrumented run.
+
+    `stages` holds one dict per stage in the order they were opened, with
+    its `name`, the `path` of names from the outermost stage, `wall_time`
+    and `cpu_time` in seconds, `peak_rss` and `peak_traced` in bytes, and
+    its `counters`. `counters` holds the totals of the whole run.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages: list = []
+        self.counters: dict = {}
+        self._open: list = []
+
+    def _fold_traced_peak(self):
+        """Adds the traced peak since the last reset to every open stage."""
+        if not self.trace_memory:
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for entry in self._open:
+            entry["peak_traced"] = max(entry["peak_traced"], peak)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Records the stage `name` while the block runs."""
+        self._fold_traced_peak()
+        path = "/".join([entry["name"] for entry in self._open] + [name])
+        entry = {"name": name, "path": path, "wall_time": None, "cpu_time": None, "peak_rss": None,
+                 "peak_traced": 0 if self.trace_memory else None, "counters": {}}
+        self.stages.append(entry)
+        self._open.append(entry)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        finally:
+            entry["wall_time"] = time.perf_counter() - wall
+            entry["cpu_time"] = time.process_time() - cpu
+            entry["peak_rss"] = peak_rss()
+            self._fold_traced_peak()
+            self._open.pop()
+
+    def count(self, name: str, value=1):
+        """Adds `value` to the counter `name` of the innermost open stage."""
+        value = int(value)
+        if self._open:
+            counters = self._open[-1]["counters"]
+            counters[name] = counters.get(name, 0) + value
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        """Returns the recorded data, JSON serializable."""
+        return {"python": platform.python_version(), "peak_rss": peak_rss(),
+                "trace_memory": self.trace_memory, "stages": self.stages, "counters": self.counters}
+
+    def to_json(self, path=None, indent=2) -> str:
+        """Returns the recorded data as JSON, also written to `path` if given."""
+        text = json.dumps(self.to_dict(), indent=indent)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write(text)
+        return text
+
+
+@contextmanager
+def record(trace_memory=False):
+    """Activates a new `Recorder` while the block runs, and yields it.
+
+    Parameters
+    ----------
+    trace_memory : bool, optional (default = False)
+        Whether to record the peak memory allocated by Python in each stage
+        with `tracemalloc`, which slows allocations down noticeably.
+
+    Notes
+    -----
+    The `peak_rss` of a stage is the peak of the whole process up to the
+    end of the stage, as the operating system reports it. Before Python
+    3.9, the traced peak of a stage also covers the stages before it.
+    Work done in worker processes is timed, but not counted, and the
+    recorder is only active in the thread that opened it.
+    """
+    started = trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    recorder = Recorder(trace_memory)
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+        if started:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name: str):
+    """Records the stage `name` in the active recorder, if any, and yields
+    its entry, or None."""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield None
+        return
+    with recorder.stage(name) as entry:
+        yield entry
+
+
+def count(name: str, value=1):
+    """Adds `value` to the counter `name` of the active recorder, if any."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.count(name, value)
+
+
+def instrumented(function):
+    """Decorates `function` to run in a stage named after it when a recorder
+    is active."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        recorder = _recorder.get()
+        if recorder is None:
+            return function(*args, **kwargs)
+        with recorder.stage(function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
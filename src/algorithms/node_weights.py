@@ -1,10 +1,21 @@
 """
 Node weight calculation methods for Main Path Analysis.
 """
+import numpy as np
+
+from src.algorithms.counting import PathCounts, accumulate, assign, materialize, new_counts
+from src.algorithms.csr import CSRGraph, segment_ranges, topological_levels, transpose
+from src.algorithms.instrumentation import count
 
 __all__ = [
     "calculate_n_all_minus",
     "calculate_n_plus",
+    "calculate_n_all_minus_counts",
+    "calculate_n_plus_counts",
+    "calculate_traversal_counts",
+    "calculate_reach_counts",
+    "calculate_n_all_minus_array",
+    "calculate_n_plus_array"
 ]
 
 
@@ -75,3 +86,282 @@ def calculate_n_plus(G, node: str, syncs: list):
 
     for successor in G.successors(node):
         G.nodes[node]["N+"] += G.nodes[successor]["N+"]
+
+
+def accumulate_block(nodes: np.ndarray, lengths: np.ndarray, neighbours: np.ndarray, accumulators: list,
+                     overflow: str):
+    """Sets each node of every accumulator to its base plus the sum of the
+    counts of its neighbours, which are the concatenated segments of
+    `neighbours` with the given `lengths`.
+
+    `accumulators` holds `(counts, base, seed_mask)` triples. Seed nodes are
+    set to one instead, and nodes without neighbours keep their fill value.
+    No node may be a neighbour of another node of the block.
+    """
+    count("nodes_processed", len(nodes))
+    count("edges_processed", len(neighbours))
+    inner = lengths > 0
+    updated, lengths = nodes[inner], lengths[inner]
+    for counts, base, seed_mask in accumulators:
+        if seed_mask is not None:
+            assign(counts, nodes[seed_mask[nodes]], 1)
+        if not len(updated):
+            continue
+        if seed_mask is None or not seed_mask[updated].any():
+            accumulate(counts, updated, neighbours, lengths, base, overflow)
+            continue
+        keep = ~seed_mask[updated]
+        if keep.any():
+            accumulate(counts, updated[keep], neighbours[np.repeat(keep, lengths)], lengths[keep],
+                       base, overflow)
+
+
+def _sweep(csr: CSRGraph, levels, accumulators: list, overflow: str, descending=False):
+    """Visits the levels of `csr` once, running `accumulate_block` on each of
+    them with the neighbours of its nodes in `csr`."""
+    ks = range(levels.number_of_levels - 1, -1, -1) if descending else range(levels.number_of_levels)
+    for k in ks:
+        level = levels.level(k)
+        starts = csr.indptr[level]
+        lengths = csr.indptr[level + 1] - starts
+        neighbours = csr.indices[segment_ranges(starts, lengths)]
+        accumulate_block(level, lengths, neighbours, accumulators, overflow)
+
+
+def calculate_traversal_counts(csr: CSRGraph, kinds, levels=None, source_mask=None, sync_mask=None,
+                               overflow="exact") -> dict:
+    """Calculate several node path counts with one forward and one backward sweep.
+
+        Parameters
+        ----------
+        csr: CSRGraph
+
+        kinds: iterable
+               The counts to calculate, among `N-`, `Nall-`, `N+` and `Nall+`.
+
+        levels: TopologicalLevels, optional
+                The topological levels of `csr`. Computed when not given.
+
+        source_mask: numpy.ndarray, optional
+                     Boolean array flagging the source nodes used by `N-`.
+                     Defaults to the nodes without in-edges.
+
+        sync_mask: numpy.ndarray, optional
+                   Boolean array flagging the sync nodes used by `N+`.
+                   Defaults to the nodes without out-edges.
+
+        overflow: str, optional (default = 'exact')
+                  Supported options: 'exact', 'log', 'raise'.
+
+        Returns
+        ----------
+        dict
+            Maps each requested kind to its `PathCounts`.
+
+        Raises
+        ----------
+        ValueError
+            If a kind is not supported.
+
+        Notes
+        ----------
+        `N-` counts the paths from a source to the node, and `Nall-` the paths
+        from any node. `N+` counts the paths from the node to a sync, and
+        `Nall+` the paths to any node. All of them count the empty path.
+    """
+    kinds = list(kinds)
+    for kind in kinds:
+        if kind not in ("N-", "Nall-", "N+", "Nall+"):
+            raise ValueError(f"node count not supported: {kind}")
+    if levels is None:
+        levels = topological_levels(csr)
+    n = csr.number_of_nodes
+    if source_mask is None:
+        source_mask = np.bincount(csr.indices, minlength=n) == 0
+    if sync_mask is None:
+        sync_mask = np.diff(csr.indptr) == 0
+
+    specs = {"N-": (0, source_mask), "Nall-": (1, None), "N+": (0, sync_mask), "Nall+": (1, None)}
+    result = {kind: new_counts(n, fill=specs[kind][0]) for kind in kinds}
+    forward = [(result[kind],) + specs[kind] for kind in ("N-", "Nall-") if kind in result]
+    backward = [(result[kind],) + specs[kind] for kind in ("N+", "Nall+") if kind in result]
+    if forward:
+        _sweep(transpose(csr)[0], levels, forward, overflow)
+    if backward:
+        _sweep(csr, levels, backward, overflow, descending=True)
+    return result
+
+
+def calculate_reach_counts(csr: CSRGraph, levels=None):
+    """Calculate, for every node, the number of nodes it can be reached from
+    and the number of nodes it reaches, both including itself.
+
+        Parameters
+        ----------
+        csr: CSRGraph
+
+        levels: TopologicalLevels, optional
+                The topological levels of `csr`. Computed when not given.
+
+        Returns
+        ----------
+        n_ancestors : numpy.ndarray
+
+        n_descendants : numpy.ndarray
+
+        Notes
+        ----------
+        Reachability is not a path count, so it cannot be summed like `N-`.
+        Each node keeps its reachable set as a Python int bitset, merged with
+        bitwise or along the topological order and dropped as soon as its
+        last neighbour is done. The worst case is O(V * E / 64) time and
+        O(V² / 8) bytes of memory.
+    """
+    if levels is None:
+        levels = topological_levels(csr)
+    reverse, _ = transpose(csr)
+    order = levels.order.tolist()
+    n_ancestors = _count_reach(reverse, csr, order)
+    n_descendants = _count_reach(csr, reverse, order[::-1])
+    return n_ancestors, n_descendants
+
+
+def _count_reach(incoming: CSRGraph, outgoing: CSRGraph, order: list) -> np.ndarray:
+    reach_counts = np.zeros(incoming.number_of_nodes, dtype=np.int64)
+    remaining = np.diff(outgoing.indptr).tolist()
+    indptr, indices = incoming.indptr.tolist(), incoming.indices.tolist()
+    reach: dict = {}
+    for node in order:
+        bits = 1 << node
+        for neighbour in indices[indptr[node]:indptr[node + 1]]:
+            bits |= reach[neighbour]
+            remaining[neighbour] -= 1
+            if not remaining[neighbour]:
+                del reach[neighbour]
+        reach_counts[node] = bin(bits).count("1")
+        if remaining[node]:
+            reach[node] = bits
+    return reach_counts
+
+
+def calculate_n_all_minus_counts(csr: CSRGraph, levels=None, overflow="exact") -> PathCounts:
+    """Calculate the node Nall⁻ weight for every node in `csr` at once.
+
+        Parameters
+        ----------
+        csr: CSRGraph
+
+        levels: TopologicalLevels, optional
+                The topological levels of `csr`. Computed when not given.
+
+        overflow: str, optional (default = 'exact')
+                  How to handle counts that do not fit in int64.
+                  Supported options: 'exact', 'log', 'raise'.
+
+        Returns
+        ----------
+        PathCounts
+            The `Nall-` value of each node index.
+
+        Notes
+        ----------
+        The recurrence is the same as in `calculate_n_all_minus`, but each
+        topological level is summed with a single `numpy.add.reduceat` over
+        the in-edges of its nodes.
+    """
+    if levels is None:
+        levels = topological_levels(csr)
+
+    reverse, _ = transpose(csr)
+    n_all_minus = new_counts(csr.number_of_nodes, fill=1)
+    _sweep(reverse, levels, [(n_all_minus, 1, None)], overflow)
+    return n_all_minus
+
+
+def calculate_n_plus_counts(csr: CSRGraph, levels=None, sync_mask=None, overflow="exact") -> PathCounts:
+    """Calculate the node N⁺ weight for every node in `csr` at once.
+
+        Parameters
+        ----------
+        csr: CSRGraph
+
+        levels: TopologicalLevels, optional
+                The topological levels of `csr`. Computed when not given.
+
+        sync_mask: numpy.ndarray, optional
+                   Boolean array flagging the sync nodes. Defaults to the
+                   nodes without out-edges.
+
+        overflow: str, optional (default = 'exact')
+                  How to handle counts that do not fit in int64.
+                  Supported options: 'exact', 'log', 'raise'.
+
+        Returns
+        ----------
+        PathCounts
+            The `N+` value of each node index.
+
+        Notes
+        ----------
+        The levels are visited in reverse order. Sync nodes and nodes without
+        out-edges are left out of the reduction, and the sync flag replaces
+        the membership test against a list done by `calculate_n_plus`.
+    """
+    if levels is None:
+        levels = topological_levels(csr)
+    if sync_mask is None:
+        sync_mask = np.diff(csr.indptr) == 0
+
+    n_plus = new_counts(csr.number_of_nodes)
+    _sweep(csr, levels, [(n_plus, 0, sync_mask)], overflow, descending=True)
+    return n_plus
+
+
+def calculate_n_all_minus_array(csr: CSRGraph, levels=None, overflow="exact") -> np.ndarray:
+    """Calculate the node Nall⁻ weight for every node in `csr` as an array.
+
+        Parameters
+        ----------
+        csr: CSRGraph
+
+        levels: TopologicalLevels, optional
+                The topological levels of `csr`. Computed when not given.
+
+        overflow: str, optional (default = 'exact')
+                  Supported options: 'exact', 'log', 'raise'.
+
+        Returns
+        ----------
+        numpy.ndarray
+            An int64 array, or an object array of Python ints when a count
+            does not fit in int64. With 'log', the natural logarithm of the
+            counts.
+    """
+    return materialize(calculate_n_all_minus_counts(csr, levels, overflow), overflow)
+
+
+def calculate_n_plus_array(csr: CSRGraph, levels=None, sync_mask=None, overflow="exact") -> np.ndarray:
+    """Calculate the node N⁺ weight for every node in `csr` as an array.
+
+        Parameters
+        ----------
+        csr: CSRGraph
+
+        levels: TopologicalLevels, optional
+                The topological levels of `csr`. Computed when not given.
+
+        sync_mask: numpy.ndarray, optional
+                   Boolean array flagging the sync nodes. Defaults to the
+                   nodes without out-edges.
+
+        overflow: str, optional (default = 'exact')
+                  Supported options: 'exact', 'log', 'raise'.
+
+        Returns
+        ----------
+        numpy.ndarray
+            An int64 array, or an object array of Python ints when a count
+            does not fit in int64. With 'log', the natural logarithm of the
+            counts.
+    """
+    return materialize(calculate_n_plus_counts(csr, levels, sync_mask, overflow), overflow)
@@ -0,0 +1,294 @@
+"""
+Out-of-core SPLC and main path calculation for Main Path Analysis.
+"""
+import os
+from typing import NamedTuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from src.algorithms.counting import multiply, new_counts
+from src.algorithms.csr import CSRGraph, TopologicalLevels, NODE_DTYPE, OFFSET_DTYPE, segment_ranges, \
+    topological_levels
+from src.algorithms.instrumentation import instrumented
+from src.algorithms.node_weights import accumulate_block
+from src.algorithms.paths import path_ends, path_starts, relax_block, trace_path
+
+__all__ = [
+    "SortedEdges",
+    "sort_edges",
+    "calculate_splc_out_of_core",
+    "main_path_out_of_core"
+]
+
+BLOCK_SIZE = 2 ** 22
+
+
+class SortedEdges(NamedTuple):
+    """The edges of a DAG stored in topological order in memory-mapped files.
+
+    `in_sources[in_offsets[i]:in_offsets[i + 1]]` are the predecessors of the
+    node `levels.order[i]`, and `in_edge_ids` their edge index in the graph.
+    `out_targets[out_offsets[i]:out_offsets[i + 1]]` are its successors.
+    Only `levels` and the offsets, one entry per node, are held in memory.
+    """
+    directory: str
+    levels: TopologicalLevels
+    in_offsets: np.ndarray
+    in_sources: np.ndarray
+    in_edge_ids: np.ndarray
+    out_offsets: np.ndarray
+    out_targets: np.ndarray
+
+
+def _edge_heads(csr: CSRGraph, start: int, stop: int) -> np.ndarray:
+    """Returns the source node index of the edges from `start` to `stop`."""
+    heads = np.searchsorted(csr.indptr, np.arange(start, stop), side="right") - 1
+    return heads.astype(NODE_DTYPE)
+
+
+def _in_degree(csr: CSRGraph, block_size: int) -> np.ndarray:
+    in_degree = np.zeros(csr.number_of_nodes, dtype=np.int64)
+    for start in range(0, csr.number_of_edges, block_size):
+        in_degree += np.bincount(csr.indices[start:start + block_size], minlength=csr.number_of_nodes)
+    return in_degree
+
+
+def _node_blocks(offsets: np.ndarray, start: int, stop: int, block_size: int):
+    """Splits the positions from `start` to `stop` into ranges of at most
+    `block_size` edges, or a single node when it has more edges."""
+    while start < stop:
+        end = int(np.searchsorted(offsets, offsets[start] + block_size, side="right")) - 1
+        end = min(max(end, start + 1), stop)
+        yield start, end
+        start = end
+
+
+def _level_blocks(levels: TopologicalLevels, offsets: np.ndarray, block_size: int, descending=False):
+    """Splits every level into node ranges with `_node_blocks`, so that no
+    node of a block depends on another one."""
+    ks = range(levels.number_of_levels - 1, -1, -1) if descending else range(levels.number_of_levels)
+    for k in ks:
+        start, stop = int(levels.level_ptr[k]), int(levels.level_ptr[k + 1])
+        yield from _node_blocks(offsets, start, stop, block_size)
+
+
+@instrumented
+def sort_edges(csr: CSRGraph, directory, levels=None, block_size=BLOCK_SIZE) -> SortedEdges:
+    """Writes the edges of `csr` in topological order to memory-mapped files.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+        A directed acyclic graph (DAG), whose arrays may be memory-mapped,
+        e.g., from `utils.snapshot.open_snapshot`.
+
+    directory : str
+        The directory of the `.npy` files, created if needed.
+
+    levels : TopologicalLevels, optional
+        The topological levels of `csr`. Computed when not given.
+
+    block_size : int, optional
+        The number of edges read at a time.
+
+    Returns
+    -------
+    SortedEdges
+
+    Raises
+    ------
+    networkx.NetworkXUnfeasible
+        If `csr` contains a cycle.
+
+    Notes
+    -----
+    The in-edges are placed with a counting sort by target: every block of
+    edges is written at the next free positions of its targets, so only
+    arrays with one entry per node and one block of edges are in memory.
+    The out-edges are copied row by row in topological order.
+    """
+    n, m = csr.number_of_nodes, csr.number_of_edges
+    os.makedirs(directory, exist_ok=True)
+    in_degree = _in_degree(csr, block_size)
+    if levels is None:
+        levels = topological_levels(csr, in_degree)
+    order = levels.order
+
+    in_offsets = np.zeros(n + 1, dtype=OFFSET_DTYPE)
+    np.cumsum(in_degree[order], out=in_offsets[1:])
+    out_offsets = np.zeros(n + 1, dtype=OFFSET_DTYPE)
+    np.cumsum(np.diff(csr.indptr)[order], out=out_offsets[1:])
+    files = {name: open_memmap(os.path.join(directory, name + ".npy"), mode="w+", dtype=dtype,
+                               shape=(m,))
+             for name, dtype in (("in_sources", NODE_DTYPE), ("in_edge_ids", OFFSET_DTYPE),
+                                 ("out_targets", NODE_DTYPE))}
+
+    free = np.empty(n, dtype=OFFSET_DTYPE)
+    free[order] = in_offsets[:-1]
+    for start in range(0, m, block_size):
+        stop = min(start + block_size, m)
+        targets = np.asarray(csr.indices[start:stop])
+        block_order = np.argsort(targets, kind="stable")
+        targets = targets[block_order]
+        unique, first, counts = np.unique(targets, return_index=True, return_counts=True)
+        positions = free[targets] + np.arange(len(targets)) - np.repeat(first, counts)
+        files["in_sources"][positions] = _edge_heads(csr, start, stop)[block_order]
+        files["in_edge_ids"][positions] = start + block_order
+        free[unique] += counts
+
+    for start, stop in _node_blocks(out_offsets, 0, n, block_size):
+        nodes = order[start:stop]
+        positions = csr.indptr[nodes]
+        edge_ids = segment_ranges(positions, csr.indptr[nodes + 1] - positions)
+        files["out_targets"][out_offsets[start]:out_offsets[stop]] = csr.indices[edge_ids]
+
+    for array in files.values():
+        array.flush()
+    return SortedEdges(directory, levels, in_offsets, files["in_sources"], files["in_edge_ids"],
+                       out_offsets, files["out_targets"])
+
+
+@instrumented
+def calculate_splc_out_of_core(csr: CSRGraph, edges: SortedEdges, sync_mask=None, overflow="raise",
+                               output=None, block_size=BLOCK_SIZE) -> np.ndarray:
+    """Calculate the edge weight SPLC for all edges in `csr`, streaming its edges
+    from memory-mapped files.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+
+    edges : SortedEdges
+        The edges of `csr`, as returned by `sort_edges`.
+
+    sync_mask : numpy.ndarray, optional
+        Boolean array flagging the sync nodes. Defaults to the nodes without
+        out-edges.
+
+    overflow : str, optional (default = 'raise')
+        Supported options: 'raise', 'log'.
+
+    output : str, optional
+        The `.npy` file to write, overwritten if it exists. Defaults to
+        `splc.npy` in the directory of `edges`.
+
+    block_size : int, optional
+        The number of edges read at a time.
+
+    Returns
+    -------
+    numpy.ndarray
+        The SPLC of each edge index, memory-mapped from `output`. With 'log',
+        the natural logarithm of every SPLC.
+
+    Raises
+    ------
+    ValueError
+        If `overflow` is 'exact', since Python ints cannot be memory-mapped.
+
+    OverflowError
+        If a count does not fit in int64 and `overflow` is 'raise'.
+
+    Notes
+    -----
+    The same level sweeps as `calculate_splc_array` are run block by block:
+    `Nall-` pulls from the in-edges in topological order and `N+` from the
+    out-edges in reverse order. Blocks never cross a level, so the counts a
+    block reads are final. Resident memory is bounded by the node arrays
+    plus one block of edges.
+    """
+    if overflow not in ("raise", "log"):
+        raise ValueError(f"overflow mode not supported out of core: {overflow}")
+    order, n = edges.levels.order, csr.number_of_nodes
+    if sync_mask is None:
+        sync_mask = np.diff(csr.indptr) == 0
+
+    n_all_minus = new_counts(n, fill=1)
+    for start, stop in _level_blocks(edges.levels, edges.in_offsets, block_size):
+        offsets = edges.in_offsets[start:stop + 1]
+        predecessors = np.asarray(edges.in_sources[offsets[0]:offsets[-1]])
+        accumulate_block(order[start:stop], np.diff(offsets), predecessors, [(n_all_minus, 1, None)],
+                         overflow)
+
+    n_plus = new_counts(n)
+    for start, stop in _level_blocks(edges.levels, edges.out_offsets, block_size, descending=True):
+        offsets = edges.out_offsets[start:stop + 1]
+        successors = np.asarray(edges.out_targets[offsets[0]:offsets[-1]])
+        accumulate_block(order[start:stop], np.diff(offsets), successors, [(n_plus, 0, sync_mask)],
+                         overflow)
+
+    if output is None:
+        output = os.path.join(edges.directory, "splc.npy")
+    splc = open_memmap(output, mode="w+",
+                       dtype=np.float64 if overflow == "log" else np.int64, shape=(csr.number_of_edges,))
+    for start in range(0, csr.number_of_edges, block_size):
+        stop = min(start + block_size, csr.number_of_edges)
+        splc[start:stop] = multiply(n_all_minus, _edge_heads(csr, start, stop), n_plus,
+                                    np.asarray(csr.indices[start:stop]), overflow)
+    splc.flush()
+    return splc
+
+
+@instrumented
+def main_path_out_of_core(edges: SortedEdges, weights: np.ndarray, method="longest", source=None,
+                          target=None, block_size=BLOCK_SIZE) -> np.ndarray:
+    """Compute the main path streaming the edges from memory-mapped files.
+
+    Parameters
+    ----------
+    edges : SortedEdges
+        The edges of a DAG, as returned by `sort_edges`.
+
+    weights : numpy.ndarray
+        The weight of each edge index, e.g., as returned by
+        `calculate_splc_out_of_core`. It may be memory-mapped.
+
+    method : string, optional (default = 'longest')
+        Supported options: 'longest', 'shortest'.
+
+    source : int, optional
+        Index of the starting node, as in `main_path_array`.
+
+    target : int, optional
+        Index of the ending node, as in `main_path_array`.
+
+    block_size : int, optional
+        The number of edges read at a time.
+
+    Returns
+    -------
+    numpy.ndarray
+        The same path as `main_path_array`.
+
+    Raises
+    ------
+    ValueError
+        If `method` is not among the supported options.
+
+    networkx.NetworkXNoPath
+        If `target` is not reachable from `source`.
+    """
+    if method not in ("longest", "shortest"):
+        raise ValueError(f"method not supported: {method}")
+    order = edges.levels.order
+    n = len(order)
+    if not n:
+        return np.zeros(0, dtype=np.int64)
+
+    in_degree = np.empty(n, dtype=np.int64)
+    in_degree[order] = np.diff(edges.in_offsets)
+    out_degree = np.empty(n, dtype=np.int64)
+    out_degree[order] = np.diff(edges.out_offsets)
+    starts, restart = path_starts(in_degree, method, source)
+    table = (np.zeros(n, dtype=weights.dtype), np.arange(n), starts.copy())
+    for start, stop in _level_blocks(edges.levels, edges.in_offsets, block_size):
+        offsets = edges.in_offsets[start:stop + 1]
+        edge_ids = np.asarray(edges.in_edge_ids[offsets[0]:offsets[-1]])
+        predecessors = np.asarray(edges.in_sources[offsets[0]:offsets[-1]])
+        relax_block(order[start:stop], np.diff(offsets), predecessors, np.asarray(weights[edge_ids]),
+                    table, starts, method, restart)
+
+    distance, predecessor, reached = table
+    ends = path_ends(distance, reached, out_degree, method, target)
+    return trace_path(predecessor, ends, order)
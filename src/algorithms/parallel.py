@@ -0,0 +1,242 @@
+"""
+Process-parallel SPLC calculation for Main Path Analysis.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.algorithms.csr import CSRGraph, NODE_DTYPE, OFFSET_DTYPE, edge_sources, subgraph, \
+    weakly_connected_components
+from src.algorithms.dag import add_artificial_source_sync_array
+from src.algorithms.edge_weights import SPLCResult, calculate_splc_array, calculate_splc_result
+from src.algorithms.instrumentation import instrumented
+
+__all__ = [
+    "pack_components",
+    "calculate_splc_result_parallel",
+    "calculate_splc_parallel"
+]
+
+
+def pack_components(labels: np.ndarray, edge_counts: np.ndarray, n_bins: int) -> np.ndarray:
+    """Assigns the components to `n_bins` bins balanced by number of edges.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        The component label of every node.
+
+    edge_counts : numpy.ndarray
+        The number of edges of every component.
+
+    n_bins : int
+
+    Returns
+    -------
+    numpy.ndarray
+        The bin of every component.
+
+    Notes
+    -----
+    It is the longest processing time first heuristic: components are taken
+    from the largest to the smallest, each one going to the lightest bin.
+    """
+    n_components = len(edge_counts)
+    bins = np.zeros(n_components, dtype=np.int64)
+    loads = [0] * n_bins
+    sizes = np.bincount(labels, minlength=n_components)
+    # Nodes are counted as well, so that edgeless components are spread too.
+    for component in np.argsort(-(edge_counts + sizes), kind="stable").tolist():
+        lightest = loads.index(min(loads))
+        bins[component] = lightest
+        loads[lightest] += int(edge_counts[component] + sizes[component])
+    return bins
+
+
+def _share(array: np.ndarray, blocks: list) -> tuple:
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block.name, array.shape, array.dtype.str
+
+
+def _attach(spec: tuple, blocks: list) -> np.ndarray:
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    blocks.append(block)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _artificial(sub: CSRGraph) -> CSRGraph:
+    """Returns `add_artificial_source_sync_array(sub)`, also when `sub` has no
+    edges, as the nodes of a bin without edges still get the artificial
+    edges of the whole graph."""
+    if sub.number_of_edges:
+        return add_artificial_source_sync_array(sub)
+    m = sub.number_of_nodes
+    indptr = np.concatenate((np.arange(m + 1), [2 * m, 2 * m])).astype(OFFSET_DTYPE)
+    indices = np.concatenate((np.full(m, m + 1), np.arange(m))).astype(NODE_DTYPE)
+    return CSRGraph(None, indptr, indices)
+
+
+def _solve_bin(arrays: list, bin_id: int, overflow: str, artificial: bool):
+    indptr, indices, sync_mask, node_bins, output, node_output, artificial_indptr, source_rank = arrays
+    node_ids = np.flatnonzero(node_bins == bin_id)
+    sub, edge_ids = subgraph(CSRGraph(None, indptr, indices), node_ids)
+    if artificial:
+        # The bin gets its own artificial source and sync, which give its edges
+        # the SPLC of the whole graph with a single source and sync.
+        local = _artificial(sub)
+        heads = edge_sources(local)
+        offsets = np.arange(local.number_of_edges) - local.indptr[heads]
+        real = heads < len(node_ids)
+        edge_ids = np.empty(local.number_of_edges, dtype=np.int64)
+        edge_ids[real] = artificial_indptr[node_ids[heads[real]]] + offsets[real]
+        edge_ids[~real] = artificial_indptr[len(node_bins)] + source_rank[node_ids[local.indices[~real]]]
+        result = calculate_splc_result(local, overflow=overflow)
+    else:
+        result = calculate_splc_result(sub, sync_mask[node_ids], overflow=overflow)
+    if result.splc.dtype == object or result.node_counts.dtype == object:
+        return edge_ids, result.splc, node_ids, None if artificial else result.node_counts
+    output[edge_ids] = result.splc
+    if not artificial:
+        node_output[node_ids] = result.node_counts
+    return None
+
+
+def _splc_bin(task: tuple):
+    """Calculates the SPLC of the edges in one bin, writing them to the shared output."""
+    bin_id, specs, overflow, artificial = task
+    blocks: list = []
+    try:
+        arrays = [_attach(spec, blocks) for spec in specs]
+        result = _solve_bin(arrays, bin_id, overflow, artificial)
+        del arrays
+        return result
+    finally:
+        for block in blocks:
+            block.close()
+
+
+@instrumented
+def calculate_splc_result_parallel(csr: CSRGraph, sync_mask=None, n_jobs=None, overflow="exact",
+                                   artificial=False) -> SPLCResult:
+    """Calculate the edge weight SPLC and its node counts for all edges in `csr`
+    with a pool of processes.
+
+        Parameters
+        ----------
+        csr: CSRGraph
+
+        sync_mask: numpy.ndarray, optional
+                   Boolean array flagging the sync nodes. Defaults to the
+                   nodes without out-edges.
+
+        n_jobs: int, optional
+                Number of worker processes. Defaults to the number of CPUs.
+
+        overflow: str, optional (default = 'exact')
+                  Supported options: 'exact', 'log', 'raise'.
+
+        artificial: bool, optional (default = False)
+                    Whether to calculate the SPLC of
+                    `add_artificial_source_sync_array(csr)` instead, whose
+                    artificial nodes would join all the components into one.
+                    The node counts are then left out, as zero-length columns.
+
+        Returns
+        ----------
+        SPLCResult
+            The same values as `calculate_splc_result`.
+
+        Raises
+        ----------
+        ValueError
+            If both `sync_mask` and `artificial` are given.
+
+        Notes
+        ----------
+        SPLC never crosses a weakly connected component, so the components are
+        packed into `n_jobs` bins of similar edge count and each bin is solved
+        independently. The CSR arrays and the output arrays live in shared
+        memory, so only block names travel to the workers. Bins whose values
+        overflow int64 with the 'exact' mode send their object arrays back.
+
+        With `artificial`, every bin is solved with its own artificial source
+        and sync: the paths through them never cross a component either, so
+        every edge gets the value it has with a single source and sync.
+
+        With a single job or a single component, the work is done in-process.
+    """
+    if artificial and sync_mask is not None:
+        raise ValueError("sync_mask is not supported with artificial")
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if sync_mask is None:
+        sync_mask = np.diff(csr.indptr) == 0
+    labels = weakly_connected_components(csr)
+    n_components = int(labels.max()) + 1 if len(labels) else 0
+    if n_jobs == 1 or n_components < 2 or artificial and not csr.number_of_edges:
+        if artificial:
+            weighted = add_artificial_source_sync_array(csr)
+            splc = calculate_splc_array(weighted, overflow=overflow)
+            return SPLCResult(weighted, np.zeros((0, 2), dtype=splc.dtype), splc, overflow)
+        return calculate_splc_result(csr, sync_mask, overflow=overflow)
+
+    n_bins = min(n_jobs, n_components)
+    edge_counts = np.bincount(labels, weights=np.diff(csr.indptr), minlength=n_components)
+    edge_counts = edge_counts.astype(np.int64)
+    node_bins = pack_components(labels, edge_counts, n_bins)[labels]
+    dtype = np.float64 if overflow == "log" else np.int64
+    weighted = add_artificial_source_sync_array(csr) if artificial else csr
+    output = np.zeros(weighted.number_of_edges, dtype=dtype)
+    node_output = np.zeros((0 if artificial else csr.number_of_nodes, 2), dtype=dtype)
+    if artificial:
+        sources = np.bincount(csr.indices, minlength=csr.number_of_nodes) == 0
+        source_rank = np.cumsum(sources) - 1
+        artificial_indptr = weighted.indptr
+    else:
+        source_rank = artificial_indptr = np.zeros(0, dtype=np.int64)
+
+    blocks: list = []
+    try:
+        arrays = (csr.indptr, csr.indices, sync_mask, node_bins, output, node_output, artificial_indptr,
+                  source_rank)
+        specs = tuple(_share(array, blocks) for array in arrays)
+        with ProcessPoolExecutor(max_workers=n_bins) as executor:
+            tasks = [(bin_id, specs, overflow, artificial) for bin_id in range(n_bins)]
+            results = list(executor.map(_splc_bin, tasks))
+        splc = np.ndarray(output.shape, dtype=dtype, buffer=blocks[4].buf).copy()
+        node_counts = np.ndarray(node_output.shape, dtype=dtype, buffer=blocks[5].buf).copy()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    promoted = [result for result in results if result is not None]
+    if promoted:
+        splc, node_counts = splc.astype(object), node_counts.astype(object)
+        for edge_ids, values, node_ids, counts in promoted:
+            splc[edge_ids] = values
+            if counts is not None:
+                node_counts[node_ids] = counts
+    return SPLCResult(weighted, node_counts, splc, overflow)
+
+
+@instrumented
+def calculate_splc_parallel(csr: CSRGraph, sync_mask=None, n_jobs=None, overflow="exact",
+                            artificial=False) -> np.ndarray:
+    """Calculate the edge weight SPLC for all edges in `csr` with a pool of processes.
+
+        Parameters
+        ----------
+        See `calculate_splc_result_parallel`.
+
+        Returns
+        ----------
+        numpy.ndarray
+            The same array as `calculate_splc_array`, of
+            `add_artificial_source_sync_array(csr)` with `artificial`.
+    """
+    return calculate_splc_result_parallel(csr, sync_mask, n_jobs, overflow, artificial).splc
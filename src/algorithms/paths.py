@@ -1,19 +1,562 @@
 """
 Path finding methods for Main Path Analysis.
 """
+import heapq
 import warnings
+from typing import Iterator, NamedTuple
+
 import networkx as nx
+import numpy as np
 
 from networkx.utils import pairwise
 
+from src.algorithms.counting import accumulate, assign, materialize, new_counts
+from src.algorithms.csr import CSRGraph, edge_sources, from_networkx, segment_ranges, \
+    topological_levels, transpose
+from src.algorithms.dag import date_levels, node_dates
+from src.algorithms.instrumentation import count, instrumented
+
 __all__ = [
     "main_path",
+    "main_path_array",
+    "count_main_paths",
+    "count_main_paths_array",
+    "main_paths",
+    "main_paths_array",
+    "key_route_main_path",
+    "key_route_main_path_array",
     "dag_longest_path_length",
     "prepare_for_dijkstra"
 ]
 
 
-def main_path(G, source="source", weight="SPLC", method="longest"):  # pragma: no cover
+def _segment_best(values: np.ndarray, lengths: np.ndarray, method: str):
+    """Returns the best value of each segment of `values` and the position of
+    its first occurrence."""
+    offsets = np.cumsum(lengths) - lengths
+    reduce = np.maximum if method == "longest" else np.minimum
+    best = reduce.reduceat(values, offsets)
+    segments = np.repeat(np.arange(len(lengths)), lengths)
+    positions = np.flatnonzero(values == best[segments])
+    return best, positions[np.unique(segments[positions], return_index=True)[1]]
+
+
+def _valid_lengths(valid: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Returns the number of `valid` entries in each segment of the given `lengths`."""
+    counts = np.zeros(len(lengths), dtype=np.int64)
+    nonempty = lengths > 0
+    if nonempty.any():
+        # Empty segments are left out, since reduceat would return an element for them.
+        offsets = np.cumsum(lengths) - lengths
+        counts[nonempty] = np.add.reduceat(valid.astype(np.int64), offsets[nonempty])
+    return counts
+
+
+def _path_table(reverse: CSRGraph, edge_ids: np.ndarray, levels, weights: np.ndarray, starts: np.ndarray,
+                method: str, restart=False, descending=False):
+    """Returns the best path weight ending at every node, the node before it
+    on that path, and which nodes are reachable from `starts`.
+
+    `reverse` lists the incoming edges of every node, and `edge_ids` maps
+    them to positions in `weights`. Paths begin at the `starts` nodes, or at
+    any node if `restart` and every way of reaching it has negative weight.
+    Running it with `csr` itself as `reverse` and `descending` levels gives
+    the best path from every node instead, and its successor.
+    """
+    n = reverse.number_of_nodes
+    distance = np.zeros(n, dtype=weights.dtype)
+    predecessor = np.arange(n)
+    reached = starts.copy()
+    ks = range(levels.number_of_levels - 1, -1, -1) if descending else range(levels.number_of_levels)
+    for k in ks:
+        nodes = levels.level(k)
+        positions = reverse.indptr[nodes]
+        lengths = reverse.indptr[nodes + 1] - positions
+        in_edges = segment_ranges(positions, lengths)
+        relax_block(nodes, lengths, reverse.indices[in_edges], weights[edge_ids[in_edges]],
+                    (distance, predecessor, reached), starts, method, restart)
+    return distance, predecessor, reached
+
+
+def relax_block(nodes: np.ndarray, lengths: np.ndarray, predecessors: np.ndarray,
+                edge_weights: np.ndarray, table: tuple, starts: np.ndarray, method: str, restart=False):
+    """Updates the `(distance, predecessor, reached)` table of `nodes`, whose
+    incoming edges come from the concatenated segments of `predecessors`
+    with the given `lengths` and weigh `edge_weights`.
+
+    No node may be a predecessor of another node of the block.
+    """
+    count("nodes_processed", len(nodes))
+    count("edges_processed", len(predecessors))
+    distance, predecessor, reached = table
+    valid = reached[predecessors]
+    lengths = _valid_lengths(valid, lengths)
+    inner = (lengths > 0) & (~starts[nodes] | restart)
+    if not inner.any():
+        return
+    candidates = distance[predecessors[valid]] + edge_weights[valid]
+    keep = np.repeat(inner, lengths)
+    best, first = _segment_best(candidates[keep], lengths[inner], method)
+    chosen = nodes[inner]
+    if restart:
+        # Restart at the node instead of arriving with a negative weight.
+        positive = best >= 0
+        chosen, best, first = chosen[positive], best[positive], first[positive]
+    distance[chosen] = best
+    predecessor[chosen] = predecessors[valid][keep][first]
+    reached[chosen] = True
+
+
+class _OptimalTable(NamedTuple):
+    reverse: CSRGraph
+    edge_ids: np.ndarray
+    distance: np.ndarray
+    predecessor: np.ndarray
+    reached: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+
+
+def path_starts(in_degree: np.ndarray, method: str, source=None):
+    """Returns which nodes a main path may start at, and whether a global
+    longest path may restart at any node, as in `main_path_array`."""
+    restart = source is None and method == "longest"
+    if source is not None:
+        starts = np.zeros(len(in_degree), dtype=bool)
+        starts[source] = True
+    elif restart:
+        starts = np.ones(len(in_degree), dtype=bool)
+    else:
+        starts = in_degree == 0
+    return starts, restart
+
+
+def path_ends(distance: np.ndarray, reached: np.ndarray, out_degree: np.ndarray, method: str,
+              target=None) -> np.ndarray:
+    """Returns which nodes an optimal main path ends at, as in `main_path_array`."""
+    ends = np.zeros(len(distance), dtype=bool)
+    if target is None:
+        candidates = reached.copy()
+        if method == "shortest":
+            candidates &= out_degree == 0
+        best = (np.max if method == "longest" else np.min)(distance[candidates])
+        ends[candidates] = distance[candidates] == best
+    elif reached[target]:
+        ends[target] = True
+    else:
+        raise nx.NetworkXNoPath(f"target {target} is not reachable")
+    return ends
+
+
+def trace_path(predecessor: np.ndarray, ends: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """Returns the path ending at the first of `ends` in `order`, following `predecessor`."""
+    end = int(order[ends[order]][0])
+    return np.array(_follow(predecessor, end)[::-1], dtype=np.int64)
+
+
+def _optimal_table(csr: CSRGraph, weights: np.ndarray, levels, method: str, source,
+                   target) -> _OptimalTable:
+    """Runs the main path dynamic programming, and flags the nodes where an
+    optimal path may start and the ones where it ends."""
+    reverse, edge_ids = transpose(csr)
+    starts, restart = path_starts(np.diff(reverse.indptr), method, source)
+    distance, predecessor, reached = _path_table(reverse, edge_ids, levels, weights, starts, method,
+                                                 restart)
+    ends = path_ends(distance, reached, np.diff(csr.indptr), method, target)
+    if restart:
+        starts = distance == 0
+    return _OptimalTable(reverse, edge_ids, distance, predecessor, reached, starts, ends)
+
+
+@instrumented
+def main_path_array(csr: CSRGraph, weights: np.ndarray, levels=None, method="longest", source=None,
+                    target=None) -> np.ndarray:
+    """Compute the main path of `csr` with a single dynamic programming pass
+    over its topological levels.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+        A directed acyclic graph (DAG)
+
+    weights : numpy.ndarray
+        The weight of each edge index, e.g., as returned by `calculate_splc_array`.
+
+    levels : TopologicalLevels, optional
+        The topological levels of `csr`. Computed when not given.
+
+    method : string, optional (default = 'longest')
+        Supported options: 'longest', 'shortest'.
+
+    source : int, optional
+        Index of the starting node. If not specified, a longest path may start
+        at any node and a shortest path at any node without in-edges.
+
+    target : int, optional
+        Index of the ending node. If not specified, a longest path may end at
+        any node and a shortest path at any node without out-edges.
+
+    Returns
+    -------
+    numpy.ndarray
+        The node indices of the path, empty if `csr` has no nodes.
+
+    Raises
+    ------
+    ValueError
+        If `method` is not among the supported options.
+
+    networkx.NetworkXNoPath
+        If `target` is not reachable from `source`.
+
+    Notes
+    -----
+    The global longest path follows `networkx.dag_longest_path`: a path
+    restarts at a node when every way of reaching it has negative weight.
+    Ties are broken by the smallest edge index and the first node of the
+    topological order, so the path may differ from NetworkX's among paths
+    of equal weight. Edge attributes are never read nor written.
+    """
+    if method not in ("longest", "shortest"):
+        raise ValueError(f"method not supported: {method}")
+    if not csr.number_of_nodes:
+        return np.zeros(0, dtype=np.int64)
+    if levels is None:
+        levels = topological_levels(csr)
+
+    table = _optimal_table(csr, np.asarray(weights), levels, method, source, target)
+    return trace_path(table.predecessor, table.ends, levels.order)
+
+
+def _tight_paths(csr: CSRGraph, weights: np.ndarray, levels, method: str, source, target):
+    """Returns the in-edges lying on an optimal path, as a reversed graph, the
+    number of optimal paths ending at every node, and the optimal path ends
+    in topological order."""
+    weights = np.asarray(weights)
+    table = _optimal_table(csr, weights, levels, method, source, target)
+    reverse, distance = table.reverse, table.distance
+    heads = reverse.indices
+    tails = np.repeat(np.arange(csr.number_of_nodes), np.diff(reverse.indptr))
+    tight = table.reached[heads] & (distance[heads] + weights[table.edge_ids] == distance[tails])
+    indptr = np.zeros(csr.number_of_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails[tight], minlength=csr.number_of_nodes), out=indptr[1:])
+    tight_reverse = CSRGraph(csr.nodes, indptr, heads[tight])
+
+    ways = new_counts(csr.number_of_nodes)
+    assign(ways, np.flatnonzero(table.starts), 1)
+    for k in range(levels.number_of_levels):
+        nodes = levels.level(k)
+        lengths = indptr[nodes + 1] - indptr[nodes]
+        for base in (0, 1):
+            chosen = (lengths > 0) & (table.starts[nodes] == base)
+            if chosen.any():
+                in_edges = segment_ranges(indptr[nodes[chosen]], lengths[chosen])
+                predecessors = tight_reverse.indices[in_edges]
+                accumulate(ways, nodes[chosen], predecessors, lengths[chosen], base)
+    ends = levels.order[table.ends[levels.order]]
+    return tight_reverse, table.starts, materialize(ways), ends
+
+
+@instrumented
+def count_main_paths_array(csr: CSRGraph, weights: np.ndarray, levels=None, method="longest",
+                           source=None, target=None) -> int:
+    """Count the paths of `csr` tied as main path.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+        A directed acyclic graph (DAG)
+
+    weights : numpy.ndarray
+        The weight of each edge index, e.g., as returned by `calculate_splc_array`.
+
+    levels : TopologicalLevels, optional
+        The topological levels of `csr`. Computed when not given.
+
+    method : string, optional (default = 'longest')
+        Supported options: 'longest', 'shortest'.
+
+    source : int, optional
+        Index of the starting node, as in `main_path_array`.
+
+    target : int, optional
+        Index of the ending node, as in `main_path_array`.
+
+    Returns
+    -------
+    int
+        The number of paths whose weight equals the one of the main path,
+        zero if `csr` has no nodes. It is a Python int, so it never overflows.
+
+    Raises
+    ------
+    ValueError
+        If `method` is not among the supported options.
+
+    networkx.NetworkXNoPath
+        If `target` is not reachable from `source`.
+
+    Notes
+    -----
+    An edge `u -> v` lies on an optimal path iff the best weight ending at
+    `u` plus its weight is the best weight ending at `v`. Those edges form
+    the optimal path DAG, whose paths are counted with the same level sweep
+    used for `Nall-`. The cost is O(V + E), whatever the number of paths.
+    The weights are compared exactly, so float weights tie only when equal.
+    """
+    if method not in ("longest", "shortest"):
+        raise ValueError(f"method not supported: {method}")
+    if not csr.number_of_nodes:
+        return 0
+    if levels is None:
+        levels = topological_levels(csr)
+
+    _, _, ways, ends = _tight_paths(csr, weights, levels, method, source, target)
+    return sum(int(ways[end]) for end in ends.tolist())
+
+
+def main_paths_array(csr: CSRGraph, weights: np.ndarray, levels=None, method="longest", source=None,
+                     target=None, limit=None) -> Iterator[np.ndarray]:
+    """Generate the paths of `csr` tied as main path.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+        A directed acyclic graph (DAG)
+
+    weights : numpy.ndarray
+        The weight of each edge index, e.g., as returned by `calculate_splc_array`.
+
+    levels : TopologicalLevels, optional
+        The topological levels of `csr`. Computed when not given.
+
+    method : string, optional (default = 'longest')
+        Supported options: 'longest', 'shortest'.
+
+    source : int, optional
+        Index of the starting node, as in `main_path_array`.
+
+    target : int, optional
+        Index of the ending node, as in `main_path_array`.
+
+    limit : int, optional
+        The maximum number of paths to generate. All of them if not given.
+
+    Returns
+    -------
+    generator
+        The node indices of every optimal path, as arrays.
+
+    Raises
+    ------
+    ValueError
+        If `method` is not among the supported options.
+
+    networkx.NetworkXNoPath
+        If `target` is not reachable from `source`.
+
+    Notes
+    -----
+    The tables of `count_main_paths_array` are built once, on the first
+    request, and the paths are then walked backward from their ends along
+    the optimal path DAG, skipping nodes no optimal path goes through, so
+    each path costs O(path length) and no more than `limit` are built.
+    """
+    if method not in ("longest", "shortest"):
+        raise ValueError(f"method not supported: {method}")
+    if not csr.number_of_nodes or limit == 0:
+        return
+    if levels is None:
+        levels = topological_levels(csr)
+
+    tight_reverse, starts, ways, ends = _tight_paths(csr, weights, levels, method, source, target)
+    indptr, indices = tight_reverse.indptr.tolist(), tight_reverse.indices.tolist()
+    useful, starts = (ways != 0).tolist(), starts.tolist()
+    emitted = 0
+    for end in ends.tolist():
+        path, positions = [end], [indptr[end]]
+        if starts[end]:
+            yield np.array(path, dtype=np.int64)
+            emitted += 1
+            if emitted == limit:
+                return
+        while positions:
+            node, position = path[-1], positions[-1]
+            if position == indptr[node + 1]:
+                path.pop()
+                positions.pop()
+                continue
+            positions[-1] += 1
+            predecessor = indices[position]
+            if not useful[predecessor]:
+                continue
+            path.append(predecessor)
+            positions.append(indptr[predecessor])
+            if starts[predecessor]:
+                yield np.array(path[::-1], dtype=np.int64)
+                emitted += 1
+                if emitted == limit:
+                    return
+
+
+def _follow(pointers: np.ndarray, node: int) -> list:
+    """Returns the chain of `pointers` from `node` until a node pointing to itself."""
+    chain = [node]
+    while pointers[node] != node:
+        node = int(pointers[node])
+        chain.append(node)
+    return chain
+
+
+def _best_edges(graph: CSRGraph, edge_ids: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Returns, for every node of `graph`, the position in `weights` of its
+    heaviest edge, or -1 for nodes without edges."""
+    lengths = np.diff(graph.indptr)
+    inner = lengths > 0
+    best_edges = np.full(graph.number_of_nodes, -1, dtype=np.int64)
+    if inner.any():
+        _, first = _segment_best(weights[edge_ids], lengths[inner], "longest")
+        best_edges[inner] = edge_ids[first]
+    return best_edges
+
+
+def _top_edges(weights: np.ndarray, k: int) -> list:
+    """Returns the indices of the `k` heaviest edges, heaviest first, ties by index."""
+    if weights.dtype == object:
+        return heapq.nlargest(k, range(len(weights)), key=weights.__getitem__)
+    if k < len(weights):
+        # Every edge tied with the k-th heaviest is a candidate, so the lowest indices win the ties.
+        candidates = np.flatnonzero(weights >= -np.partition(-weights, k - 1)[k - 1])
+    else:
+        candidates = np.arange(len(weights))
+    return candidates[np.lexsort((candidates, -weights[candidates]))][:k].tolist()
+
+
+@instrumented
+def key_route_main_path_array(csr: CSRGraph, weights: np.ndarray, k: int, mode="global",
+                              levels=None) -> list:
+    """Compute the key-route main paths of `csr` for its `k` heaviest edges.
+
+    Parameters
+    ----------
+    csr : CSRGraph
+        A directed acyclic graph (DAG)
+
+    weights : numpy.ndarray
+        The weight of each edge index, e.g., as returned by `calculate_splc_array`.
+
+    k : int
+        The number of key routes.
+
+    mode : string, optional (default = 'global')
+        Supported options: 'global', 'local'.
+
+    levels : TopologicalLevels, optional
+        The topological levels of `csr`. Computed when not given.
+
+    Returns
+    -------
+    list
+        One array of node indices per key route, from the heaviest key edge
+        on, without repeated routes.
+
+    Raises
+    ------
+    ValueError
+        If `mode` is not among the supported options.
+
+    Notes
+    -----
+    Each key edge `u -> v` is extended backward from `u` to a node without
+    in-edges and forward from `v` to a node without out-edges. The 'global'
+    mode takes the heaviest such extensions, read from a forward and a
+    backward longest path table, so each route is the heaviest source to
+    sink path through its key edge. The 'local' mode greedily follows the
+    heaviest edge at each step. Both tables are built once, and each key
+    route then costs O(path length).
+    """
+    if mode not in ("global", "local"):
+        raise ValueError(f"mode not supported: {mode}")
+    weights = np.asarray(weights)
+    if not k or not csr.number_of_edges:
+        return []
+    if levels is None:
+        levels = topological_levels(csr)
+
+    reverse, edge_ids = transpose(csr)
+    heads = edge_sources(csr)
+    if mode == "global":
+        sources = np.diff(reverse.indptr) == 0
+        syncs = np.diff(csr.indptr) == 0
+        backward = _path_table(reverse, edge_ids, levels, weights, sources, "longest")[1]
+        forward = _path_table(csr, np.arange(csr.number_of_edges), levels, weights, syncs, "longest",
+                              descending=True)[1]
+    else:
+        best_in = _best_edges(reverse, edge_ids, weights)
+        best_out = _best_edges(csr, np.arange(csr.number_of_edges), weights)
+        backward = np.where(best_in >= 0, heads[best_in], np.arange(csr.number_of_nodes))
+        forward = np.where(best_out >= 0, csr.indices[best_out], np.arange(csr.number_of_nodes))
+
+    routes, seen = [], set()
+    for edge in _top_edges(weights, k):
+        route = _follow(backward, int(heads[edge]))[::-1] + _follow(forward, int(csr.indices[edge]))
+        if tuple(route) not in seen:
+            seen.add(tuple(route))
+            routes.append(np.array(route, dtype=np.int64))
+    return routes
+
+
+@instrumented
+def key_route_main_path(G, k, mode="global", weight="SPLC") -> list:
+    """Compute the key-route main paths of `G` for its `k` heaviest edges.
+
+    Parameters
+    ----------
+    G : NetworkX digraph
+        A weighted directed acyclic graph (DAG)
+
+    k : int
+        The number of key routes.
+
+    mode : string, optional (default = 'global')
+        Supported options: 'global', 'local'.
+
+    weight : string, optional (default = 'SPLC')
+        Edge data key to use for weight.
+
+    Returns
+    -------
+    list
+        One list of nodes per key route. The key-route main path network is
+        their union.
+
+    Raises
+    ------
+    ValueError
+        If `mode` is not among the supported options.
+
+    Notes
+    -----
+    See `key_route_main_path_array`.
+    """
+    csr = from_networkx(G)
+    weights = np.array([w for _, _, w in G.edges(data=weight, default=1)])
+    routes = key_route_main_path_array(csr, weights, k, mode)
+    return [[csr.nodes[i] for i in route.tolist()] for route in routes]
+
+
+def _labeled_inputs(G, weight, method, source, target):
+    if source is None and method == "shortest":
+        # Unlike the longest one, the shortest main path starts at the artificial source by default.
+        source = "source"
+    csr = from_networkx(G)
+    weights = np.array([w for _, _, w in G.edges(data=weight, default=1)])
+    index = {node: i for i, node in enumerate(csr.nodes)}
+    return csr, weights, index.get(source), index.get(target)
+
+
+@instrumented
+def main_path(G, source=None, weight="SPLC", method="longest", target=None, date=None):
     """Compute the main path in the graph
 
     If `G` has edges with `SPLC` attribute the edge data are used as
@@ -25,8 +568,10 @@ def main_path(G, source="source", weight="SPLC", method="longest"):  # pragma: n
         A weighted directed acyclic graph (DAG)
 
     source : node, optional
-        Starting node for path. If not specified, compute main
-        path for `source` node.
+        Starting node for path. If not specified, the longest method
+        computes the global main path, as `nx.dag_longest_path`, and the
+        shortest method starts at the `source` node. If the node is not in
+        `G`, the path may start anywhere.
 
     target : node, optional
         Ending node for path. If not specified, compute main
@@ -41,6 +586,10 @@ def main_path(G, source="source", weight="SPLC", method="longest"):  # pragma: n
         Supported options: 'longest', 'shortest'.
         Other inputs produce a ValueError.
 
+    date : string, optional
+        A node attribute, e.g., 'pln_date', to derive the topological order
+        from with `date_levels` instead of sorting the graph.
+
     Returns
     -------
     path: list
@@ -57,10 +606,8 @@ def main_path(G, source="source", weight="SPLC", method="longest"):  # pragma: n
     -----
     There may be more than one shortest path between a source and target.
     This returns only one of them.
-    The longest method uses topological ordering therefore it calculates the
-    global longest path.
-    In the second method the longest paths correspond to the shortest paths in the
-    negative graph where all edge weights are negated.
+    Both methods run `main_path_array` over the CSR form of `G`, so the edge
+    attributes are not modified and no negated copy of the weights is needed.
 
     """
     if method not in ("longest", "shortest"):
@@ -70,15 +617,85 @@ def main_path(G, source="source", weight="SPLC", method="longest"):  # pragma: n
     if not nx.is_weighted(G, weight=weight):
         warnings.warn("weight = {} not found, proceeding with default weight = 1".format(weight))
 
-    # Find main source-target path.
-    if method == "longest":
-        path = nx.dag_longest_path(G, weight=weight)
-    elif method == "shortest":
-        path = nx.bellman_ford(G, source=source, weight=weight)
-    else:
-        path = []
+    csr, weights, source, target = _labeled_inputs(G, weight, method, source, target)
+    levels = date_levels(csr, node_dates(G, csr.nodes, date)) if date else None
+    path = main_path_array(csr, weights, levels, method, source, target)
+    return [csr.nodes[i] for i in path.tolist()]
+
+
+@instrumented
+def count_main_paths(G, source=None, weight="SPLC", method="longest", target=None) -> int:
+    """Count the paths tied as main path in the graph
+
+    Parameters
+    ----------
+    G : NetworkX digraph
+        A weighted directed acyclic graph (DAG)
+
+    source : node, optional
+        Starting node for path, as in `main_path`.
+
+    weight : string, optional (default = 'SPLC')
+        Edge data key to use for weight.
+
+    method : string, optional (default = 'longest')
+        Supported options: 'longest', 'shortest'.
+
+    target : node, optional
+        Ending node for path, as in `main_path`.
+
+    Returns
+    -------
+    int
+        The number of paths with the same weight as the one `main_path`
+        returns. More than one means the main path is ambiguous.
 
-    return path
+    Notes
+    -----
+    See `count_main_paths_array`.
+    """
+    csr, weights, source, target = _labeled_inputs(G, weight, method, source, target)
+    return count_main_paths_array(csr, weights, method=method, source=source, target=target)
+
+
+def main_paths(G, source=None, weight="SPLC", method="longest", target=None, limit=None):
+    """Generate the paths tied as main path in the graph
+
+    Parameters
+    ----------
+    G : NetworkX digraph
+        A weighted directed acyclic graph (DAG)
+
+    source : node, optional
+        Starting node for path, as in `main_path`.
+
+    weight : string, optional (default = 'SPLC')
+        Edge data key to use for weight.
+
+    method : string, optional (default = 'longest')
+        Supported options: 'longest', 'shortest'.
+
+    target : node, optional
+        Ending node for path, as in `main_path`.
+
+    limit : int, optional
+        The maximum number of paths to generate. All of them if not given.
+
+    Returns
+    -------
+    generator
+        Every path with the same weight as the one `main_path` returns, as
+        a list of nodes.
+
+    Notes
+    -----
+    The number of tied paths may grow exponentially with the size of `G`,
+    so check it with `count_main_paths` or set a `limit` before listing them.
+    See `main_paths_array`.
+    """
+    csr, weights, source, target = _labeled_inputs(G, weight, method, source, target)
+    for path in main_paths_array(csr, weights, method=method, source=source, target=target, limit=limit):
+        yield [csr.nodes[i] for i in path.tolist()]
 
 
 def prepare_for_dijkstra(G):
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from src.algorithms.counting import new_counts, accumulate, assign, multiply, materialize, take, \
+    linear_weights
+
+
+def test_accumulate_without_overflow():
+    counts = new_counts(4, fill=1)
+    promoted = accumulate(counts, np.array([2, 3]), np.array([0, 1, 0]), np.array([2, 1]), base=1)
+    assert promoted == 0
+    assert materialize(counts).tolist() == [1, 1, 3, 2]
+
+
+def test_accumulate_promotes_only_overflowed_nodes():
+    counts = new_counts(4)
+    assign(counts, np.array([0, 1]), 2 ** 61)
+    promoted = accumulate(counts, np.array([2, 3]), np.array([0, 1, 0]), np.array([2, 1]))
+    assert promoted == 1
+    values = materialize(counts)
+    assert values.dtype == object
+    assert values.tolist() == [2 ** 61, 2 ** 61, 2 ** 62, 2 ** 61]
+
+
+def test_accumulate_log():
+    counts = new_counts(3)
+    assign(counts, np.array([0, 1]), 2 ** 62 - 1)
+    accumulate(counts, np.array([2]), np.array([0, 1]), np.array([2]), base=1, overflow="log")
+    logs = materialize(counts, overflow="log")
+    assert np.allclose(logs, np.log([2.0 ** 62 - 1, 2.0 ** 62 - 1, 2.0 ** 63 - 1]))
+
+
+def test_accumulate_raise():
+    counts = new_counts(3)
+    assign(counts, np.array([0, 1]), 2 ** 62)
+    with pytest.raises(OverflowError):
+        accumulate(counts, np.array([2]), np.array([0, 1]), np.array([2]), overflow="raise")
+
+
+def test_assign_clears_promotion():
+    counts = new_counts(3)
+    assign(counts, np.array([0, 1]), 2 ** 62)
+    accumulate(counts, np.array([2]), np.array([0, 1]), np.array([2]))
+    assign(counts, np.array([2]), 1)
+    assert materialize(counts).dtype == np.int64
+
+
+def test_multiply_promotes_only_overflowed_products():
+    a = new_counts(2)
+    assign(a, np.array([0]), 2 ** 40)
+    assign(a, np.array([1]), 3)
+    products = multiply(a, np.array([0, 1, 0]), a, np.array([0, 1, 1]))
+    assert products.dtype == object
+    assert products.tolist() == [2 ** 80, 9, 3 * 2 ** 40]
+    with pytest.raises(OverflowError):
+        multiply(a, np.array([0]), a, np.array([0]), overflow="raise")
+    assert np.allclose(multiply(a, np.array([1]), a, np.array([1]), overflow="log"), [np.log(9)])
+
+
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+def test_counts_beyond_float_range():
+    counts = new_counts(3)
+    assign(counts, np.array([0]), 2 ** 62)
+    for _ in range(480):
+        accumulate(counts, np.array([1]), np.array([0, 0]), np.array([2]))
+        accumulate(counts, np.array([0]), np.array([1, 1]), np.array([2]))
+    assert counts.estimates[0] == 2.0 ** 1022
+    accumulate(counts, np.array([2]), np.array([0, 0, 0, 0]), np.array([4]))
+    assert counts.estimates[2] == np.inf
+    assert materialize(counts)[2] == 2 ** 1024
+    assert multiply(counts, np.array([0]), counts, np.array([0])).tolist() == [2 ** 2044]
+
+
+def test_unsupported_mode():
+    with pytest.raises(ValueError):
+        materialize(new_counts(1), overflow="float")
+
+
+def test_take():
+    counts = new_counts(4, fill=1)
+    assign(counts, np.array([0, 1]), 2 ** 61)
+    accumulate(counts, np.array([2]), np.array([0, 1]), np.array([2]))
+    taken = take(counts, np.array([2, 3, 0]), size=4)
+    assert materialize(taken).tolist() == [2 ** 62, 1, 2 ** 61, 0]
+    assert take(counts, np.array([3])).values.tolist() == [1]
+
+
+def test_linear_weights():
+    splc = np.array([1, 100, 20, 20])
+    assert linear_weights(splc) is splc
+    weights = linear_weights(np.log(splc.astype(np.float64)), overflow="log")
+    assert np.allclose(weights * 100, splc)
+    # Summed, the logs would favour the second pair, whose product is larger.
+    assert weights[0] + weights[1] > weights[2] + weights[3]
+    assert np.isfinite(linear_weights(np.array([0.0, 2000.0]), overflow="log")).all()
@@ -0,0 +1,84 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from src.algorithms.csr import from_networkx, to_networkx, edge_sources, transpose, topological_levels, \
+    strongly_connected_components
+
+
+class DigraphExamples:
+    def __init__(self):
+        self.edges = [['A', 'C'], ['C', 'E'], ['C', 'H'], ['E', 'G'], ['G', 'H'], ['H', 'K'],
+                      ['B', 'C'], ['B', 'D'], ['B', 'J'], ['D', 'F'], ['D', 'I'], ['F', 'H'],
+                      ['F', 'I'], ['I', 'L'], ['I', 'M'], ['J', 'M'], ['M', 'N']]
+        self.G = nx.DiGraph()
+        self.G.add_edges_from(self.edges)
+        self.csr = from_networkx(self.G)
+
+
+@pytest.fixture()
+def di_G():
+    return DigraphExamples()
+
+
+def test_from_networkx_keeps_edge_order(di_G):
+    nodes = di_G.csr.nodes
+    heads = [nodes[i] for i in edge_sources(di_G.csr)]
+    tails = [nodes[i] for i in di_G.csr.indices]
+    assert list(zip(heads, tails)) == list(di_G.G.edges())
+    assert di_G.csr.number_of_nodes == di_G.G.number_of_nodes()
+    assert di_G.csr.number_of_edges == di_G.G.number_of_edges()
+
+
+def test_to_networkx_round_trip(di_G):
+    weights = np.arange(di_G.csr.number_of_edges)
+    H = to_networkx(di_G.csr, edge_attrs={"SPLC": weights})
+    assert list(H.edges()) == list(di_G.G.edges())
+    assert [H[u][v]["SPLC"] for u, v in H.edges()] == weights.tolist()
+    assert list(to_networkx(di_G.csr).edges()) == list(di_G.G.edges())
+
+
+def test_transpose(di_G):
+    reverse, edge_ids = transpose(di_G.csr)
+    nodes = di_G.csr.nodes
+    for node_index, node in enumerate(nodes):
+        start, end = reverse.indptr[node_index], reverse.indptr[node_index + 1]
+        predecessors = [nodes[i] for i in reverse.indices[start:end]]
+        assert sorted(predecessors) == sorted(di_G.G.predecessors(node))
+        assert np.all(di_G.csr.indices[edge_ids[start:end]] == node_index)
+
+
+def test_topological_levels(di_G):
+    levels = topological_levels(di_G.csr)
+    rank = np.empty(di_G.csr.number_of_nodes, dtype=int)
+    rank[levels.order] = np.arange(len(levels.order))
+    assert sorted(levels.order.tolist()) == list(range(di_G.csr.number_of_nodes))
+    assert np.all(rank[edge_sources(di_G.csr)] < rank[di_G.csr.indices])
+    assert levels.number_of_levels == 6
+    assert sorted(di_G.csr.nodes[i] for i in levels.level(0)) == ['A', 'B']
+
+
+def test_topological_levels_empty():
+    levels = topological_levels(from_networkx(nx.DiGraph()))
+    assert levels.number_of_levels == 0
+    assert len(levels.order) == 0
+
+
+def test_topological_levels_cycle():
+    with pytest.raises(nx.NetworkXUnfeasible):
+        topological_levels(from_networkx(nx.DiGraph([(0, 1), (1, 2), (2, 0)])))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_strongly_connected_components(seed):
+    G = nx.gnp_random_graph(60, 0.04, seed=seed, directed=True)
+    G.add_edge(0, 0)
+    csr = from_networkx(G)
+    labels = strongly_connected_components(csr)
+    nodes = list(G)
+    components = sorted(sorted(nodes[i] for i in np.flatnonzero(labels == label)) for label in np.unique(labels))
+    assert components == sorted(sorted(c) for c in nx.strongly_connected_components(G))
+    # Edges between components go to a lower label.
+    heads = edge_sources(csr)
+    between = labels[heads] != labels[csr.indices]
+    assert np.all(labels[heads][between] > labels[csr.indices][between])
@@ -1,8 +1,12 @@
 import networkx as nx
+import numpy as np
 import pytest
 
-from src.algorithms.dag import get_syncs, get_sources, compare_graphs
-from src.algorithms.edge_weights import calculate_spc, calculate_splc_fast, calculate_splc, calculate_splc_optimized
+from src.algorithms.csr import edge_sources, from_networkx
+from src.algorithms.dag import get_syncs, get_sources, compare_graphs, path_contain_edge, add_artificial_source_sync
+from src.algorithms.edge_weights import calculate_spc, calculate_splc_fast, calculate_splc, calculate_splc_optimized, \
+    calculate_splc_array, calculate_splc_result, calculate_traversal_weights, calculate_traversal_weights_array
+from utils.generators import random_citation_graph
 from utils.loading import get_all_input_graphml_files_path, get_all_output_csv_files_path, load_graphml_file, \
     load_csv_file
 
@@ -18,11 +22,33 @@ class DigraphExamples:
         self.syncs = get_syncs(self.G)
 
 
+class DiamondChainExamples:
+    def __init__(self, length=70):
+        self.G = nx.DiGraph()
+        for i in range(length):
+            self.G.add_edges_from([(i, ('a', i)), (i, ('b', i)), (('a', i), i + 1), (('b', i), i + 1)])
+        self.syncs = get_syncs(self.G)
+        self.splc_expected = {}
+        n_all_minus = {}
+        for node in nx.topological_sort(self.G):
+            n_all_minus[node] = 1 + sum(n_all_minus[u] for u in self.G.predecessors(node))
+        n_plus = {}
+        for node in reversed(list(nx.topological_sort(self.G))):
+            n_plus[node] = 1 if node in self.syncs else sum(n_plus[v] for v in self.G.successors(node))
+        for u, v in self.G.edges():
+            self.splc_expected[(u, v)] = n_all_minus[u] * n_plus[v]
+
+
 @pytest.fixture()
 def di_G():
     return DigraphExamples()
 
 
+@pytest.fixture()
+def diamond_G():
+    return DiamondChainExamples()
+
+
 def test_calculate_spc_correctness(di_G):
     calculate_spc(di_G.G, di_G.sources, di_G.syncs)
     spc_expected = [2, 2, 2, 2, 2, 5, 2, 5, 1, 3, 2, 1, 2, 2, 2, 1, 3]
@@ -63,3 +89,161 @@ def test_splc_optimal_correctness(di_G):
     splc_expected = [2, 3, 3, 4, 5, 12, 2, 5, 1, 6, 4, 3, 6, 6, 6, 2, 9]
     for i in range(len(di_G.edges)):
         assert di_G.G[di_G.edges[i][0]][di_G.edges[i][1]]["SPLC"] == splc_expected[i]
+
+
+def test_splc_optimal_node_weights(di_G):
+    calculate_splc_optimized(di_G.G, di_G.syncs)
+    assert di_G.G.nodes['B']["Nall-"] == 1
+    assert di_G.G.nodes['M']["Nall-"] == 9
+    assert di_G.G.nodes['B']["N+"] == 8
+    assert di_G.G.nodes['N']["N+"] == 1
+
+
+def test_splc_optimal_without_write(di_G):
+    H = di_G.G.copy()
+    result = calculate_splc_optimized(di_G.G, di_G.syncs, write=False)
+    assert all("SPLC" not in data for _, _, data in di_G.G.edges(data=True))
+    assert all("N+" not in data for _, data in di_G.G.nodes(data=True))
+    result.write_back(di_G.G)
+    assert calculate_splc_optimized(H, di_G.syncs).splc.tolist() == result.splc.tolist()
+    assert compare_graphs(di_G.G, H)
+    assert dict(di_G.G.nodes(data="Nall-")) == dict(H.nodes(data="Nall-"))
+    with pytest.raises(ValueError):
+        result.write_back(nx.DiGraph([(0, 1)]))
+
+
+def test_splc_result_frames(di_G):
+    result = calculate_splc_result(from_networkx(di_G.G))
+    edges = result.edge_frame(labels=True)
+    assert np.shares_memory(edges["SPLC"].values, result.splc)
+    assert list(edges.columns) == ["source", "target", "SPLC"]
+    splc_expected = [2, 3, 3, 4, 5, 12, 2, 5, 1, 6, 4, 3, 6, 6, 6, 2, 9]
+    weights = {(u, v): w for u, v, w in edges.itertuples(index=False)}
+    assert [weights[tuple(edge)] for edge in di_G.edges] == splc_expected
+    assert result.edge_frame()["source"].tolist() == edge_sources(result.csr).tolist()
+
+    nodes = result.node_frame()
+    assert np.shares_memory(nodes["N+"].values, result.node_counts)
+    assert nodes.loc['M', "Nall-"] == 9 and nodes.loc['B', "N+"] == 8
+
+
+def test_splc_result_overflow(diamond_G):
+    result = calculate_splc_result(from_networkx(diamond_G.G))
+    assert result.node_counts.dtype == object
+    edges = result.edge_frame(labels=True)
+    assert {(u, v): w for u, v, w in edges.itertuples(index=False)} == diamond_G.splc_expected
+    log = calculate_splc_result(from_networkx(diamond_G.G), overflow="log")
+    assert log.overflow == "log" and log.node_counts.dtype == np.float64
+    assert np.allclose(np.exp(log.n_plus[:5]), result.n_plus[:5].astype(np.float64))
+
+
+def test_splc_array_correctness(di_G):
+    splc = calculate_splc_array(from_networkx(di_G.G))
+    splc_expected = [2, 3, 3, 4, 5, 12, 2, 5, 1, 6, 4, 3, 6, 6, 6, 2, 9]
+    edge_index = {edge: index for index, edge in enumerate(di_G.G.edges())}
+    for i in range(len(di_G.edges)):
+        assert splc[edge_index[tuple(di_G.edges[i])]] == splc_expected[i]
+
+
+def test_splc_optimal_date_order():
+    G = random_citation_graph(150, sink_fraction=0.1, seed=2)
+    add_artificial_source_sync(G)
+    H = G.copy()
+    calculate_splc_optimized(G, get_syncs(G))
+    calculate_splc_optimized(H, get_syncs(H), date="pln_date")
+    assert compare_graphs(G, H)
+
+
+def test_splc_optimal_parallel():
+    G = random_citation_graph(150, sink_fraction=0.1, seed=2)
+    G.add_edges_from([("a", "b"), ("b", "c"), ("a", "c")])
+    H = G.copy()
+    calculate_splc_optimized(G, get_syncs(G))
+    result = calculate_splc_optimized(H, get_syncs(H), n_jobs=2, write=False)
+    result.write_back(H)
+    assert compare_graphs(G, H)
+    assert dict(G.nodes(data="N+")) == dict(H.nodes(data="N+"))
+
+
+def test_splc_optimal_with_cycle():
+    G = nx.DiGraph([(0, 1), (1, 2), (2, 0)])
+    with pytest.raises(nx.NetworkXUnfeasible):
+        calculate_splc_optimized(G, get_syncs(G))
+
+
+def test_splc_optimal_overflow_exact(diamond_G):
+    calculate_splc_optimized(diamond_G.G, diamond_G.syncs)
+    assert max(diamond_G.splc_expected.values()) > 2 ** 63
+    for (u, v), splc in diamond_G.splc_expected.items():
+        assert diamond_G.G[u][v]["SPLC"] == splc
+
+
+def test_splc_array_overflow_log(diamond_G):
+    csr = from_networkx(diamond_G.G)
+    splc = calculate_splc_array(csr, overflow="log")
+    expected = np.log(np.array([float(diamond_G.splc_expected[edge]) for edge in diamond_G.G.edges()]))
+    assert splc.dtype == np.float64
+    assert np.allclose(splc, expected)
+
+
+def test_splc_array_overflow_raise(diamond_G):
+    with pytest.raises(OverflowError):
+        calculate_splc_array(from_networkx(diamond_G.G), overflow="raise")
+
+
+def test_splc_array_without_overflow_stays_int64(di_G):
+    splc = calculate_splc_array(from_networkx(di_G.G), overflow="raise")
+    assert splc.dtype == np.int64
+
+
+def test_splc_array_unsupported_overflow(di_G):
+    with pytest.raises(ValueError):
+        calculate_splc_array(from_networkx(di_G.G), overflow="float")
+
+
+def test_traversal_weights_correctness(di_G):
+    calculate_traversal_weights(di_G.G)
+    spc_expected = [2, 2, 2, 2, 2, 5, 2, 5, 1, 3, 2, 1, 2, 2, 2, 1, 3]
+    splc_expected = [2, 3, 3, 4, 5, 12, 2, 5, 1, 6, 4, 3, 6, 6, 6, 2, 9]
+    for i in range(len(di_G.edges)):
+        u, v = di_G.edges[i]
+        assert di_G.G[u][v]["SPC"] == spc_expected[i]
+        assert di_G.G[u][v]["SPLC"] == splc_expected[i]
+        assert "NPPC" not in di_G.G[u][v]
+
+
+def test_traversal_weights_node_pairs(di_G):
+    calculate_traversal_weights(di_G.G, kinds=["SPNP", "NPPC"])
+    nodes = list(di_G.G)
+    for u, v in di_G.G.edges():
+        assert "SPLC" not in di_G.G[u][v]
+        spnp = 0
+        for x in nodes:
+            for y in nodes:
+                if x != y:
+                    paths = nx.all_simple_paths(di_G.G, x, y)
+                    spnp += sum(1 for path in paths if path_contain_edge([u, v], path))
+        nppc = (len(nx.ancestors(di_G.G, u)) + 1) * (len(nx.descendants(di_G.G, v)) + 1)
+        assert di_G.G[u][v]["SPNP"] == spnp
+        assert di_G.G[u][v]["NPPC"] == nppc
+
+
+def test_traversal_weights_explicit_sources_syncs(di_G):
+    calculate_spc(di_G.G, ['B'], ['K', 'N'])
+    spc_expected = {edge: di_G.G[edge[0]][edge[1]]["SPC"] for edge in di_G.G.edges()}
+    calculate_traversal_weights(di_G.G, kinds=["SPC"], sources=['B'], syncs=['K', 'N'])
+    for (u, v), spc in spc_expected.items():
+        assert di_G.G[u][v]["SPC"] == spc
+
+
+def test_traversal_weights_overflow(diamond_G):
+    weights = calculate_traversal_weights_array(from_networkx(diamond_G.G), kinds=["SPLC", "NPPC"],
+                                                overflow="log")
+    expected = np.log(np.array([float(diamond_G.splc_expected[edge]) for edge in diamond_G.G.edges()]))
+    assert np.allclose(weights["SPLC"], expected)
+    assert weights["NPPC"].dtype == np.float64
+
+
+def test_traversal_weights_unsupported(di_G):
+    with pytest.raises(ValueError):
+        calculate_traversal_weights(di_G.G, kinds=["HITS"])
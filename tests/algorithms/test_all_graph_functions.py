@@ -1,6 +1,13 @@
 import networkx as nx
+import numpy as np
+import pytest
 
-from src.algorithms.dag import get_syncs, get_sources, path_contain_edge, remove_cycles, add_artificial_source_sync
+from src.algorithms.csr import edge_sources, from_networkx, node_labels, to_networkx
+from src.algorithms.dag import get_syncs, get_sources, path_contain_edge, remove_cycles, add_artificial_source_sync, \
+    add_artificial_source_sync_array, remove_cycles_scc, remove_anomalies, remove_anomalies_array, trim, trim_array, compare_graphs, \
+    date_levels, node_dates, feedback_arc_set_array, remove_cycles_fas, break_cycles, CYCLE_POLICIES
+from src.algorithms.instrumentation import record
+from utils.generators import random_citation_graph
 
 
 def test_dummy_graph():
@@ -41,7 +48,8 @@ def test_path_does_not_contain_edge():
     assert not path_contain_edge(edge, paths)
 
 
-def test_remove_cycles_case1():
+@pytest.mark.parametrize("remove", [remove_cycles, remove_cycles_scc, remove_cycles_fas])
+def test_remove_cycles_case1(remove):
     G = nx.DiGraph()
     G.add_edge('A', 'B', pln_date=1)
     G.add_edge('C', 'D', pln_date=1)
@@ -49,12 +57,13 @@ def test_remove_cycles_case1():
     G.add_edge('D', 'F', pln_date=2)
     G.add_edge('B', 'D', pln_date=3)
     G.add_edge('D', 'B', pln_date=3)
-    remove_cycles(G)
+    remove(G)
     assert nx.is_directed_acyclic_graph(G)
     assert (not G.has_edge('D', 'B') or not G.has_edge('B', 'D'))
 
 
-def test_remove_cycles_case2():
+@pytest.mark.parametrize("remove", [remove_cycles, remove_cycles_scc, remove_cycles_fas])
+def test_remove_cycles_case2(remove):
     G = nx.DiGraph()
     G.add_edge('A', 'B', pln_date=1)
     G.add_edge('C', 'D', pln_date=1)
@@ -64,12 +73,13 @@ def test_remove_cycles_case2():
     G.add_edge('D', 'G', pln_date=2)
     G.add_edge('G', 'B', pln_date=1)
     G.add_edge('G', 'E', pln_date=3)
-    remove_cycles(G)
+    remove(G)
     assert nx.is_directed_acyclic_graph(G)
     assert (not G.has_edge('G', 'B') or not G.has_edge('B', 'G'))
 
 
-def test_remove_cycles_case3():
+@pytest.mark.parametrize("remove", [remove_cycles, remove_cycles_scc, remove_cycles_fas])
+def test_remove_cycles_case3(remove):
     G = nx.DiGraph()
     G.add_edge('A', 'C', pln_date=1)
     G.add_edge('C', 'D', pln_date=2)
@@ -80,7 +90,7 @@ def test_remove_cycles_case3():
     G.add_edge('G', 'H', pln_date=1)
     G.add_edge('H', 'G', pln_date=1)
     G.add_edge('H', 'F', pln_date=5)
-    remove_cycles(G)
+    remove(G)
     edges = [('H', 'G'), ('E', 'C')]
     assert nx.is_directed_acyclic_graph(G)
     for edge in edges:
@@ -88,6 +98,160 @@ def test_remove_cycles_case3():
         assert (not G.has_edge(u, v) or not G.has_edge(v, u))
 
 
+def test_remove_cycles_scc_self_loop():
+    G = nx.DiGraph()
+    G.add_edge('A', 'A', pln_date=1)
+    G.add_edge('A', 'B', pln_date=1)
+    assert remove_cycles_scc(G) == [('A', 'A')]
+    assert nx.is_directed_acyclic_graph(G)
+
+
+def test_remove_cycles_scc_same_policy():
+    G = nx.DiGraph()
+    G.add_edge('A', 'B', pln_date=3)
+    G.add_edge('B', 'C', pln_date=2)
+    G.add_edge('C', 'A', pln_date=4)
+    G.add_edge('C', 'D', pln_date=1)
+    assert remove_cycles_scc(G) == [('B', 'C')]
+
+
+def test_remove_cycles_scc_parallel():
+    G = nx.DiGraph()
+    for i in range(4):
+        nx.add_cycle(G, [(i, 'a'), (i, 'b'), (i, 'c')], pln_date=i)
+        G.add_edge((i, 'b'), (i, 'a'), pln_date=i + 1)
+        G.add_edge((i, 'c'), (i + 1, 'a'), pln_date=0)
+    H = G.copy()
+    edges_removed = remove_cycles_scc(G, n_jobs=2)
+    assert nx.is_directed_acyclic_graph(G)
+    assert sorted(edges_removed) == sorted(remove_cycles_scc(H))
+    assert len(edges_removed) >= 4
+
+
+def test_remove_cycles_fas_self_loop():
+    G = nx.DiGraph()
+    G.add_edge('A', 'A', pln_date=1)
+    G.add_edge('A', 'B', pln_date=1)
+    assert remove_cycles_fas(G) == [('A', 'A')]
+    assert nx.is_directed_acyclic_graph(G)
+
+
+def test_remove_cycles_fas_older_edge():
+    G = nx.DiGraph()
+    G.add_edge('A', 'B', pln_date=3)
+    G.add_edge('B', 'C', pln_date=2)
+    G.add_edge('C', 'A', pln_date=4)
+    G.add_edge('C', 'D', pln_date=1)
+    assert remove_cycles_fas(G) == [('B', 'C')]
+
+
+def test_remove_cycles_fas_dense():
+    # Every pair of nodes is a 2-cycle: the older edge of each pair suffices,
+    # where breaking one cycle at a time removes more.
+    G = nx.complete_graph(12, nx.DiGraph)
+    nx.set_edge_attributes(G, {(u, v): float(u * 12 + v) for u, v in G.edges}, "pln_date")
+    H = G.copy()
+    edges_removed = remove_cycles_fas(G)
+    assert nx.is_directed_acyclic_graph(G)
+    assert len(edges_removed) == 12 * 11 // 2
+    assert len(edges_removed) <= len(remove_cycles(H))
+    assert all(u < v for u, v in edges_removed)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_feedback_arc_set_array(seed):
+    G = random_citation_graph(200, 3.0, 0.1, 15, seed)
+    csr = from_networkx(G)
+    dates = np.array([date for _, _, date in G.edges(data="pln_date")], dtype=np.float64)
+    with record() as recorder:
+        edge_ids = feedback_arc_set_array(csr, dates)
+    heads, tails = edge_sources(csr), csr.indices
+    cyclic = {(u, v) for c in nx.strongly_connected_components(G) for u, v in G.subgraph(c).edges}
+    removed = list(zip(node_labels(csr, heads[edge_ids]), node_labels(csr, tails[edge_ids])))
+    assert set(removed) <= cyclic
+    G.remove_edges_from(removed)
+    assert nx.is_directed_acyclic_graph(G)
+    assert recorder.counters["edges_removed"] == len(edge_ids)
+
+
+def test_break_cycles():
+    G = random_citation_graph(200, 3.0, 0.1, 15, 0)
+    reports = {policy: break_cycles(G.copy(), policy) for policy in CYCLE_POLICIES}
+    for policy, report in reports.items():
+        assert report.policy == policy
+        assert report.edges_removed == len(report.removed) > 0
+        assert report.seconds >= 0
+    H = G.copy()
+    assert sorted(reports["scc"].removed) == sorted(remove_cycles_scc(H))
+    with pytest.raises(ValueError):
+        break_cycles(G, "dfs")
+
+
+def test_remove_anomalies_array():
+    G = nx.DiGraph([('A', 'B'), ('A', 'C'), ('C', 'B'), ('B', 'D'), ('D', 'E'), ('E', 'A')])
+    dates = {'A': 2000, 'B': 1999, 'C': 2005, 'D': 1999, 'E': 2001}
+    nx.set_node_attributes(G, dates, 'pln_date')
+    csr = from_networkx(G)
+    node_dates = np.array([dates.get(node, np.nan) for node in csr.nodes], dtype=float)
+    sub, edge_ids, removed = remove_anomalies_array(csr, node_dates)
+    assert sorted(removed) == [('A', 'C'), ('D', 'E')]
+    assert edge_ids.tolist() == [0, 2, 3, 5]
+
+    H = G.copy()
+    assert remove_anomalies(H) == len(removed)
+    assert list(to_networkx(sub).edges()) == list(H.edges())
+
+
+def test_remove_anomalies_array_undated():
+    csr = from_networkx(nx.DiGraph([(0, 1), (1, 2), (2, 3)]))
+    sub, edge_ids, removed = remove_anomalies_array(csr, np.array([1990, np.nan, 2000, 2010]))
+    assert removed == [(2, 3)]
+    assert sub.number_of_edges == 2
+
+
+def _level_of(levels, n):
+    level_of = np.empty(n, dtype=np.int64)
+    level_of[levels.order] = np.repeat(np.arange(levels.number_of_levels), np.diff(levels.level_ptr))
+    return level_of
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_date_levels(seed):
+    G = random_citation_graph(200, sink_fraction=0.1, seed=seed, first_year=2000, last_year=2004)
+    # Nodes citing others of the same year need more than one level per year.
+    G.add_edges_from([(u, v) for u, v in zip(list(G)[1:], list(G)[:-1]) if G.nodes[u]['pln_date'] ==
+                      G.nodes[v]['pln_date']], pln_date=0)
+    add_artificial_source_sync(G)
+    csr = from_networkx(G)
+    dates = node_dates(G, csr.nodes)
+    with record() as recorder:
+        levels = date_levels(csr, dates)
+    assert "date_order_fallbacks" not in recorder.counters
+    assert sorted(levels.order.tolist()) == list(range(csr.number_of_nodes))
+    level_of = _level_of(levels, csr.number_of_nodes)
+    heads = np.repeat(np.arange(csr.number_of_nodes), np.diff(csr.indptr))
+    assert np.all(level_of[heads] < level_of[csr.indices])
+    assert levels.order[0] == csr.nodes.index('source') and levels.order[-1] == csr.nodes.index('sync')
+    assert np.all(np.diff(dates[levels.order[1:-1]]) <= 0)
+
+
+def test_date_levels_fallback():
+    # A citation to a newer node leaves the order of the generic sort.
+    csr = from_networkx(nx.DiGraph([('A', 'B'), ('B', 'C')]))
+    with record() as recorder:
+        levels = date_levels(csr, np.array([2000, 2001, 1999]))
+    assert recorder.counters["date_order_fallbacks"] == 1
+    assert levels.order.tolist() == [0, 1, 2]
+    with pytest.raises(nx.NetworkXUnfeasible):
+        date_levels(from_networkx(nx.DiGraph([('A', 'B'), ('B', 'A')])), np.array([2000, 2000]))
+
+
+def test_node_dates():
+    G = nx.DiGraph([('A', 'B')])
+    G.nodes['A']['pln_date'] = 2001
+    assert np.array_equal(node_dates(G, ['A', 'B']), [2001, np.nan], equal_nan=True)
+
+
 def test_add_artificial_source_sync_dummy():
     G = nx.DiGraph()
     add_artificial_source_sync(G)
@@ -99,4 +263,82 @@ def test_add_artificial_source_sync():
     G = nx.DiGraph([(0, 1), (1, 2), (3, 2), (4, 1), (2, 5)])
     add_artificial_source_sync(G)
     assert get_sources(G) == ['source']
-    assert get_syncs(G) == ['sync']
\ No newline at end of file
+    assert get_syncs(G) == ['sync']
+
+
+@pytest.mark.parametrize("edges", [[(0, 1), (1, 2), (3, 2), (4, 1), (2, 5)], [(0, 1), (2, 2)], []])
+def test_add_artificial_source_sync_array(edges):
+    G = nx.DiGraph(edges)
+    G.add_node(6)
+    H = to_networkx(add_artificial_source_sync_array(from_networkx(G)))
+    add_artificial_source_sync(G)
+    assert list(H.nodes()) == list(G.nodes())
+    assert list(H.edges()) == list(G.edges())
+
+
+def test_add_artificial_source_sync_array_labels():
+    csr = from_networkx(nx.DiGraph([('P1', 'P2')]))
+    csr = add_artificial_source_sync_array(csr._replace(nodes=np.array(csr.nodes)))
+    assert csr.nodes.tolist() == ['P1', 'P2', 'source', 'sync']
+
+
+def test_add_artificial_source_sync_array_integer_labels():
+    csr = from_networkx(nx.DiGraph([(1, 2), (3, 2)]))
+    csr = add_artificial_source_sync_array(csr._replace(nodes=np.array(csr.nodes)))
+    assert csr.nodes.tolist() == [1, 2, 3, 'source', 'sync']
+    assert all(type(label) is int for label in csr.nodes[:3])
+
+
+def _is_trimmed_core(G, core):
+    H = G.subgraph(core)
+    cyclic = {node for c in nx.strongly_connected_components(G) if len(c) > 1 for node in c}
+    cyclic.update(node for node, _ in nx.selfloop_edges(G))
+    return all(H.in_degree(node) and H.out_degree(node) for node in H) and cyclic <= set(core)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_trim(seed):
+    G = nx.gnp_random_graph(60, 0.03, seed=seed, directed=True)
+    G.add_edge(0, 0)
+    core = trim(G)
+    assert _is_trimmed_core(G, core)
+    csr = from_networkx(G)
+    assert [csr.nodes[i] for i in trim_array(csr).tolist()] == core
+
+
+def test_trim_chain_into_cycle():
+    # A long chain into a cycle and out of it again is peeled down to the cycle.
+    G = nx.DiGraph()
+    nx.add_path(G, range(10))
+    nx.add_cycle(G, [4, 'a', 'b'])
+    assert trim(G) == [4, 'a', 'b']
+    assert trim_array(from_networkx(G)).tolist() == [4, 10, 11]
+    assert trim(nx.DiGraph([(0, 1), (1, 2)])) == []
+    assert len(G) == 12
+
+
+def test_compare_graphs():
+    G1 = nx.DiGraph()
+    G1.add_edge('A', 'B', SPLC=2)
+    G1.add_edge('A', 'C', SPLC=3)
+    G1.add_edge('C', 'B', SPLC=2 ** 70)
+    G2 = nx.DiGraph()
+    G2.add_edge('C', 'B', SPLC=2 ** 70)
+    G2.add_edge('A', 'C', SPLC=3)
+    G2.add_edge('A', 'B', SPLC=2)
+    assert compare_graphs(G1, G2)
+
+    G2['A']['B']['SPLC'] = 4
+    assert not compare_graphs(G1, G2)
+    assert compare_graphs(G1, G2, weight='missing')
+
+    relabeled = nx.relabel_nodes(G1, {'A': 'X', 'B': 'Y', 'C': 'Z'})
+    assert not compare_graphs(G1, relabeled)
+    assert compare_graphs(G1, relabeled, isomorphism=True)
+
+    G2 = G1.copy()
+    G2.remove_edge('A', 'B')
+    G2.add_edge('B', 'A', SPLC=2)
+    assert not compare_graphs(G1, G2)
+    G2.add_node('D')
+    assert not compare_graphs(G1, G2)
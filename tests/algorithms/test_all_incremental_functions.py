@@ -0,0 +1,109 @@
+import networkx as nx
+import pytest
+
+from src.algorithms.dag import get_syncs
+from src.algorithms.edge_weights import calculate_splc_optimized
+from src.algorithms.incremental import update_splc, main_path_state, update_main_path
+from src.algorithms.paths import dag_longest_path_length
+
+
+class DigraphExamples:
+    def __init__(self):
+        self.edges = [['source', 'A'], ['source', 'B'],
+                      ['A', 'C'], ['C', 'E'], ['C', 'H'], ['E', 'G'], ['G', 'H'], ['H', 'K'],
+                      ['B', 'C'], ['B', 'D'], ['B', 'J'], ['D', 'F'], ['D', 'I'], ['F', 'H'],
+                      ['F', 'I'], ['I', 'L'], ['I', 'M'], ['J', 'M'], ['M', 'N'],
+                      ['K', 'sync'], ['L', 'sync'], ['N', 'sync']]
+        self.G = nx.DiGraph()
+        self.G.add_edges_from(self.edges)
+        self.syncs = get_syncs(self.G)
+        calculate_splc_optimized(self.G, self.syncs)
+
+
+@pytest.fixture()
+def di_G():
+    return DigraphExamples()
+
+
+def assert_same_weights(G, syncs):
+    H = G.copy()
+    calculate_splc_optimized(H, syncs)
+    for node in H:
+        assert G.nodes[node]["Nall-"] == H.nodes[node]["Nall-"]
+        assert G.nodes[node]["N+"] == H.nodes[node]["N+"]
+    for u, v in H.edges():
+        assert G[u][v]["SPLC"] == H[u][v]["SPLC"]
+
+
+def test_update_splc_new_papers(di_G):
+    new_edges = [('source', 'P'), ('P', 'C'), ('P', 'D'), ('source', 'Q'), ('Q', 'P'), ('Q', 'J')]
+    changes = update_splc(di_G.G, new_edges, nodes=[('P', {"pln_date": 2022})], syncs=di_G.syncs)
+    assert di_G.G.nodes['P']["pln_date"] == 2022
+    assert changes[('P', 'C')] is None
+    assert changes[('M', 'N')] == 12
+    assert ('A', 'C') not in changes
+    assert_same_weights(di_G.G, di_G.syncs)
+
+
+def test_update_splc_default_syncs(di_G):
+    di_G.G.remove_node('source')
+    di_G.G.remove_node('sync')
+    calculate_splc_optimized(di_G.G, get_syncs(di_G.G))
+    update_splc(di_G.G, [('P', 'C'), ('N', 'O')])
+    assert_same_weights(di_G.G, get_syncs(di_G.G))
+
+
+def test_update_splc_edge_between_old_nodes(di_G):
+    changes = update_splc(di_G.G, [('A', 'D')], syncs=di_G.syncs)
+    assert changes[('A', 'D')] is None
+    assert_same_weights(di_G.G, di_G.syncs)
+
+
+def test_update_splc_cycle(di_G):
+    edges = set(di_G.G.edges())
+    with pytest.raises(nx.NetworkXUnfeasible):
+        update_splc(di_G.G, [('P', 'A'), ('H', 'B')])
+    assert set(di_G.G.edges()) == edges
+    assert 'P' not in di_G.G
+
+
+def test_update_splc_cycle_restores_data(di_G):
+    H = di_G.G.copy()
+    with pytest.raises(nx.NetworkXUnfeasible):
+        update_splc(di_G.G, [('A', 'C', {"SPLC": 0, "pln_date": 2000}), ('H', 'B')],
+                    nodes=[('B', {"Nall-": 0}), 'P'])
+    assert nx.utils.graphs_equal(di_G.G, H)
+
+
+def test_main_path_state(di_G):
+    state = main_path_state(di_G.G)
+    assert state.path == nx.dag_longest_path(di_G.G, weight="SPLC")
+    assert main_path_state(nx.DiGraph()).path == []
+
+
+def test_update_main_path(di_G):
+    state = main_path_state(di_G.G)
+    changes = update_splc(di_G.G, [('source', 'P'), ('P', 'E')], syncs=di_G.syncs)
+    state, changed = update_main_path(di_G.G, state, changes)
+    expected = nx.dag_longest_path(di_G.G, weight="SPLC")
+    assert changed
+    assert state.path[0] == 'source' and state.path[-1] == 'sync'
+    assert dag_longest_path_length(di_G.G, state.path, weight="SPLC") == \
+        dag_longest_path_length(di_G.G, expected, weight="SPLC")
+
+
+def test_update_main_path_unchanged(di_G):
+    state = main_path_state(di_G.G)
+    path = list(state.path)
+    changes = update_splc(di_G.G, [('A', 'X')], syncs=di_G.syncs + ['X'])
+    state, changed = update_main_path(di_G.G, state, changes)
+    assert not changed
+    assert state.path == path
+
+
+def test_update_main_path_decreased_weight(di_G):
+    state = main_path_state(di_G.G)
+    di_G.G['M']['N']["SPLC"] = 0
+    state, changed = update_main_path(di_G.G, state, {('M', 'N'): 9})
+    assert changed
+    assert state.path == nx.dag_longest_path(di_G.G, weight="SPLC")
@@ -0,0 +1,124 @@
+import json
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from src.algorithms.counting import accumulate, assign, multiply, new_counts
+from src.algorithms.dag import get_syncs, remove_cycles, remove_cycles_scc
+from src.algorithms.edge_weights import calculate_splc_optimized
+from src.algorithms.instrumentation import count, instrumented, record, stage
+
+
+class DigraphExamples:
+    def __init__(self):
+        self.G = nx.DiGraph()
+        self.G.add_edges_from([(1, 2, {"pln_date": 2001}), (2, 3, {"pln_date": 2002}),
+                               (3, 1, {"pln_date": 2000}), (3, 4, {"pln_date": 2003}),
+                               (4, 5, {"pln_date": 2004}), (5, 4, {"pln_date": 1999})])
+
+
+@pytest.fixture()
+def di_G():
+    return DigraphExamples()
+
+
+def test_inactive():
+    with stage("ignored") as entry:
+        count("ignored")
+    assert entry is None
+
+
+def test_stages_and_counters():
+    with record() as recorder:
+        with stage("outer"):
+            count("items", 2)
+            with stage("inner") as inner:
+                count("items")
+        count("items", np.int64(4))
+    assert [entry["path"] for entry in recorder.stages] == ["outer", "outer/inner"]
+    assert recorder.stages[0]["counters"] == {"items": 2}
+    assert inner["counters"] == {"items": 1}
+    assert recorder.counters == {"items": 7}
+    assert inner["wall_time"] <= recorder.stages[0]["wall_time"]
+    assert recorder.stages[0]["peak_traced"] is None
+    assert recorder.stages[0]["peak_rss"] > 0
+
+
+def test_nested_recorders():
+    with record() as outer:
+        with record() as inner:
+            count("items")
+        count("items", 2)
+    assert inner.counters == {"items": 1}
+    assert outer.counters == {"items": 2}
+
+
+def test_trace_memory():
+    with record(trace_memory=True) as recorder:
+        with stage("allocate") as outer:
+            with stage("small") as small:
+                data = [0] * 10
+            data = [0] * 10 ** 6
+    assert outer["peak_traced"] >= 8 * 10 ** 6 > small["peak_traced"]
+    del data
+
+
+def test_remove_cycles_counters(di_G):
+    with record() as recorder:
+        removed = remove_cycles(di_G.G.copy())
+    assert recorder.stages[0]["name"] == "remove_cycles"
+    assert recorder.counters["cycles_found"] == recorder.counters["edges_removed"] == len(removed) == 2
+
+    with record() as recorder:
+        remove_cycles_scc(di_G.G.copy())
+    assert recorder.counters["components"] == 2
+    assert recorder.counters["edges_removed"] == 2
+
+
+def test_splc_counters(di_G):
+    di_G.G.remove_edges_from([(3, 1), (5, 4)])
+    with record() as recorder:
+        calculate_splc_optimized(di_G.G, get_syncs(di_G.G))
+    paths = [entry["path"] for entry in recorder.stages]
+    assert paths[0] == "calculate_splc_optimized"
+    assert "calculate_splc_optimized/topological_levels" in paths
+    # One forward and one backward sweep.
+    assert recorder.counters["nodes_processed"] == 10
+    assert recorder.counters["edges_processed"] == 8
+
+
+def test_overflow_counters():
+    counts = new_counts(4)
+    assign(counts, np.array([0, 1]), 2 ** 61)
+    with record() as recorder:
+        accumulate(counts, np.array([2, 3]), np.array([0, 1, 0]), np.array([2, 1]))
+        multiply(counts, np.array([2, 3]), counts, np.array([0, 3]))
+    assert recorder.counters == {"overflow_promotions": 1, "overflow_products": 2}
+
+
+def test_instrumented():
+    @instrumented
+    def work(value):
+        """Doubles `value`."""
+        count("calls")
+        return 2 * value
+
+    assert work(2) == 4
+    assert work.__name__ == "work" and work.__doc__ == "Doubles `value`."
+    with record() as recorder:
+        work(1)
+    assert recorder.stages[0]["counters"] == {"calls": 1}
+
+
+def test_to_json(tmp_path):
+    with record() as recorder:
+        with stage("stage"):
+            count("items")
+    path = str(tmp_path / "metrics.json")
+    text = recorder.to_json(path)
+    with open(path) as fh:
+        data = json.load(fh)
+    assert data == json.loads(text)
+    assert data["stages"][0]["counters"] == {"items": 1}
+    assert data["counters"] == {"items": 1}
@@ -1,8 +1,11 @@
 import networkx as nx
+import numpy as np
 import pytest
 
+from src.algorithms.csr import from_networkx
 from src.algorithms.dag import get_syncs
-from src.algorithms.node_weights import calculate_n_all_minus, calculate_n_plus
+from src.algorithms.node_weights import calculate_n_all_minus, calculate_n_plus, calculate_n_all_minus_array, \
+    calculate_n_plus_array, calculate_traversal_counts, calculate_reach_counts
 
 
 class DigraphExamples:
@@ -39,3 +42,59 @@ def test_calculate_n_plus_correctness(di_G):
     n_plus_expected = [1, 1, 1, 1, 1, 2, 1, 3, 1, 1, 5, 2, 8, 2]
     for index, node in enumerate(reversed_top_order):
         assert di_G.G.nodes[node]["N+"] == n_plus_expected[index]
+
+
+def test_calculate_n_all_minus_array_correctness(di_G):
+    csr = from_networkx(di_G.G)
+    n_all_minus = calculate_n_all_minus_array(csr)
+    for node in di_G.topologic_order:
+        calculate_n_all_minus(di_G.G, node)
+
+    for index, node in enumerate(csr.nodes):
+        assert n_all_minus[index] == di_G.G.nodes[node]["Nall-"]
+
+
+def test_calculate_n_plus_array_correctness(di_G):
+    csr = from_networkx(di_G.G)
+    n_plus = calculate_n_plus_array(csr)
+    for node in reversed(di_G.topologic_order):
+        calculate_n_plus(di_G.G, node, di_G.syncs)
+
+    for index, node in enumerate(csr.nodes):
+        assert n_plus[index] == di_G.G.nodes[node]["N+"]
+
+
+def test_calculate_n_plus_array_explicit_syncs(di_G):
+    csr = from_networkx(di_G.G)
+    sync_mask = np.array([node in ('K', 'L') for node in csr.nodes])
+    n_plus = calculate_n_plus_array(csr, sync_mask=sync_mask)
+    for node in reversed(di_G.topologic_order):
+        calculate_n_plus(di_G.G, node, ['K', 'L'])
+
+    for index, node in enumerate(csr.nodes):
+        assert n_plus[index] == di_G.G.nodes[node]["N+"]
+
+
+def test_calculate_traversal_counts_correctness(di_G):
+    csr = from_networkx(di_G.G)
+    counts = calculate_traversal_counts(csr, ["N-", "Nall+"])
+    assert set(counts) == {"N-", "Nall+"}
+    for index, node in enumerate(csr.nodes):
+        sources = [u for u in nx.ancestors(di_G.G, node) if di_G.G.in_degree(u) == 0]
+        n_minus = sum(len(list(nx.all_simple_paths(di_G.G, u, node))) for u in sources)
+        n_all_plus = 1 + sum(len(list(nx.all_simple_paths(di_G.G, node, v))) for v in nx.descendants(di_G.G, node))
+        assert counts["N-"].values[index] == (n_minus if sources else 1)
+        assert counts["Nall+"].values[index] == n_all_plus
+
+
+def test_calculate_traversal_counts_unsupported(di_G):
+    with pytest.raises(ValueError):
+        calculate_traversal_counts(from_networkx(di_G.G), ["N"])
+
+
+def test_calculate_reach_counts(di_G):
+    csr = from_networkx(di_G.G)
+    n_ancestors, n_descendants = calculate_reach_counts(csr)
+    for index, node in enumerate(csr.nodes):
+        assert n_ancestors[index] == len(nx.ancestors(di_G.G, node)) + 1
+        assert n_descendants[index] == len(nx.descendants(di_G.G, node)) + 1
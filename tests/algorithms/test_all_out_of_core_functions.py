@@ -0,0 +1,82 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from src.algorithms.csr import CSRGraph, from_networkx, topological_levels
+from src.algorithms.dag import get_syncs
+from src.algorithms.edge_weights import calculate_splc_array
+from src.algorithms.out_of_core import sort_edges, calculate_splc_out_of_core, main_path_out_of_core
+from src.algorithms.paths import main_path_array
+
+
+class DigraphExamples:
+    def __init__(self):
+        self.edges = [['source', 'A'], ['source', 'B'],
+                      ['A', 'C'], ['C', 'E'], ['C', 'H'], ['E', 'G'], ['G', 'H'], ['H', 'K'],
+                      ['B', 'C'], ['B', 'D'], ['B', 'J'], ['D', 'F'], ['D', 'I'], ['F', 'H'],
+                      ['F', 'I'], ['I', 'L'], ['I', 'M'], ['J', 'M'], ['M', 'N'],
+                      ['K', 'sync'], ['L', 'sync'], ['N', 'sync']]
+        self.G = nx.DiGraph()
+        self.G.add_edges_from(self.edges)
+        # A second component, with a sink in the middle of a level.
+        self.G.add_edges_from([['P', 'Q'], ['P', 'R'], ['R', 'S']])
+        self.syncs = get_syncs(self.G)
+        self.csr = from_networkx(self.G)
+
+
+@pytest.fixture()
+def di_G():
+    return DigraphExamples()
+
+
+def _memory_mapped(csr, path):
+    np.save(str(path / "indptr.npy"), csr.indptr)
+    np.save(str(path / "indices.npy"), csr.indices)
+    return CSRGraph(csr.nodes, np.load(str(path / "indptr.npy"), mmap_mode="r"),
+                    np.load(str(path / "indices.npy"), mmap_mode="r"))
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 1000])
+def test_calculate_splc_out_of_core(di_G, tmp_path, block_size):
+    csr = _memory_mapped(di_G.csr, tmp_path)
+    edges = sort_edges(csr, str(tmp_path / "edges"), block_size=block_size)
+    levels = topological_levels(di_G.csr)
+    assert np.array_equal(edges.levels.order, levels.order)
+    splc = calculate_splc_out_of_core(csr, edges, block_size=block_size)
+    assert isinstance(splc, np.memmap)
+    assert splc.tolist() == calculate_splc_array(di_G.csr).tolist()
+
+    logs = calculate_splc_out_of_core(csr, edges, overflow="log", output=str(tmp_path / "logs.npy"),
+                                      block_size=block_size)
+    assert np.allclose(np.exp(logs), splc)
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 1000])
+def test_main_path_out_of_core(di_G, tmp_path, block_size):
+    edges = sort_edges(di_G.csr, str(tmp_path), block_size=block_size)
+    splc = calculate_splc_out_of_core(di_G.csr, edges, block_size=block_size)
+    index = {node: i for i, node in enumerate(di_G.csr.nodes)}
+    for kwargs in [{}, {"source": index["source"]}, {"method": "shortest"},
+                   {"source": index["B"], "target": index["N"], "method": "shortest"}]:
+        expected = main_path_array(di_G.csr, np.asarray(splc), **kwargs)
+        assert main_path_out_of_core(edges, splc, block_size=block_size, **kwargs).tolist() == expected.tolist()
+    with pytest.raises(nx.NetworkXNoPath):
+        main_path_out_of_core(edges, splc, source=index["P"], target=index["N"])
+
+
+def test_out_of_core_errors(di_G, tmp_path):
+    edges = sort_edges(di_G.csr, str(tmp_path))
+    with pytest.raises(ValueError):
+        calculate_splc_out_of_core(di_G.csr, edges, overflow="exact")
+    with pytest.raises(ValueError):
+        main_path_out_of_core(edges, np.ones(di_G.csr.number_of_edges), method="bellman-ford")
+    di_G.G.add_edge('sync', 'A')
+    with pytest.raises(nx.NetworkXUnfeasible):
+        sort_edges(from_networkx(di_G.G), str(tmp_path / "cyclic"))
+
+
+def test_out_of_core_empty(tmp_path):
+    csr = from_networkx(nx.DiGraph())
+    edges = sort_edges(csr, str(tmp_path))
+    assert len(calculate_splc_out_of_core(csr, edges)) == 0
+    assert len(main_path_out_of_core(edges, np.zeros(0))) == 0
@@ -0,0 +1,90 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from src.algorithms.csr import from_networkx, weakly_connected_components, subgraph
+from src.algorithms.dag import add_artificial_source_sync_array
+from src.algorithms.edge_weights import calculate_splc_array, calculate_splc_result
+from src.algorithms.parallel import pack_components, calculate_splc_parallel, \
+    calculate_splc_result_parallel
+
+
+class DigraphExamples:
+    def __init__(self):
+        self.edges = [['A', 'C'], ['C', 'E'], ['C', 'H'], ['E', 'G'], ['G', 'H'], ['H', 'K'],
+                      ['B', 'C'], ['B', 'D'], ['B', 'J'], ['D', 'F'], ['D', 'I'], ['F', 'H'],
+                      ['F', 'I'], ['I', 'L'], ['I', 'M'], ['J', 'M'], ['M', 'N'],
+                      ['O', 'P'], ['P', 'Q'], ['O', 'Q'], ['R', 'S'], ['T', 'S']]
+        self.G = nx.DiGraph()
+        self.G.add_edges_from(self.edges)
+        self.G.add_node('U')
+        for i in range(30):
+            self.G.add_edges_from([(('x', i), ('y', i)), (('y', i), ('z', i)), (('x', i), ('z', i))])
+        self.csr = from_networkx(self.G)
+
+
+@pytest.fixture()
+def di_G():
+    return DigraphExamples()
+
+
+def test_weakly_connected_components(di_G):
+    labels = weakly_connected_components(di_G.csr)
+    expected = list(nx.weakly_connected_components(di_G.G))
+    assert labels.max() + 1 == len(expected)
+    for component in expected:
+        assert len({labels[di_G.csr.nodes.index(node)] for node in component}) == 1
+
+
+def test_subgraph(di_G):
+    labels = weakly_connected_components(di_G.csr)
+    node_ids = np.flatnonzero(labels == labels[di_G.csr.nodes.index('O')])
+    sub, edge_ids = subgraph(di_G.csr, node_ids)
+    assert sub.number_of_nodes == 3
+    assert sub.number_of_edges == 3
+    assert np.all(node_ids[sub.indices] == di_G.csr.indices[edge_ids])
+
+
+def test_pack_components():
+    labels = np.array([0, 0, 0, 1, 1, 2, 3])
+    bins = pack_components(labels, np.array([10, 1, 0, 0]), 2)
+    assert bins[0] != bins[1]
+    assert sorted(bins.tolist()) == [0, 1, 1, 1]
+
+
+def test_calculate_splc_parallel(di_G):
+    expected = calculate_splc_array(di_G.csr)
+    assert np.array_equal(calculate_splc_parallel(di_G.csr, n_jobs=3), expected)
+    assert np.array_equal(calculate_splc_parallel(di_G.csr, n_jobs=1), expected)
+
+
+def test_calculate_splc_parallel_log(di_G):
+    expected = calculate_splc_array(di_G.csr, overflow="log")
+    assert np.allclose(calculate_splc_parallel(di_G.csr, n_jobs=2, overflow="log"), expected)
+
+
+def test_calculate_splc_parallel_overflow():
+    G = nx.DiGraph()
+    for i in range(70):
+        G.add_edges_from([(i, ('a', i)), (i, ('b', i)), (('a', i), i + 1), (('b', i), i + 1)])
+    G.add_edge('x', 'y')
+    csr = from_networkx(G)
+    splc = calculate_splc_parallel(csr, n_jobs=2)
+    assert splc.dtype == object
+    assert splc.tolist() == calculate_splc_array(csr).tolist()
+
+
+def test_calculate_splc_parallel_artificial(di_G):
+    expected = calculate_splc_array(add_artificial_source_sync_array(di_G.csr))
+    assert calculate_splc_parallel(di_G.csr, n_jobs=2, artificial=True).tolist() == expected.tolist()
+    assert calculate_splc_parallel(di_G.csr, n_jobs=1, artificial=True).tolist() == expected.tolist()
+    with pytest.raises(ValueError):
+        sync_mask = np.zeros(di_G.csr.number_of_nodes, dtype=bool)
+        calculate_splc_parallel(di_G.csr, sync_mask, artificial=True)
+
+
+def test_calculate_splc_result_parallel(di_G):
+    expected = calculate_splc_result(di_G.csr)
+    result = calculate_splc_result_parallel(di_G.csr, n_jobs=2)
+    assert np.array_equal(result.splc, expected.splc)
+    assert np.array_equal(result.node_counts, expected.node_counts)
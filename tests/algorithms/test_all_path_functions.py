@@ -1,9 +1,13 @@
 import networkx as nx
+import numpy as np
 import pytest
 
-from src.algorithms.dag import get_syncs
-from src.algorithms.edge_weights import calculate_splc_optimized
-from src.algorithms.paths import main_path
+from src.algorithms.csr import from_networkx, topological_levels
+from src.algorithms.dag import get_syncs, path_contain_edge, add_artificial_source_sync
+from src.algorithms.edge_weights import calculate_splc_optimized, calculate_splc_array
+from src.algorithms.paths import main_path, main_path_array, key_route_main_path, \
+    count_main_paths, count_main_paths_array, main_paths, main_paths_array, dag_longest_path_length
+from utils.generators import random_citation_graph
 
 
 class DigraphExamples:
@@ -45,3 +49,180 @@ def test_basic_main_path_shortest(di_G):
 def test_not_supported_method(di_G):
     with pytest.raises(ValueError):
         main_path(di_G.G, method='bellman-ford')
+
+
+def test_main_path_shortest_rooted(di_G):
+    expected_main_path = ['source', 'B', 'J', 'M', 'N', 'sync']
+    assert main_path(di_G.G, method='shortest') == expected_main_path
+    assert main_path(di_G.G, method='shortest', source='B', target='N') == ['B', 'J', 'M', 'N']
+
+
+@pytest.mark.parametrize("method", ["longest", "shortest"])
+def test_main_path_date_order(method):
+    G = random_citation_graph(150, sink_fraction=0.1, seed=4)
+    add_artificial_source_sync(G)
+    calculate_splc_optimized(G, get_syncs(G), date="pln_date")
+    path = main_path(G, method=method, date="pln_date")
+    weight = sum(G[u][v]["SPLC"] for u, v in zip(path, path[1:]))
+    expected = main_path(G, method=method)
+    assert weight == sum(G[u][v]["SPLC"] for u, v in zip(expected, expected[1:]))
+    assert path[0] == "source" and path[-1] == "sync"
+
+
+def test_main_path_global(di_G):
+    di_G.G.remove_node('source')
+    di_G.G.remove_node('sync')
+    assert main_path(di_G.G) == nx.dag_longest_path(di_G.G, weight="SPLC")
+    assert main_path(di_G.G, method='shortest') == ['B', 'J', 'M', 'N']
+
+
+def test_main_path_default_global():
+    G = nx.DiGraph()
+    G.add_edge('source', 'a', SPLC=1)
+    G.add_edge('x', 'y', SPLC=10)
+    assert main_path(G) == nx.dag_longest_path(G, weight="SPLC") == ['x', 'y']
+    assert main_path(G, source='source') == ['source', 'a']
+
+
+def test_main_path_does_not_mutate(di_G):
+    weights = {(u, v): w for u, v, w in di_G.G.edges(data="SPLC")}
+    main_path(di_G.G, method='shortest')
+    assert weights == {(u, v): w for u, v, w in di_G.G.edges(data="SPLC")}
+
+
+def test_main_path_array(di_G):
+    csr = from_networkx(di_G.G)
+    levels = topological_levels(csr)
+    splc = calculate_splc_array(csr, levels=levels)
+    path = main_path_array(csr, splc, levels)
+    assert [csr.nodes[i] for i in path] == ['source', 'B', 'D', 'F', 'I', 'M', 'N', 'sync']
+    assert len(main_path_array(from_networkx(nx.DiGraph()), np.zeros(0))) == 0
+
+
+def test_main_path_array_negative_weights():
+    G = nx.DiGraph()
+    G.add_weighted_edges_from([(0, 1, -5), (1, 2, 3), (2, 3, -1), (3, 4, 4)])
+    csr = from_networkx(G)
+    weights = np.array([w for _, _, w in G.edges(data="weight")])
+    path = main_path_array(csr, weights)
+    assert path.tolist() == nx.dag_longest_path(G)
+    assert main_path_array(csr, weights, source=0).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_main_path_array_unreachable_target():
+    G = nx.DiGraph([(0, 1), (2, 3)])
+    csr = from_networkx(G)
+    with pytest.raises(nx.NetworkXNoPath):
+        main_path_array(csr, np.ones(2), source=0, target=3)
+    with pytest.raises(ValueError):
+        main_path_array(csr, np.ones(2), method='bellman-ford')
+
+
+def test_key_route_main_path_global(di_G):
+    routes = key_route_main_path(di_G.G, 3)
+    all_paths = list(nx.all_simple_paths(di_G.G, 'source', 'sync'))
+    key_edges = [['K', 'sync'], ['H', 'K'], ['N', 'sync']]
+    for edge in key_edges:
+        heaviest = max(dag_longest_path_length(di_G.G, path, weight="SPLC") for path in all_paths
+                       if path_contain_edge(edge, path))
+        assert any(path_contain_edge(edge, route) and
+                   dag_longest_path_length(di_G.G, route, weight="SPLC") == heaviest for route in routes)
+    assert len(routes) == 2
+    assert len(routes) == len({tuple(route) for route in routes})
+    assert main_path(di_G.G) in key_route_main_path(di_G.G, di_G.G.number_of_edges())
+
+
+def test_key_route_main_path_local(di_G):
+    routes = key_route_main_path(di_G.G, 1, mode="local")
+    assert routes == [['source', 'A', 'C', 'E', 'G', 'H', 'K', 'sync']]
+
+
+def test_key_route_main_path_heaviest_through_edge(di_G):
+    H = di_G.G.copy()
+    H.remove_edge('source', 'B')
+    routes = key_route_main_path(H, 1)
+    assert routes == [['source', 'A', 'C', 'E', 'G', 'H', 'K', 'sync']]
+
+
+def test_key_route_main_path_sinks_inside_levels():
+    # Node 1 is a sink on the same level as node 2, which is not.
+    G = nx.DiGraph()
+    G.add_edge(0, 1, SPLC=5)
+    G.add_edge(0, 2, SPLC=1)
+    G.add_edge(2, 3, SPLC=1)
+    assert key_route_main_path(G, 2) == [[0, 1], [0, 2, 3]]
+    assert key_route_main_path(G, 2, mode='local') == [[0, 1], [0, 2, 3]]
+
+
+def test_key_route_main_path_ties():
+    # All 40 key edge candidates tie, so the first ones in edge order are the key edges.
+    G = nx.DiGraph()
+    G.add_edges_from((0, i, {"SPLC": 1}) for i in range(1, 41))
+    assert key_route_main_path(G, 3) == [[0, 1], [0, 2], [0, 3]]
+    G.add_edge(0, 41, SPLC=2)
+    assert key_route_main_path(G, 3) == [[0, 41], [0, 1], [0, 2]]
+
+
+def test_key_route_main_path_errors(di_G):
+    assert key_route_main_path(di_G.G, 0) == []
+    with pytest.raises(ValueError):
+        key_route_main_path(di_G.G, 1, mode="greedy")
+
+
+def _brute_force_main_paths(G, source, target, weight="weight"):
+    paths = list(nx.all_simple_paths(G, source, target))
+    lengths = [dag_longest_path_length(G, path, weight) for path in paths]
+    best = max(lengths)
+    return sorted(path for path, length in zip(paths, lengths) if length == best)
+
+
+def test_main_paths_ties():
+    # Three diamonds in a row, each with two branches of equal weight.
+    G = nx.DiGraph()
+    for k in range(3):
+        G.add_edge(f'v{k}', f'a{k}', weight=2)
+        G.add_edge(f'v{k}', f'b{k}', weight=1)
+        G.add_edge(f'a{k}', f'v{k + 1}', weight=1)
+        G.add_edge(f'b{k}', f'v{k + 1}', weight=2)
+    G.add_edge('v0', 'v3', weight=9)
+    expected = _brute_force_main_paths(G, 'v0', 'v3')
+    assert len(expected) == 9
+    assert count_main_paths(G, source='v0', weight='weight') == 9
+    assert sorted(main_paths(G, source='v0', weight='weight')) == expected
+    assert main_path(G, source='v0', weight='weight') in expected
+    assert count_main_paths(G, source='a0', weight='weight', target='v3') == 4
+
+
+def test_main_paths_limit():
+    G = nx.DiGraph()
+    for k in range(40):
+        G.add_edge(k, ('up', k), weight=1)
+        G.add_edge(k, ('down', k), weight=1)
+        G.add_edge(('up', k), k + 1, weight=1)
+        G.add_edge(('down', k), k + 1, weight=1)
+    assert count_main_paths(G, source=0, weight='weight') == 2 ** 40
+    paths = main_paths(G, source=0, weight='weight', limit=5)
+    listed = list(paths)
+    assert len(listed) == 5
+    assert len({tuple(path) for path in listed}) == 5
+    assert all(len(path) == 81 for path in listed)
+    assert list(main_paths(G, source=0, weight='weight', limit=0)) == []
+
+
+def test_main_paths_unique(di_G):
+    assert count_main_paths(di_G.G) == 1
+    assert list(main_paths(di_G.G)) == [main_path(di_G.G)]
+    assert count_main_paths(nx.DiGraph()) == 0
+
+
+def test_main_paths_array_global():
+    csr = from_networkx(nx.DiGraph([(0, 1), (2, 1), (1, 3), (4, 5)]))
+    weights = np.array([1, 2, 1, 3])
+    paths = sorted(path.tolist() for path in main_paths_array(csr, weights))
+    assert paths == [[0, 1, 3], [2, 1, 3], [4, 5]]
+    assert count_main_paths_array(csr, weights) == 3
+    assert count_main_paths_array(csr, weights, method='shortest') == 3
+    with pytest.raises(ValueError):
+        count_main_paths_array(csr, weights, method='bellman-ford')
+    with pytest.raises(ValueError):
+        next(main_paths_array(csr, weights, method='bellman-ford'))
@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+
+from src.algorithms.csr import CSRGraph, NODE_DTYPE, OFFSET_DTYPE, edge_subgraph, subgraph, \
+    topological_levels
+from src.algorithms.dag import add_artificial_source_sync_array
+from src.algorithms.edge_weights import calculate_splc_array
+from src.algorithms.instrumentation import record
+from src.algorithms.paths import main_path_array
+from src.algorithms.windows import closing_dates, restrict_levels, window_main_paths
+from utils.generators import random_citation_edges
+
+
+class CitationExamples:
+    def __init__(self, n_nodes=400, seed=5):
+        heads, tails, years = random_citation_edges(n_nodes, sink_fraction=0.1, seed=seed,
+                                                    first_year=2000, last_year=2019)
+        indptr = np.zeros(len(years) + 1, dtype=OFFSET_DTYPE)
+        np.cumsum(np.bincount(heads, minlength=len(years)), out=indptr[1:])
+        self.csr = CSRGraph(["P{}".format(i) for i in range(len(years))], indptr, tails.astype(NODE_DTYPE))
+        self.dates = years[heads].astype(np.float64)
+        self.ends = np.unique(self.dates)
+
+
+@pytest.fixture()
+def citations():
+    return CitationExamples()
+
+
+def _window(csr, keep, artificial, overflow="exact"):
+    """Returns the window graph built from scratch, its SPLC and its node labels."""
+    window, _ = edge_subgraph(csr, keep)
+    node_ids = np.flatnonzero((np.diff(window.indptr) > 0)
+                              | (np.bincount(window.indices, minlength=csr.number_of_nodes) > 0))
+    window, _ = subgraph(window, node_ids)
+    labels = [csr.nodes[i] for i in node_ids.tolist()]
+    if artificial:
+        window = add_artificial_source_sync_array(window)
+        labels += ["source", "sync"]
+    return window, calculate_splc_array(window, overflow=overflow), labels
+
+
+def _path_weight(window, splc, labels, path):
+    index = {label: i for i, label in enumerate(labels)}
+    total = 0
+    for u, v in zip(path, path[1:]):
+        u, v = index[u], index[v]
+        edges = np.arange(window.indptr[u], window.indptr[u + 1])
+        total += splc[edges[window.indices[edges] == v][0]]
+    return total
+
+
+@pytest.mark.parametrize("width", [None, 3])
+@pytest.mark.parametrize("artificial", [True, False])
+def test_window_main_paths(citations, width, artificial):
+    windows = window_main_paths(citations.csr, citations.dates, citations.ends[::-1], width,
+                                artificial=artificial)
+    assert [window.end for window in windows] == citations.ends.tolist()
+    for window in windows:
+        keep = citations.dates <= window.end
+        if width is not None:
+            assert window.start == window.end - width
+            keep &= citations.dates > window.start
+        graph, splc, labels = _window(citations.csr, keep, artificial)
+        assert window.edges == keep.sum()
+        assert window.nodes == len(labels) - 2 * artificial
+        source = labels.index("source") if artificial else None
+        expected = main_path_array(graph, splc, source=source)
+        assert _path_weight(graph, splc, labels, window.path) == \
+            _path_weight(graph, splc, labels, [labels[i] for i in expected.tolist()])
+        if artificial:
+            assert window.path[0] == "source" and window.path[-1] == "sync"
+
+
+def test_window_main_paths_shared_counts(citations):
+    with record() as recorder:
+        window_main_paths(citations.csr, citations.dates, citations.ends)
+    assert recorder.counters["shared_n_plus"] == len(citations.ends)
+    with record() as recorder:
+        window_main_paths(citations.csr, citations.dates, citations.ends, width=5)
+    # Only the windows starting before the first date hold every older edge.
+    assert recorder.counters["shared_n_plus"] == np.sum(citations.ends - 5 < citations.ends[0])
+
+
+def test_window_main_paths_open_window(citations):
+    # An edge dated before its head's other edges leaves the early windows
+    # without the later out-edges, so their N+ counts are not shared.
+    dates = citations.dates.copy()
+    dates[citations.csr.indptr[-2] - 1] = citations.ends[0]
+    with record() as recorder:
+        windows = window_main_paths(citations.csr, dates, citations.ends)
+    assert recorder.counters["shared_n_plus"] < len(citations.ends)
+    for window in windows:
+        graph, splc, labels = _window(citations.csr, dates <= window.end, True)
+        expected = main_path_array(graph, splc, source=labels.index("source"))
+        assert _path_weight(graph, splc, labels, window.path) == \
+            _path_weight(graph, splc, labels, [labels[i] for i in expected.tolist()])
+
+
+def test_window_main_paths_log(citations):
+    # The path maximizes the sum of the SPLC, not of its logs, i.e., their product.
+    windows = window_main_paths(citations.csr, citations.dates, citations.ends, overflow="log")
+    for window in windows:
+        graph, splc, labels = _window(citations.csr, citations.dates <= window.end, True)
+        expected = main_path_array(graph, splc, source=labels.index("source"))
+        assert _path_weight(graph, splc, labels, window.path) == \
+            _path_weight(graph, splc, labels, [labels[i] for i in expected.tolist()])
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_window_main_paths_log_product(seed):
+    # Small graphs where the largest sum and the largest product of SPLC often differ.
+    citations = CitationExamples(12, seed)
+    exact = window_main_paths(citations.csr, citations.dates, citations.ends)
+    log = window_main_paths(citations.csr, citations.dates, citations.ends, overflow="log")
+    for window, log_window in zip(exact, log):
+        graph, splc, labels = _window(citations.csr, citations.dates <= window.end, True)
+        assert _path_weight(graph, splc, labels, log_window.path) == \
+            _path_weight(graph, splc, labels, window.path)
+
+
+def test_window_main_paths_empty(citations):
+    windows = window_main_paths(citations.csr, citations.dates, [citations.ends[0] - 1])
+    assert windows[0].nodes == windows[0].edges == 0
+    assert windows[0].path == []
+
+
+def test_closing_dates():
+    csr = CSRGraph(["a", "b", "c"], np.array([0, 2, 3, 3]), np.array([1, 2, 2]))
+    dates = np.array([2000.0, 2001.0, 1999.0])
+    assert closing_dates(csr, dates).tolist() == [2001.0, 2001.0, 1999.0]
+    dates[2] = np.nan
+    assert closing_dates(csr, dates).tolist() == [np.inf, 2001.0, np.inf]
+
+
+def test_restrict_levels(citations):
+    levels = topological_levels(citations.csr)
+    node_ids = np.flatnonzero(np.arange(citations.csr.number_of_nodes) % 3 > 0)
+    keep = np.isin(np.repeat(np.arange(citations.csr.number_of_nodes), np.diff(citations.csr.indptr)),
+                   node_ids) & np.isin(citations.csr.indices, node_ids)
+    window, _ = edge_subgraph(citations.csr, keep)
+    window, _ = subgraph(window, node_ids)
+    restricted = restrict_levels(levels, node_ids)
+    assert sorted(restricted.order.tolist()) == list(range(len(node_ids)))
+    assert np.all(np.diff(restricted.level_ptr) > 0)
+    level_of = np.empty(len(node_ids), dtype=np.int64)
+    level_of[restricted.order] = np.repeat(np.arange(restricted.number_of_levels),
+                                           np.diff(restricted.level_ptr))
+    heads = np.repeat(np.arange(len(node_ids)), np.diff(window.indptr))
+    assert np.all(level_of[heads] < level_of[window.indices])
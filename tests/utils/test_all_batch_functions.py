@@ -0,0 +1,73 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils.batch import BASE_MEMORY, estimate_memory, main, run_batch
+from utils.generators import random_citation_edges
+from utils.pipeline import run_pipeline
+
+
+class CitationFiles:
+    def __init__(self, path):
+        self.paths = []
+        for seed, n_nodes in enumerate((400, 100, 200)):
+            heads, tails, years = random_citation_edges(n_nodes, sink_fraction=0.1, n_cycles=3, seed=seed)
+            rows = {'Source': ["P{}".format(i) for i in heads], 'Target': ["P{}".format(i) for i in tails],
+                    'pln_date': years[heads]}
+            self.paths.append(str(path / "edges_{}.csv".format(seed)))
+            pd.DataFrame(rows).to_csv(self.paths[-1], index=False)
+        self.directory = str(path)
+        self.cache_dir = str(path / "cache")
+
+
+@pytest.fixture()
+def citations(tmp_path):
+    return CitationFiles(tmp_path)
+
+
+def test_estimate_memory(citations):
+    estimates = [estimate_memory(path) for path in citations.paths]
+    assert min(estimates) > BASE_MEMORY
+    assert estimates[0] > estimates[2] > estimates[1]
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_run_batch(citations, n_jobs):
+    summary = run_batch(citations.paths, n_jobs, cache_dir=citations.cache_dir)
+    assert summary["file"].tolist() == citations.paths
+    assert (summary["status"] == "ok").all()
+    for row in summary.itertuples():
+        result = run_pipeline(row.file, citations.cache_dir)
+        assert row.path == "->".join(result.path)
+        assert row.anomalies == result.stages["anomalies"]["removed"]
+        assert row.edges == result.graph.csr.number_of_edges
+
+
+def test_run_batch_memory_limit(citations):
+    # No two files fit together, so they run one at a time, the largest first.
+    summary = run_batch(citations.paths, 3, memory_limit=BASE_MEMORY, cache_dir=citations.cache_dir)
+    assert (summary["status"] == "ok").all()
+    runs = summary.sort_values("started")
+    assert runs["file"].tolist() == [citations.paths[0], citations.paths[2], citations.paths[1]]
+    assert (runs["started"].values[1:] >= runs["finished"].values[:-1]).all()
+
+
+def test_run_batch_failed_file(citations, tmp_path):
+    broken = str(tmp_path / "broken.csv")
+    with open(broken, "w") as fh:
+        fh.write("From,To\n1,2\n")
+    summary = run_batch([broken] + citations.paths, 2, cache_dir=citations.cache_dir)
+    assert summary["status"].tolist() == ["failed", "ok", "ok", "ok"]
+    assert "ValueError" in summary["error"][0]
+
+
+def test_main(citations, tmp_path):
+    output_dir, summary_path = tmp_path / "paths", str(tmp_path / "summary.csv")
+    summary = main([citations.directory, "--jobs", "2", "--cache-dir", citations.cache_dir, "--memory-limit",
+                    "1", "--output-dir", str(output_dir), "--summary", summary_path])
+    assert len(summary) == 3
+    assert sorted(os.listdir(output_dir)) == ["main_path_edges_{}.txt".format(seed) for seed in range(3)]
+    with open(output_dir / "main_path_edges_0.txt") as fh:
+        assert fh.read() == summary["path"][0] + "->"
+    assert pd.read_csv(summary_path)["status"].tolist() == ["ok"] * 3
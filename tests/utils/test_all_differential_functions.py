@@ -0,0 +1,67 @@
+import networkx as nx
+import pytest
+
+from src.algorithms.dag import remove_cycles_scc
+from utils import differential
+from utils.differential import diff_cycle_removal, diff_main_paths, diff_splc, run_differential
+from utils.generators import random_citation_graph
+
+
+def assert_no_diffs(diffs):
+    assert diffs and all(problems == [] for problems in diffs.values()), diffs
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_run_differential_oracle(seed):
+    diffs = run_differential(15, seed, n_cycles=2)
+    assert "fast" in diffs["splc"] and "optimized" in diffs["splc"] and "count" in diffs["main_path"]
+    for stage in diffs.values():
+        assert_no_diffs(stage)
+
+
+def test_run_differential_large():
+    diffs = run_differential(1500, 11, n_cycles=10)
+    assert "fast" not in diffs["splc"] and "count" not in diffs["main_path"]
+    for stage in diffs.values():
+        assert_no_diffs(stage)
+
+
+def test_diff_splc_engines():
+    G = random_citation_graph(40, sink_fraction=0.2, seed=5)
+    diffs = diff_splc(G, engines=["array", "out_of_core"], oracle="optimized")
+    assert set(diffs) == {"array", "out_of_core"}
+    assert_no_diffs(diffs)
+
+
+def test_diff_splc_detects_wrong_engine(monkeypatch):
+    G = random_citation_graph(15, seed=6)
+    engine = differential.SPLC_ENGINES["array"]
+    monkeypatch.setitem(differential.SPLC_ENGINES, "array",
+                        lambda H: {edge: value + 1 for edge, value in engine(H).items()})
+    diffs = diff_splc(G)
+    assert len(diffs["array"]) == G.number_of_edges()
+    edge, value, expected = diffs["array"][0]
+    assert value == expected + 1
+    assert diffs["optimized"] == []
+
+
+def test_diff_main_paths_detects_wrong_engine(monkeypatch):
+    G = random_citation_graph(15, seed=7)
+    nx.set_edge_attributes(G, 1, "SPLC")
+    monkeypatch.setitem(differential.MAIN_PATH_ENGINES, "array", lambda H, weight: list(H)[:2])
+    diffs = diff_main_paths(G)
+    assert diffs["array"] and diffs["networkx"] == []
+
+
+def test_diff_cycle_removal_detects_wrong_engine(monkeypatch):
+    G = random_citation_graph(30, n_cycles=3, seed=8)
+    monkeypatch.setitem(differential.CYCLE_REMOVAL_ENGINES, "trimmed", lambda H, weight: [])
+    diffs = diff_cycle_removal(G, engines=["scc", "trimmed"])
+    assert diffs["scc"] == []
+    assert diffs["trimmed"] == [("cyclic", None)]
+
+
+def test_diff_cycle_removal_acyclic():
+    G = random_citation_graph(30, seed=9)
+    assert_no_diffs(diff_cycle_removal(G))
+    assert remove_cycles_scc(G.copy()) == []
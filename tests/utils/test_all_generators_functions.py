@@ -0,0 +1,52 @@
+import networkx as nx
+import numpy as np
+
+from utils.generators import random_citation_edges, random_citation_graph
+
+
+def test_random_citation_edges_seeded():
+    first = random_citation_edges(500, seed=7)
+    second = random_citation_edges(500, seed=7)
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
+    assert not np.array_equal(first[0], random_citation_edges(500, seed=8)[0])
+
+
+def test_random_citation_edges_time_ordered():
+    heads, tails, years = random_citation_edges(1000, references=4, seed=1)
+    assert np.all(tails < heads)
+    assert np.all(np.diff(years) >= 0)
+    assert np.all(years[heads] >= years[tails])
+    keys = heads * 1000 + tails
+    assert len(np.unique(keys)) == len(keys)
+
+
+def test_random_citation_edges_preferential_attachment():
+    heads, tails, _ = random_citation_edges(5000, seed=3)
+    citations = np.bincount(tails, minlength=5000)
+    # Old nodes attract far more citations than the average.
+    assert citations[:50].mean() > 5 * citations.mean()
+
+
+def test_random_citation_graph_syncs():
+    G = random_citation_graph(1000, sink_fraction=0.5, seed=2)
+    syncs = [node for node in G if not G.out_degree(node)]
+    assert 400 < len(syncs) < 600
+    assert nx.is_directed_acyclic_graph(G)
+    for u, v, data in G.edges(data=True):
+        assert data["pln_date"] == G.nodes[u]["pln_date"]
+        assert type(data["pln_date"]) is int
+
+
+def test_random_citation_graph_cycles():
+    G = random_citation_graph(200, n_cycles=5, seed=4)
+    H = random_citation_graph(200, seed=4)
+    assert not nx.is_directed_acyclic_graph(G)
+    assert 0 < G.number_of_edges() - H.number_of_edges() <= 5
+    assert set(H.edges()) <= set(G.edges())
+
+
+def test_random_citation_graph_tiny():
+    assert random_citation_graph(0, seed=0).number_of_nodes() == 0
+    G = random_citation_graph(1, n_cycles=2, seed=0)
+    assert G.number_of_nodes() == 1 and G.number_of_edges() == 0
@@ -0,0 +1,99 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.algorithms.dag import remove_anomalies, remove_cycles_fas, remove_cycles_scc
+from utils.loading import load_edge_list, remove_edge_anomalies, remove_edge_cycles
+
+
+class EdgeListExamples:
+    def __init__(self, path, extra_rows=()):
+        self.rows = [['P1', 'P2', 2001], ['P1', 'P3', 2001], ['P4', 'P1', 2005],
+                     ['P2', 'P3', 1999], ['P1', 'P2', 2002], ['P5', 'P5', 2010],
+                     ['P3', 'P6', 1998], ['P4', 'P6', 2004], ['P2', 'P7', 2000]] + list(extra_rows)
+        self.path = str(path / "edges.csv")
+        pd.DataFrame(self.rows, columns=['Source', 'Target', 'pln_date']).to_csv(self.path, index=False)
+        data = pd.read_csv(self.path)
+        self.G = nx.from_pandas_edgelist(
+            data,
+            source='Source',
+            target='Target',
+            create_using=nx.DiGraph(),
+            edge_attr="pln_date"
+        )
+        nx.set_node_attributes(G=self.G, values=pd.Series(data.pln_date.values, index=data.Source).to_dict(),
+                               name="pln_date")
+
+
+@pytest.fixture()
+def edge_list(tmp_path):
+    return EdgeListExamples(tmp_path)
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 4, 100])
+def test_load_edge_list(edge_list, chunksize):
+    graph = load_edge_list(edge_list.path, chunksize=chunksize)
+    assert graph.csr.indices.dtype == np.int32
+    assert graph.csr.number_of_edges == 8
+    H = graph.to_networkx()
+    assert list(H.nodes(data=True)) == list(edge_list.G.nodes(data=True))
+    assert list(H.edges(data=True)) == list(edge_list.G.edges(data=True))
+
+
+def test_load_edge_list_numeric_labels(tmp_path):
+    rows = [[123, 45, 2001], [45, 6, 1999], [123, 6, 2001]]
+    path = str(tmp_path / "numeric.csv")
+    pd.DataFrame(rows, columns=['Source', 'Target', 'pln_date']).to_csv(path, index=False)
+    assert load_edge_list(path).csr.nodes == ['123', '45', '6']
+    graph = load_edge_list(path, chunksize=2, label_dtype=None)
+    assert graph.csr.nodes == [123, 45, 6]
+    G = nx.from_pandas_edgelist(pd.read_csv(path), source='Source', target='Target',
+                                create_using=nx.DiGraph())
+    assert list(graph.to_networkx().edges()) == list(G.edges())
+
+
+def test_load_edge_list_node_dates(edge_list):
+    graph = load_edge_list(edge_list.path)
+    dates = dict(zip(graph.csr.nodes, graph.node_pln_date.tolist()))
+    assert dates['P1'] == 2002
+    assert np.isnan(dates['P7'])
+    H = graph.to_networkx(node_dates=False)
+    assert all(not data for _, data in H.nodes(data=True))
+    assert H['P1']['P2']['pln_date'] == 2002
+
+
+def test_remove_edge_anomalies(tmp_path):
+    # P6 and P7 are dated older than the nodes citing them.
+    edge_list = EdgeListExamples(tmp_path, [['P6', 'P4', 1990], ['P7', 'P2', 1991]])
+    graph, edges_removed, removed = remove_edge_anomalies(load_edge_list(edge_list.path))
+    assert edges_removed == remove_anomalies(edge_list.G)
+    assert sorted(removed) == [('P6', 'P4'), ('P7', 'P2')]
+    H = graph.to_networkx()
+    assert list(H.edges(data=True)) == list(edge_list.G.edges(data=True))
+    assert list(H.nodes(data=True)) == list(edge_list.G.nodes(data=True))
+
+
+@pytest.mark.parametrize("method", ["scc", "simple"])
+def test_remove_edge_cycles(tmp_path, method):
+    edge_list = EdgeListExamples(tmp_path, [['P3', 'P1', 1997], ['P6', 'P4', 1996], ['P7', 'P8', 2000]])
+    graph, removed = remove_edge_cycles(load_edge_list(edge_list.path), method)
+    H = graph.to_networkx()
+    assert nx.is_directed_acyclic_graph(H)
+    assert list(H.nodes(data=True)) == list(edge_list.G.nodes(data=True))
+    assert sorted(removed) == sorted(remove_cycles_scc(edge_list.G))
+    assert list(H.edges(data=True)) == list(edge_list.G.edges(data=True))
+
+
+def test_remove_edge_cycles_fas(tmp_path):
+    edge_list = EdgeListExamples(tmp_path, [['P3', 'P1', 1997], ['P6', 'P4', 1996], ['P7', 'P8', 2000]])
+    graph, removed = remove_edge_cycles(load_edge_list(edge_list.path), "fas")
+    H = graph.to_networkx()
+    assert nx.is_directed_acyclic_graph(H)
+    assert sorted(removed) == sorted(remove_cycles_fas(edge_list.G))
+    assert list(H.edges(data=True)) == list(edge_list.G.edges(data=True))
+
+
+def test_remove_edge_cycles_method(edge_list):
+    with pytest.raises(ValueError):
+        remove_edge_cycles(load_edge_list(edge_list.path), "dfs")
@@ -0,0 +1,165 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.algorithms.dag import add_artificial_source_sync, get_syncs
+from src.algorithms.edge_weights import calculate_splc_optimized
+from src.algorithms.paths import main_path
+from utils.generators import random_citation_edges
+from utils.loading import load_edge_list
+from utils.pipeline import main, run_pipeline, run_windows, stage_key
+from utils.writing import graph_weights, read_columns
+
+
+class CitationFile:
+    def __init__(self, path):
+        heads, tails, years = random_citation_edges(300, sink_fraction=0.1, n_cycles=5, seed=3)
+        rows = {'Source': ["P{}".format(i) for i in heads], 'Target': ["P{}".format(i) for i in tails],
+                'pln_date': years[heads]}
+        self.path = str(path / "edges.csv")
+        self.cache_dir = str(path / "cache")
+        pd.DataFrame(rows).to_csv(self.path, index=False)
+
+
+@pytest.fixture()
+def citations(tmp_path):
+    return CitationFile(tmp_path)
+
+
+def test_run_pipeline(citations):
+    result = run_pipeline(citations.path, citations.cache_dir)
+    assert [info["cached"] for info in result.stages.values()] == [None, False, False, False, False]
+    # The injected cycles go against time, so they are removed as anomalies.
+    assert result.stages["anomalies"]["removed"] > 0
+    assert result.stages["cycles"]["removed"] == 0
+
+    G = result.graph.to_networkx()
+    add_artificial_source_sync(G)
+    calculate_splc_optimized(G, get_syncs(G))
+    assert result.splc.tolist() == [data["SPLC"] for _, _, data in G.edges(data=True)]
+    assert result.path == main_path(G)
+
+
+def test_run_pipeline_checkpoints(citations):
+    first = run_pipeline(citations.path, citations.cache_dir)
+    second = run_pipeline(citations.path, citations.cache_dir, method="shortest")
+    assert [info["cached"] for info in second.stages.values()] == [None, True, True, True, False]
+    assert second.stages["cycles"]["removed"] == first.stages["cycles"]["removed"]
+    third = run_pipeline(citations.path, citations.cache_dir, overflow="log")
+    assert [info["cached"] for info in third.stages.values()] == [None, True, True, False, False]
+    assert np.allclose(third.splc, np.log(first.splc.astype(np.float64)))
+    assert third.path == first.path
+    again = run_pipeline(citations.path, citations.cache_dir)
+    assert all(info["cached"] is not False for info in again.stages.values())
+    assert again.path == first.path
+
+
+def test_run_pipeline_log_path(tmp_path):
+    # On this graph, the path of the largest product of SPLC differs from the main path.
+    heads, tails, years = random_citation_edges(12, seed=3)
+    path = str(tmp_path / "edges.csv")
+    pd.DataFrame({'Source': heads, 'Target': tails, 'pln_date': years[heads]}).to_csv(path, index=False)
+    exact = run_pipeline(path, str(tmp_path / "cache"))
+    log = run_pipeline(path, str(tmp_path / "cache"), overflow="log")
+    assert np.allclose(log.splc, np.log(exact.splc.astype(np.float64)))
+    assert log.path == exact.path
+
+
+def test_run_pipeline_no_artificial(citations):
+    result = run_pipeline(citations.path, citations.cache_dir, anomalies=False, cycles="simple",
+                          artificial=False)
+    assert "anomalies" not in result.stages
+    assert result.stages["cycles"]["removed"] > 0
+    assert len(result.splc) == result.graph.csr.number_of_edges
+    G = result.graph.to_networkx()
+    calculate_splc_optimized(G, get_syncs(G))
+    assert result.path == main_path(G, source=None)
+
+
+def test_run_pipeline_parallel(citations):
+    first = run_pipeline(citations.path, citations.cache_dir)
+    second = run_pipeline(citations.path, n_jobs=2)
+    assert second.splc.tolist() == first.splc.tolist()
+    assert second.path == first.path
+    third = run_pipeline(citations.path, n_jobs=2, artificial=False)
+    assert len(third.splc) == third.graph.csr.number_of_edges
+
+
+def test_run_pipeline_options(citations):
+    with pytest.raises(ValueError):
+        run_pipeline(citations.path, citations.cache_dir, cycles="dfs")
+    with pytest.raises(ValueError):
+        run_pipeline(citations.path, citations.cache_dir, method="random")
+
+
+def test_stage_key():
+    assert stage_key("a", "splc", {"overflow": "log"}) == stage_key("a", "splc", {"overflow": "log"})
+    assert stage_key("a", "splc", {"overflow": "log"}) != stage_key("b", "splc", {"overflow": "log"})
+    assert stage_key("a", "splc", {"overflow": "log"}) != stage_key("a", "splc", {"overflow": "raise"})
+
+
+def test_main(citations, tmp_path, capsys):
+    output = str(tmp_path / "path.txt")
+    result = main([citations.path, "--cache-dir", citations.cache_dir, "--method", "shortest",
+                   "--output", output])
+    printed = capsys.readouterr().out
+    assert "cycles" in printed and " -> ".join(result.path) in printed
+    with open(output) as fh:
+        assert fh.read() == "->".join(result.path) + "->"
+
+
+def test_main_export(citations, tmp_path, capsys):
+    csv, columns = str(tmp_path / "dag.csv.gz"), str(tmp_path / "dag")
+    result = main([citations.path, "--cache-dir", citations.cache_dir, "--export", csv])
+    main([citations.path, "--cache-dir", citations.cache_dir, "--export", columns])
+    splc = graph_weights(result.graph, result.splc)
+    reloaded = load_edge_list(csv)
+    assert reloaded.csr.number_of_edges == result.graph.csr.number_of_edges
+    assert pd.read_csv(csv)["SPLC"].tolist() == splc.tolist()
+    exported = read_columns(columns)
+    assert exported.splc.tolist() == splc.tolist()
+    assert exported.main_path == result.path
+    # Reloaded into the pipeline, the exported DAG gives the same main path.
+    assert run_pipeline(csv, str(tmp_path / "cache"), anomalies=False, cycles="none").path == result.path
+
+
+def test_main_metrics(citations, tmp_path, capsys):
+    metrics = str(tmp_path / "metrics.json")
+    main([citations.path, "--cache-dir", citations.cache_dir, "--metrics", metrics])
+    with open(metrics) as fh:
+        data = json.load(fh)
+    names = [entry["path"] for entry in data["stages"]]
+    assert names[0] == "load" and "cycles/remove_cycles_scc" in names
+    assert data["counters"]["anomalies_removed"] > 0
+    assert data["stages"][0]["wall_time"] >= 0
+
+
+def test_run_windows(citations):
+    pipeline = run_pipeline(citations.path, citations.cache_dir)
+    result = run_windows(citations.path, cache_dir=citations.cache_dir)
+    assert [info["cached"] for info in result.stages.values()] == [None, True, True, False]
+    ends = np.unique(result.graph.pln_date)
+    assert [window.end for window in result.windows] == ends.tolist()
+    assert result.windows[-1].edges == result.graph.csr.number_of_edges
+    assert result.windows[-1].path == pipeline.path
+
+    yearly = run_windows(citations.path, ends[-3:], width=1, cache_dir=citations.cache_dir)
+    assert [window.start for window in yearly.windows] == (ends[-3:] - 1).tolist()
+    assert [window.edges for window in yearly.windows] == \
+        [np.sum(result.graph.pln_date == end) for end in ends[-3:]]
+    with pytest.raises(ValueError):
+        run_windows(citations.path, cycles="dfs")
+
+
+def test_main_windows(citations, tmp_path, capsys):
+    output = str(tmp_path / "paths.txt")
+    result = main([citations.path, "--cache-dir", citations.cache_dir, "--windows", "--output", output])
+    printed = capsys.readouterr().out
+    assert "windows" in printed
+    with open(output) as fh:
+        lines = fh.read().split("\n")
+    assert len(lines) == len(result.windows)
+    window = result.windows[-1]
+    assert lines[-1] == "{:g}: {}->".format(window.end, "->".join(window.path))
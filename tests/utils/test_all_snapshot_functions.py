@@ -0,0 +1,63 @@
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.loading import load_edge_list
+from utils.snapshot import load_snapshot, open_snapshot, write_snapshot
+
+
+class EdgeListExamples:
+    def __init__(self, path):
+        self.rows = [['P1', 'P2', 2001], ['P1', 'P3', 2001], ['P4', 'P1', 2005],
+                     ['P2', 'P3', 1999], ['P3', 'P6', 1998], ['P2', 'P7', 2000]]
+        self.path = str(path / "edges.csv")
+        self.cache_dir = str(path / "cache")
+        self.write(self.rows)
+
+    def write(self, rows):
+        pd.DataFrame(rows, columns=['Source', 'Target', 'pln_date']).to_csv(self.path, index=False)
+
+
+@pytest.fixture()
+def edge_list(tmp_path):
+    return EdgeListExamples(tmp_path)
+
+
+def _same_graph(G, H):
+    return list(G.nodes(data=True)) == list(H.nodes(data=True)) \
+        and list(G.edges(data=True)) == list(H.edges(data=True))
+
+
+def test_write_open_snapshot(edge_list, tmp_path):
+    graph = load_edge_list(edge_list.path)
+    write_snapshot(graph, str(tmp_path / "snapshot"))
+    snapshot = open_snapshot(str(tmp_path / "snapshot"))
+    assert isinstance(snapshot.csr.indices, np.memmap)
+    assert _same_graph(snapshot.to_networkx(), graph.to_networkx())
+
+
+def test_load_snapshot_reuses_cache(edge_list):
+    first = load_snapshot(edge_list.path, edge_list.cache_dir)
+    second = load_snapshot(edge_list.path, edge_list.cache_dir)
+    assert len(os.listdir(edge_list.cache_dir)) == 1
+    assert _same_graph(first.to_networkx(), second.to_networkx())
+    assert _same_graph(second.to_networkx(), load_edge_list(edge_list.path).to_networkx())
+
+    # Touching the file keeps the snapshot, since the content did not change.
+    os.utime(edge_list.path, ns=(0, 0))
+    load_snapshot(edge_list.path, edge_list.cache_dir)
+    assert len(os.listdir(edge_list.cache_dir)) == 1
+
+
+def test_load_snapshot_invalidation(edge_list):
+    load_snapshot(edge_list.path, edge_list.cache_dir)
+    snapshots = os.listdir(edge_list.cache_dir)
+    edge_list.write(edge_list.rows + [['P7', 'P8', 1990]])
+    graph = load_snapshot(edge_list.path, edge_list.cache_dir)
+    assert graph.csr.number_of_edges == 7
+    assert nx.is_isomorphic(graph.to_networkx(), load_edge_list(edge_list.path).to_networkx())
+    assert len(os.listdir(edge_list.cache_dir)) == 1
+    assert os.listdir(edge_list.cache_dir) != snapshots
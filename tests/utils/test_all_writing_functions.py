@@ -0,0 +1,102 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.algorithms.dag import add_artificial_source_sync_array
+from src.algorithms.edge_weights import calculate_splc_array, calculate_splc_result
+from utils.generators import random_citation_edges
+from utils.loading import load_edge_list, remove_edge_anomalies
+from utils.snapshot import open_snapshot
+from utils.writing import graph_weights, read_columns, write_columns, write_edge_list, write_main_paths, \
+    write_node_counts
+
+
+class WeightedExamples:
+    def __init__(self, path):
+        heads, tails, years = random_citation_edges(300, sink_fraction=0.1, seed=3)
+        rows = {'Source': ["P{}".format(i) for i in heads], 'Target': ["P{}".format(i) for i in tails],
+                'pln_date': years[heads]}
+        pd.DataFrame(rows).to_csv(str(path / "edges.csv"), index=False)
+        self.graph = remove_edge_anomalies(load_edge_list(str(path / "edges.csv")))[0]
+        self.result = calculate_splc_result(self.graph.csr)
+
+
+@pytest.fixture()
+def weighted(tmp_path):
+    return WeightedExamples(tmp_path)
+
+
+@pytest.mark.parametrize("name", ["weighted.csv", "weighted.csv.gz"])
+def test_write_edge_list(weighted, tmp_path, name):
+    file_path = str(tmp_path / name)
+    write_edge_list(file_path, weighted.graph, weighted.result.splc)
+    H = load_edge_list(file_path).to_networkx()
+    G = weighted.graph.to_networkx()
+    assert list(H.edges(data=True)) == list(G.edges(data=True))
+    assert list(H.nodes(data=True)) == list(G.nodes(data=True))
+    table = pd.read_csv(file_path)
+    assert list(table.columns) == ["Source", "Target", "pln_date", "SPLC"]
+    assert table["SPLC"].tolist() == weighted.result.splc.tolist()
+    if name.endswith(".gz"):
+        with open(file_path, "rb") as fh:
+            assert fh.read(2) == b"\x1f\x8b"
+
+
+def test_write_edge_list_compression(weighted, tmp_path):
+    with pytest.raises(ValueError):
+        write_edge_list(str(tmp_path / "weighted.csv"), weighted.graph, compression="zip")
+
+
+def test_graph_weights(weighted):
+    csr = weighted.graph.csr
+    splc = calculate_splc_array(add_artificial_source_sync_array(csr))
+    weights = graph_weights(weighted.graph, splc)
+    assert len(weights) == csr.number_of_edges
+    # Only the paths from the artificial source are added, so every weight grows.
+    assert np.all(weights >= weighted.result.splc)
+    assert graph_weights(weighted.graph, weighted.result.splc) is weighted.result.splc
+    with pytest.raises(ValueError):
+        graph_weights(weighted.graph, splc[:-1])
+
+
+def test_write_node_counts(weighted, tmp_path):
+    file_path = str(tmp_path / "nodes.csv.gz")
+    write_node_counts(file_path, weighted.result)
+    table = pd.read_csv(file_path, dtype={"node": str})
+    assert table["node"].tolist() == list(weighted.graph.csr.nodes)
+    assert table["Nall-"].tolist() == weighted.result.n_all_minus.tolist()
+    assert table["N+"].tolist() == weighted.result.n_plus.tolist()
+
+
+def test_write_main_paths(tmp_path):
+    file_path = str(tmp_path / "paths.txt")
+    write_main_paths(file_path, [["a", "b", "c"]])
+    with open(file_path) as fh:
+        assert fh.read() == "a->b->c->"
+    write_main_paths(file_path, [["a", "b"], [1, 2]], ["2000", "2001"])
+    with open(file_path) as fh:
+        assert fh.read() == "2000: a->b->\n2001: 1->2->"
+
+
+def test_write_columns(weighted, tmp_path):
+    path = str(tmp_path / "columns")
+    write_columns(path, weighted.graph, weighted.result.splc, weighted.result.node_counts, ["P1", "P2"])
+    columns = read_columns(path)
+    assert isinstance(columns.splc, np.memmap)
+    assert columns.splc.tolist() == weighted.result.splc.tolist()
+    assert columns.node_counts.tolist() == weighted.result.node_counts.tolist()
+    assert columns.main_path == ["P1", "P2"] and columns.overflow == "exact"
+    assert nx.utils.graphs_equal(open_snapshot(path).to_networkx(), weighted.graph.to_networkx())
+    assert calculate_splc_array(columns.graph.csr).tolist() == weighted.result.splc.tolist()
+    with pytest.raises(FileExistsError):
+        write_columns(path, weighted.graph)
+
+
+def test_write_columns_exact_overflow(weighted, tmp_path):
+    path = str(tmp_path / "columns")
+    splc = weighted.result.splc.astype(object)
+    splc[0] = 2 ** 70
+    write_columns(path, weighted.graph, splc)
+    columns = read_columns(path)
+    assert columns.splc[0] == 2 ** 70 and columns.node_counts is None and columns.main_path is None
@@ -0,0 +1,370 @@
+"""
+Differential testing of the SPLC, cycle removal and main path engines.
+
+Every engine runs on the same graph and its result is diffed against a
+reference: the brute force oracles on small graphs, and the other engines on
+large ones.
+"""
+import os
+import sys
+import tempfile
+
+import networkx as nx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.algorithms.csr import from_networkx
+from src.algorithms.dag import date_levels, get_sources, get_syncs, node_dates, remove_cycles, \
+    remove_cycles_fas, remove_cycles_scc, trim
+from src.algorithms.edge_weights import calculate_splc, calculate_splc_array, calculate_splc_fast, \
+    calculate_splc_optimized, calculate_traversal_weights_array
+from src.algorithms.incremental import main_path_state, update_splc
+from src.algorithms.out_of_core import calculate_splc_out_of_core, main_path_out_of_core, sort_edges
+from src.algorithms.parallel import calculate_splc_parallel
+from src.algorithms.paths import count_main_paths, main_path, main_path_array, main_paths
+from utils.generators import random_citation_graph
+
+__all__ = [
+    "SPLC_ENGINES",
+    "SPLC_ORACLES",
+    "MAIN_PATH_ENGINES",
+    "CYCLE_REMOVAL_ENGINES",
+    "ORACLE_MAX_EDGES",
+    "diff_splc",
+    "diff_main_paths",
+    "diff_cycle_removal",
+    "run_differential"
+]
+
+# The brute force oracles enumerate all simple paths, which grows exponentially.
+ORACLE_MAX_EDGES = 60
+
+
+def _edge_values(G, values) -> dict:
+    return dict(zip(G.edges(), values.tolist()))
+
+
+def _splc_attribute(G) -> dict:
+    return {(u, v): data["SPLC"] for u, v, data in G.edges(data=True)}
+
+
+def _splc_optimized(G) -> dict:
+    H = G.copy()
+    calculate_splc_optimized(H, get_syncs(H))
+    return _splc_attribute(H)
+
+
+def _splc_array(G) -> dict:
+    return _edge_values(G, calculate_splc_array(from_networkx(G)))
+
+
+def _splc_date_order(G) -> dict:
+    csr = from_networkx(G)
+    return _edge_values(G, calculate_splc_array(csr, levels=date_levels(csr, node_dates(G, csr.nodes))))
+
+
+def _splc_parallel(G) -> dict:
+    return _edge_values(G, calculate_splc_parallel(from_networkx(G), n_jobs=2))
+
+
+def _splc_traversal(G) -> dict:
+    return _edge_values(G, calculate_traversal_weights_array(from_networkx(G), ("SPLC",))["SPLC"])
+
+
+def _splc_out_of_core(G) -> dict:
+    csr = from_networkx(G)
+    with tempfile.TemporaryDirectory() as directory:
+        # Tiny blocks, so that every level is split.
+        edges = sort_edges(csr, directory, block_size=4)
+        return _edge_values(G, calculate_splc_out_of_core(csr, edges, block_size=4))
+
+
+def _splc_incremental(G) -> dict:
+    """Adds the edges to an edgeless copy of `G` in two halves."""
+    H = nx.DiGraph()
+    H.add_nodes_from(G)
+    calculate_splc_optimized(H, get_syncs(H))
+    edges = list(G.edges())
+    update_splc(H, edges[:len(edges) // 2])
+    update_splc(H, edges[len(edges) // 2:])
+    return _splc_attribute(H)
+
+
+def _splc_brute_force(G) -> dict:
+    H = G.copy()
+    calculate_splc(H, get_syncs(H))
+    return _splc_attribute(H)
+
+
+def _splc_fast(G) -> dict:
+    # Paths are joined as strings, so the labels must be strings.
+    H = nx.relabel_nodes(G, str)
+    calculate_splc_fast(H, get_sources(H), get_syncs(H))
+    labels = {str(node): node for node in G}
+    return {(labels[u], labels[v]): value for (u, v), value in _splc_attribute(H).items()}
+
+
+SPLC_ENGINES = {
+    "optimized": _splc_optimized,
+    "array": _splc_array,
+    "date_order": _splc_date_order,
+    "parallel": _splc_parallel,
+    "traversal": _splc_traversal,
+    "out_of_core": _splc_out_of_core,
+    "incremental": _splc_incremental
+}
+
+SPLC_ORACLES = {
+    "brute_force": _splc_brute_force,
+    "fast": _splc_fast
+}
+
+
+def _path_array_engine(G, weight) -> list:
+    csr = from_networkx(G)
+    weights = np.array([w for _, _, w in G.edges(data=weight)])
+    return [csr.nodes[i] for i in main_path_array(csr, weights).tolist()]
+
+
+def _path_out_of_core(G, weight) -> list:
+    csr = from_networkx(G)
+    weights = np.array([w for _, _, w in G.edges(data=weight)])
+    with tempfile.TemporaryDirectory() as directory:
+        edges = sort_edges(csr, directory, block_size=4)
+        path = main_path_out_of_core(edges, weights, block_size=4)
+    return [csr.nodes[i] for i in path.tolist()]
+
+
+MAIN_PATH_ENGINES = {
+    "networkx": lambda G, weight: nx.dag_longest_path(G, weight=weight),
+    "main_path": lambda G, weight: main_path(G, source=None, weight=weight),
+    "date_order": lambda G, weight: main_path(G, source=None, weight=weight, date="pln_date"),
+    "array": _path_array_engine,
+    "out_of_core": _path_out_of_core,
+    "incremental": lambda G, weight: main_path_state(G, weight=weight).path,
+    "tied": lambda G, weight: next(main_paths(G, source=None, weight=weight))
+}
+
+
+def _remove_cycles_trimmed(G, weight) -> list:
+    """Runs `remove_cycles` on the core left by `trim` only."""
+    core = G.subgraph(trim(G)).copy()
+    removed = remove_cycles(core, weight)
+    G.remove_edges_from(removed)
+    return removed
+
+
+CYCLE_REMOVAL_ENGINES = {
+    "remove_cycles": remove_cycles,
+    "trimmed": _remove_cycles_trimmed,
+    "scc": remove_cycles_scc,
+    "scc_parallel": lambda G, weight: remove_cycles_scc(G, weight, n_jobs=2),
+    "fas": remove_cycles_fas
+}
+
+
+def _select(engines, defaults: dict) -> dict:
+    if engines is None:
+        return dict(defaults)
+    return {name: defaults[name] for name in engines}
+
+
+def diff_splc(G, engines=None, oracle=None) -> dict:
+    """Runs the SPLC engines on `G` and diffs them against a reference.
+
+        Parameters
+        ----------
+        G : networkx.DiGraph
+            A directed acyclic graph (DAG). Its syncs are the nodes without
+            out-edges.
+
+        engines : list, optional
+            Names from `SPLC_ENGINES` and `SPLC_ORACLES`. Defaults to all the
+            engines, plus the oracles when `G` has at most `ORACLE_MAX_EDGES`
+            edges.
+
+        oracle : str, optional
+            The engine taken as reference. Defaults to 'brute_force' when it
+            runs, and to 'optimized' otherwise.
+
+        Returns
+        -------
+        dict
+            Maps every engine to the edges where it disagrees with the
+            reference, as `(edge, value, expected)` tuples. Empty lists mean
+            agreement.
+    """
+    available = dict(SPLC_ENGINES, **SPLC_ORACLES)
+    if engines is None:
+        engines = list(SPLC_ENGINES)
+        if G.number_of_edges() <= ORACLE_MAX_EDGES:
+            engines += list(SPLC_ORACLES)
+    if oracle is None:
+        oracle = "brute_force" if "brute_force" in engines else "optimized"
+    results = {name: engine(G) for name, engine in _select(set(engines) | {oracle}, available).items()}
+    expected = results[oracle]
+    return {name: [(edge, results[name].get(edge), value) for edge, value in expected.items()
+                   if results[name].get(edge) != value]
+            for name in engines if name != oracle}
+
+
+def _path_weight(G, path, weight):
+    """Returns the weight of `path`, or None if it is not a path of `G`."""
+    if not all(G.has_edge(u, v) for u, v in zip(path, path[1:])):
+        return None
+    return sum(G[u][v][weight] for u, v in zip(path, path[1:]))
+
+
+def _brute_force_main_paths(G, weight):
+    """Returns the weight of the global longest path and the paths with it,
+    enumerating all paths between sources and syncs."""
+    best, paths = 0, []
+    for source in get_sources(G):
+        for path in nx.all_simple_paths(G, source, get_syncs(G)):
+            value = _path_weight(G, path, weight)
+            if value > best:
+                best, paths = value, []
+            if value == best:
+                paths.append(path)
+    return best, paths
+
+
+def diff_main_paths(G, weight="SPLC", engines=None) -> dict:
+    """Runs the main path engines on `G` and diffs the path weights.
+
+        Parameters
+        ----------
+        G : networkx.DiGraph
+            A directed acyclic graph (DAG) with positive `weight` on every edge.
+
+        weight : str, optional (default = 'SPLC')
+
+        engines : list, optional
+            Names from `MAIN_PATH_ENGINES`. Defaults to all of them.
+
+        Returns
+        -------
+        dict
+            Maps every engine to a list of `(path, weight, expected)` tuples,
+            empty when it returned a path of `G` with the best weight. The
+            path 'count' is checked too, comparing `count_main_paths` to the
+            number of tied paths, when the oracle runs.
+
+        Notes
+        -----
+        Tied paths are legitimate, so the weights are compared, not the
+        paths. With at most `ORACLE_MAX_EDGES` edges, the best weight is found
+        by enumerating all paths; otherwise it is the one of
+        `networkx.dag_longest_path`.
+    """
+    paths = {name: engine(G, weight) for name, engine in _select(engines, MAIN_PATH_ENGINES).items()}
+    diffs = {}
+    if G.number_of_edges() <= ORACLE_MAX_EDGES:
+        expected, tied = _brute_force_main_paths(G, weight)
+        count = count_main_paths(G, source=None, weight=weight)
+        diffs["count"] = [] if count == len(tied) else [(None, count, len(tied))]
+    else:
+        expected = _path_weight(G, nx.dag_longest_path(G, weight=weight), weight)
+    for name, path in paths.items():
+        value = _path_weight(G, path, weight)
+        diffs[name] = [] if value == expected else [(path, value, expected)]
+    return diffs
+
+
+def _cyclic_edges(G) -> set:
+    """Returns the edges inside a strongly connected component with a cycle."""
+    edges = set(nx.selfloop_edges(G))
+    for component in nx.strongly_connected_components(G):
+        if len(component) > 1:
+            edges.update(G.subgraph(component).edges())
+    return edges
+
+
+def diff_cycle_removal(G, weight="pln_date", engines=None) -> dict:
+    """Runs the cycle removal engines on copies of `G` and checks their results.
+
+        Parameters
+        ----------
+        G : networkx.DiGraph
+            Its edges hold `weight`.
+
+        weight : str, optional (default = 'pln_date')
+
+        engines : list, optional
+            Names from `CYCLE_REMOVAL_ENGINES`. Defaults to all of them.
+
+        Returns
+        -------
+        dict
+            Maps every engine to a list of problems, empty when the result is
+            acyclic and every removed edge was in a cycle of `G`. The serial
+            and parallel 'scc' engines must also remove the same edges.
+
+        Notes
+        -----
+        The engines find the cycles in different orders, so their removed
+        edges may legitimately differ; only their invariants are compared.
+    """
+    cyclic = _cyclic_edges(G)
+    removed, diffs = {}, {}
+    for name, engine in _select(engines, CYCLE_REMOVAL_ENGINES).items():
+        H = G.copy()
+        removed[name] = engine(H, weight)
+        problems = [("outside cycles", edge) for edge in removed[name] if edge not in cyclic]
+        if len(set(removed[name])) != len(removed[name]):
+            problems.append(("removed twice", None))
+        if not nx.is_directed_acyclic_graph(H):
+            problems.append(("cyclic", None))
+        diffs[name] = problems
+    if "scc" in removed and "scc_parallel" in removed \
+            and sorted(removed["scc"]) != sorted(removed["scc_parallel"]):
+        diffs["scc_parallel"].append(("differs from scc", removed["scc_parallel"]))
+    return diffs
+
+
+def run_differential(n_nodes, seed, references=3.0, sink_fraction=0.1, n_cycles=0) -> dict:
+    """Generates a random citation graph and diffs all the engines on it.
+
+        Parameters
+        ----------
+        n_nodes : int
+
+        seed : int
+
+        references : float, optional (default = 3.0)
+
+        sink_fraction : float, optional (default = 0.1)
+
+        n_cycles : int, optional (default = 0)
+            See `utils.generators.random_citation_edges`.
+
+        Returns
+        -------
+        dict
+            Maps 'cycles', 'splc' and 'main_path' to the diffs of the engines
+            of each stage. The cycles removed by `remove_cycles_scc` give the
+            DAG of the later stages, whose `SPLC` is the weight of the main path.
+    """
+    G = random_citation_graph(n_nodes, references, sink_fraction, n_cycles, seed)
+    diffs = {"cycles": diff_cycle_removal(G)}
+    remove_cycles_scc(G)
+    diffs["splc"] = diff_splc(G)
+    nx.set_edge_attributes(G, _splc_optimized(G), "SPLC")
+    diffs["main_path"] = diff_main_paths(G)
+    return diffs
+
+
+if __name__ == "__main__":
+    # python utils/differential.py [n_nodes] [n_seeds] [n_cycles]
+    arguments = [int(arg) for arg in sys.argv[1:4]]
+    n_nodes, n_seeds, n_cycles = arguments + [20, 20, 2][len(arguments):]
+    failures = 0
+    for seed in range(n_seeds):
+        for stage, stage_diffs in run_differential(n_nodes, seed, n_cycles=n_cycles).items():
+            for name, problems in stage_diffs.items():
+                if problems:
+                    failures += 1
+                    print("seed {} {} {}: {}".format(seed, stage, name, problems[:5]))
+    print("{} disagreements in {} graphs of {} nodes".format(failures, n_seeds, n_nodes))
+    sys.exit(1 if failures else 0)
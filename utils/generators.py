@@ -0,0 +1,128 @@
+"""
+Random citation graph generators for testing and benchmarking Main Path Analysis.
+"""
+import networkx as nx
+import numpy as np
+
+__all__ = [
+    "random_citation_edges",
+    "random_citation_graph"
+]
+
+
+def _close_cycles(rng, heads: np.ndarray, tails: np.ndarray, n_cycles: int):
+    """Returns `n_cycles` edges, each closing a cycle through a random edge
+    and, when possible, one of the edges leaving its target."""
+    if not n_cycles or not len(heads):
+        return np.zeros(0, dtype=heads.dtype), np.zeros(0, dtype=tails.dtype)
+    order = np.argsort(heads, kind="stable")
+    indptr = np.searchsorted(heads[order], np.arange(max(heads.max(), tails.max()) + 2))
+    chosen = rng.integers(0, len(heads), n_cycles)
+    starts, ends = heads[chosen], tails[chosen]
+    degrees = indptr[ends + 1] - indptr[ends]
+    # Go one step further from the target when it cites something, for 3-cycles.
+    further = degrees > 0
+    offsets = rng.integers(0, np.iinfo(np.int64).max, further.sum()) % degrees[further]
+    steps = indptr[ends[further]] + offsets
+    ends[further] = tails[order[steps]]
+    return ends, starts
+
+
+def random_citation_edges(n_nodes: int, references=3.0, sink_fraction=0.0, n_cycles=0, seed=None,
+                          first_year=1980, last_year=2020):
+    """Returns a random citation graph as arrays, with preferential attachment.
+
+        Parameters
+        ----------
+        n_nodes : int
+
+        references : float, optional (default = 3.0)
+            The mean number of earlier nodes cited by each node.
+
+        sink_fraction : float, optional (default = 0.0)
+            The fraction of nodes, on top of the first one, that cite nothing
+            and are therefore syncs.
+
+        n_cycles : int, optional (default = 0)
+            The number of edges added against time, each closing a cycle.
+
+        seed : int, optional
+            The seed of the random number generator.
+
+        first_year : int, optional (default = 1980)
+
+        last_year : int, optional (default = 2020)
+            The range of the node pln_date.
+
+        Returns
+        -------
+        heads : numpy.ndarray
+            The citing node of every edge.
+
+        tails : numpy.ndarray
+            The cited node of every edge.
+
+        years : numpy.ndarray
+            The pln_date of every node, non-decreasing with the node index.
+
+        Notes
+        -----
+        Node `i` cites a Poisson number of nodes older than itself, each one
+        drawn with probability proportional to one plus its citations. Nodes
+        arrive in batches of about 5% of the current graph, and a batch only
+        cites the nodes before it, so the graph is acyclic and every edge
+        goes back in time until cycles are injected. The edges are unique
+        and sorted by citing node.
+    """
+    rng = np.random.default_rng(seed)
+    years = np.sort(rng.integers(first_year, last_year + 1, n_nodes))
+    citations = rng.poisson(references, n_nodes)
+    citations[rng.random(n_nodes) < sink_fraction] = 0
+    # Every node enters the urn once, and once more for each citation it gets.
+    urn = np.zeros(n_nodes + int(citations.sum()), dtype=np.int64)
+    urn_size, start = min(n_nodes, 1), 1
+    heads, tails = [], []
+    while start < n_nodes:
+        stop = min(n_nodes, start + max(1, start // 20))
+        counts = np.minimum(citations[start:stop], start)
+        batch_heads = np.repeat(np.arange(start, stop), counts)
+        batch_tails = urn[rng.integers(0, urn_size, len(batch_heads))]
+        keys = np.unique(batch_heads * n_nodes + batch_tails)
+        heads.append(keys // n_nodes)
+        tails.append(keys % n_nodes)
+        urn[urn_size:urn_size + len(keys)] = tails[-1]
+        urn_size += len(keys)
+        urn[urn_size:urn_size + stop - start] = np.arange(start, stop)
+        urn_size += stop - start
+        start = stop
+
+    heads = np.concatenate(heads) if heads else np.zeros(0, dtype=np.int64)
+    tails = np.concatenate(tails) if tails else np.zeros(0, dtype=np.int64)
+    cycle_heads, cycle_tails = _close_cycles(rng, heads, tails, n_cycles)
+    if len(cycle_heads):
+        keys = np.unique(np.concatenate((heads * n_nodes + tails, cycle_heads * n_nodes + cycle_tails)))
+        heads, tails = keys // n_nodes, keys % n_nodes
+    return heads, tails, years
+
+
+def random_citation_graph(n_nodes: int, references=3.0, sink_fraction=0.0, n_cycles=0, seed=None,
+                          first_year=1980, last_year=2020) -> nx.DiGraph:
+    """Returns a random citation graph, with preferential attachment.
+
+        Parameters
+        ----------
+        See `random_citation_edges`.
+
+        Returns
+        -------
+        G : networkx.DiGraph
+            Nodes are the integers up to `n_nodes`, and both nodes and edges
+            hold `pln_date`, the one of the citing node for edges, as in the
+            input .csv files.
+    """
+    heads, tails, years = random_citation_edges(n_nodes, references, sink_fraction, n_cycles, seed,
+                                                first_year, last_year)
+    G = nx.DiGraph()
+    G.add_nodes_from((node, {"pln_date": year}) for node, year in enumerate(years.tolist()))
+    G.add_edges_from((u, v, {"pln_date": int(years[u])}) for u, v in zip(heads.tolist(), tails.tolist()))
+    return G
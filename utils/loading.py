@@ -1,13 +1,25 @@
+from typing import NamedTuple
+
 import networkx as nx
+import numpy as np
 import pandas as pd
 import os.path
 import glob
 
+from src.algorithms.csr import CSRGraph, NODE_DTYPE, OFFSET_DTYPE, edge_sources, edge_subgraph, \
+    node_labels, subgraph, to_networkx
+from src.algorithms.dag import feedback_arc_set_array, remove_anomalies_array, remove_cycles, \
+    remove_cycles_scc, trim_array
+
 __all__ = [
     "get_all_input_graphml_files_path",
     "get_all_output_csv_files_path",
     "load_graphml_file",
     "load_csv_file",
+    "EdgeListGraph",
+    "load_edge_list",
+    "remove_edge_anomalies",
+    "remove_edge_cycles",
     "get_file"
 ]
 
@@ -83,6 +95,213 @@ def load_csv_file(file_path):
     return G
 
 
+class EdgeListGraph(NamedTuple):
+    """A citation graph loaded straight into CSR arrays.
+
+    `pln_date` holds the date of every edge index, and `node_pln_date` the
+    date of every node index, NaN for the nodes that never appear as a
+    source.
+    """
+    csr: CSRGraph
+    pln_date: np.ndarray
+    node_pln_date: np.ndarray
+
+    def to_networkx(self, node_dates=True) -> nx.DiGraph:
+        """Returns the graph as a NetworkX digraph with the `pln_date` edge
+        attribute, and the `pln_date` node attribute if `node_dates`."""
+        G = to_networkx(self.csr, {"pln_date": self.pln_date})
+        if node_dates:
+            dated = np.flatnonzero(~np.isnan(self.node_pln_date))
+            dates = self.node_pln_date[dated].astype(self.pln_date.dtype).tolist()
+            nodes = list(G)
+            nx.set_node_attributes(G, {nodes[i]: date for i, date in zip(dated.tolist(), dates)},
+                                   "pln_date")
+        return G
+
+
+def _intern(labels: np.ndarray, vocabulary: dict) -> np.ndarray:
+    """Returns the node index of every label, adding the new ones to `vocabulary`
+    in order of first occurrence."""
+    codes, uniques = pd.factorize(labels)
+    index = np.fromiter((vocabulary.setdefault(label, len(vocabulary)) for label in uniques),
+                        dtype=NODE_DTYPE, count=len(uniques))
+    return index[codes]
+
+
+def load_edge_list(file_path, source="Source", target="Target", date="pln_date", chunksize=2 ** 20,
+                   label_dtype=str):
+    """Returns the graph from a .csv edge list loaded in CSR arrays.
+
+        Parameters
+        ----------
+        file_path : str
+            A string with the absolute path of the .csv file.
+
+        source : str, optional (default = 'Source')
+            The column with the citing node.
+
+        target : str, optional (default = 'Target')
+            The column with the cited node.
+
+        date : str, optional (default = 'pln_date')
+            The column with the date of the citing node.
+
+        chunksize : int, optional
+            The number of rows parsed at a time.
+
+        label_dtype : type, optional (default = str)
+            The type the node labels are read as. By default, numeric labels
+            such as 123 become the string '123', unlike with
+            `pd.read_csv`. None keeps the type pandas infers, chunk by chunk,
+            so a numeric column should be numeric in every chunk.
+
+
+        Returns
+        -------
+        EdgeListGraph
+            Nodes and edges are indexed in the order `nx.from_pandas_edgelist`
+            gives them, so `to_networkx` returns the same graph as
+            `load_csv_file` style loading, with string labels unless
+            `label_dtype` is None.
+
+        Notes
+        -----
+        Node labels are read and interned to int32 indices chunk by chunk, so
+        only the index, date and vocabulary arrays outlive each chunk.
+        Repeated rows keep the position of the first one and the date of the
+        last one, and a node takes the date of its last row as source, as
+        `nx.from_pandas_edgelist` and `nx.set_node_attributes` do.
+    """
+    vocabulary: dict = {}
+    heads, tails, dates = [], [], []
+    dtype = None if label_dtype is None else {source: label_dtype, target: label_dtype}
+    reader = pd.read_csv(file_path, usecols=[source, target, date], dtype=dtype, chunksize=chunksize)
+    for chunk in reader:
+        # Interleaved, so nodes are numbered in the order NetworkX adds them.
+        labels = np.empty(2 * len(chunk), dtype=object)
+        labels[0::2] = chunk[source].to_numpy()
+        labels[1::2] = chunk[target].to_numpy()
+        ids = _intern(labels, vocabulary)
+        heads.append(ids[0::2])
+        tails.append(ids[1::2])
+        dates.append(chunk[date].to_numpy())
+
+    n = len(vocabulary)
+    nodes = list(vocabulary)
+    del vocabulary
+    heads = np.concatenate(heads) if heads else np.zeros(0, dtype=NODE_DTYPE)
+    tails = np.concatenate(tails) if tails else np.zeros(0, dtype=NODE_DTYPE)
+    dates = np.concatenate(dates) if dates else np.zeros(0, dtype=np.int64)
+
+    node_dates = np.full(n, np.nan)
+    node_dates[heads] = dates
+
+    keys = heads.astype(np.int64) * n + tails
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    last = np.empty(len(first), dtype=np.int64)
+    last[inverse.reshape(-1)] = np.arange(len(keys))
+    order = np.lexsort((first, heads[first]))
+    first, last = first[order], last[order]
+
+    indptr = np.zeros(n + 1, dtype=OFFSET_DTYPE)
+    np.cumsum(np.bincount(heads[first], minlength=n), out=indptr[1:])
+    return EdgeListGraph(CSRGraph(nodes, indptr, tails[first]), dates[last], node_dates)
+
+
+def remove_edge_anomalies(graph: EdgeListGraph):
+    """Returns `graph` without the edges citing a newer node, before building
+    any NetworkX graph.
+
+        Parameters
+        ----------
+        graph : EdgeListGraph
+
+
+        Returns
+        -------
+        graph : EdgeListGraph
+            The kept edges, with their pln_date.
+
+        edges_removed : int
+            The count `remove_anomalies` returns on the same graph.
+
+        removed : list
+            The removed edges as (source, target) labels.
+    """
+    csr, edge_ids, removed = remove_anomalies_array(graph.csr, graph.node_pln_date)
+    return EdgeListGraph(csr, graph.pln_date[edge_ids], graph.node_pln_date), len(removed), removed
+
+
+def remove_edge_cycles(graph: EdgeListGraph, method="scc", n_jobs=1):
+    """Returns `graph` without the edges closing cycles, working on its trimmed
+    core only.
+
+        Parameters
+        ----------
+        graph : EdgeListGraph
+
+        method : str, optional (default = 'scc')
+            'scc' runs `remove_cycles_scc`, and 'simple' runs `remove_cycles`,
+            as `simplify` followed by `remove_cycles` does, on a NetworkX
+            graph of the core. 'fas' runs `feedback_arc_set_array` on the
+            arrays of the core.
+
+        n_jobs : int, optional (default = 1)
+            Number of worker processes of `remove_cycles_scc`.
+
+
+        Returns
+        -------
+        graph : EdgeListGraph
+            The kept edges, with their pln_date.
+
+        removed : list
+            The removed edges as (source, target) labels.
+
+        Raises
+        ------
+        ValueError
+            If `method` is not among the supported options.
+    """
+    if method not in ("scc", "simple", "fas"):
+        raise ValueError(f"method not supported: {method}")
+    csr = graph.csr
+    alive = np.zeros(csr.number_of_nodes, dtype=bool)
+    alive[trim_array(csr)] = True
+    heads = edge_sources(csr)
+    if method == "fas":
+        core, core_edges = edge_subgraph(csr, alive[heads] & alive[csr.indices])
+        core, edge_ids = subgraph(core, np.flatnonzero(alive))
+        core_edges = core_edges[edge_ids]
+        removed = feedback_arc_set_array(core, graph.pln_date[core_edges])
+        return _without_edges(graph, core_edges[removed])
+    core_edges = np.flatnonzero(alive[heads] & alive[csr.indices])
+
+    # Node indices as labels, so the removed edges map back to edge indices. Nodes and
+    # edges are added in the order of `graph`, which decides the cycles found first.
+    core = nx.DiGraph()
+    core.add_nodes_from(np.flatnonzero(alive).tolist())
+    core.add_edges_from(
+        (u, v, {"pln_date": date, "edge": edge}) for u, v, date, edge in
+        zip(heads[core_edges].tolist(), csr.indices[core_edges].tolist(),
+            graph.pln_date[core_edges].tolist(), core_edges.tolist())
+    )
+    edge_ids = {(u, v): edge for u, v, edge in core.edges(data="edge")}
+    removed = remove_cycles_scc(core, n_jobs=n_jobs) if method == "scc" else remove_cycles(core)
+    return _without_edges(graph, np.array([edge_ids[edge] for edge in removed], dtype=np.int64))
+
+
+def _without_edges(graph: EdgeListGraph, edge_ids: np.ndarray):
+    """Returns `graph` without the edge indices `edge_ids`, and their labels."""
+    csr = graph.csr
+    keep = np.ones(csr.number_of_edges, dtype=bool)
+    keep[edge_ids] = False
+    sub, kept = edge_subgraph(csr, keep)
+    heads, tails = edge_sources(csr)[edge_ids], csr.indices[edge_ids]
+    labels = list(zip(node_labels(csr, heads), node_labels(csr, tails)))
+    return EdgeListGraph(sub, graph.pln_date[kept], graph.node_pln_date), labels
+
+
 def get_file(file_dir: str, file_name: str) -> str:
     """Returns the graph from a .csv loaded in a NetworkX graph.
 
@@ -0,0 +1,367 @@
+"""
+End-to-end Main Path Analysis pipeline with a checkpoint per stage.
+
+The stages are 'load', 'anomalies', 'cycles', 'splc' and 'main_path'. Each one
+writes its output to a directory keyed by the key of the previous stage and
+its own parameters, so running again with, e.g., another main path method
+reopens the checkpoints of the earlier stages instead of computing them.
+`run_windows` shares the first three stages, and replaces the last two with
+one main path per time window.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.algorithms.counting import linear_weights
+from src.algorithms.dag import add_artificial_source_sync_array, date_levels
+from src.algorithms.edge_weights import calculate_splc_array
+from src.algorithms.instrumentation import record, stage
+from src.algorithms.parallel import calculate_splc_parallel
+from src.algorithms.paths import main_path_array
+from src.algorithms.windows import window_main_paths
+from utils.loading import EdgeListGraph, remove_edge_anomalies, remove_edge_cycles
+from utils.snapshot import ensure_snapshot, open_snapshot, read_metadata, write_arrays, write_snapshot
+from utils.writing import write_columns, write_edge_list, write_main_paths
+
+__all__ = [
+    "STAGES",
+    "PipelineResult",
+    "WindowsResult",
+    "stage_key",
+    "run_pipeline",
+    "run_windows",
+    "main"
+]
+
+STAGES = ("load", "anomalies", "cycles", "splc", "main_path")
+
+
+class PipelineResult(NamedTuple):
+    """The outputs of `run_pipeline`.
+
+    `graph` is the DAG after cycle removal, `splc` the weight of each edge
+    index of the graph the SPLC ran on, which also holds the artificial
+    `source` and `sync` edges when they were added (see `graph_weights` in
+    `utils/writing.py`), and `path` the main path labels. `stages` maps every
+    stage to its key, whether it was reopened from a checkpoint, its wall
+    time in seconds and its own metadata, e.g., the number of removed edges.
+    """
+    graph: EdgeListGraph
+    splc: np.ndarray
+    path: list
+    stages: dict
+
+
+class WindowsResult(NamedTuple):
+    """The outputs of `run_windows`.
+
+    `graph` is the DAG after cycle removal, `windows` holds a `WindowPath`
+    for every window and `stages` is as in `PipelineResult`, with the
+    'windows' stage last.
+    """
+    graph: EdgeListGraph
+    windows: list
+    stages: dict
+
+
+def stage_key(parent_key: str, stage: str, parameters: dict) -> str:
+    """Returns the checkpoint key of `stage` given the key of the previous
+    stage and the parameters the stage depends on."""
+    digest = hashlib.sha256(json.dumps([parent_key, stage, parameters], sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+def _graph_stage(directory, key, compute):
+    """Returns the graph checkpointed under `key` and its metadata, running
+    `compute` and writing its result first when missing."""
+    path = os.path.join(directory, key)
+    metadata = read_metadata(path)
+    if metadata.get("key") == key:
+        return open_snapshot(path), metadata, True
+    graph, metadata = compute()
+    write_snapshot(graph, path, dict(metadata, key=key))
+    return open_snapshot(path), read_metadata(path), False
+
+
+def _array_stage(directory, key, compute):
+    """As `_graph_stage`, for a stage whose output is a single array."""
+    path = os.path.join(directory, key)
+    metadata = read_metadata(path)
+    if metadata.get("key") != key:
+        array, metadata = compute()
+        write_arrays(path, {"values": array}, dict(metadata, key=key, dtype=array.dtype.str))
+        metadata = read_metadata(path)
+        cached = False
+    else:
+        cached = True
+    file_name = os.path.join(path, "values.npy")
+    if metadata["dtype"] == np.dtype(object).str:
+        # Counts beyond int64 are Python ints, which cannot be memory-mapped.
+        return np.load(file_name, allow_pickle=True), metadata, cached
+    return np.load(file_name, mmap_mode="r"), metadata, cached
+
+
+def _remove_anomalies(graph: EdgeListGraph):
+    graph, count, _ = remove_edge_anomalies(graph)
+    return graph, {"removed": count}
+
+
+def _remove_cycles(graph: EdgeListGraph, method: str, n_jobs: int):
+    graph, removed = remove_edge_cycles(graph, method, n_jobs)
+    return graph, {"removed": len(removed)}
+
+
+def _weighted_graph(graph: EdgeListGraph, artificial: bool):
+    return add_artificial_source_sync_array(graph.csr) if artificial else graph.csr
+
+
+def _node_dates(graph: EdgeListGraph, csr) -> np.ndarray:
+    """Returns the pln_date of every node of `csr`, NaN for the artificial ones."""
+    extra = csr.number_of_nodes - graph.csr.number_of_nodes
+    return np.concatenate((graph.node_pln_date, np.full(extra, np.nan)))
+
+
+def _run_stage(directory, stages: dict, key: str, name: str, parameters: dict, compute,
+               checkpoint=_graph_stage):
+    """Runs the stage `name` from its checkpoint and records it in `stages`.
+    Returns its output and its key."""
+    start = time.perf_counter()
+    key = stage_key(key, name, parameters)
+    with stage(name):
+        output, metadata, cached = checkpoint(directory, name + "-" + key, compute)
+    stages[name] = dict(metadata, key=key, cached=cached, time=time.perf_counter() - start)
+    return output, key
+
+
+def _check_options(cycles: str, method: str):
+    if cycles not in ("scc", "simple", "fas", "none"):
+        raise ValueError(f"cycles method not supported: {cycles}")
+    if method not in ("longest", "shortest"):
+        raise ValueError(f"method not supported: {method}")
+
+
+def _run_dag_stages(file_path, cache_dir, anomalies: bool, cycles: str, n_jobs: int):
+    """Runs the 'load', 'anomalies' and 'cycles' stages. Returns the DAG, the
+    key of its last stage, the stages and the checkpoint directory."""
+    file_path = os.path.abspath(file_path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(file_path), ".snapshots")
+    directory = os.path.join(cache_dir, "stages")
+    stages = {}
+
+    start = time.perf_counter()
+    with stage("load"):
+        snapshot_path = ensure_snapshot(file_path, cache_dir)
+        graph, key = open_snapshot(snapshot_path), read_metadata(snapshot_path)["key"]
+    stages["load"] = {"key": key, "cached": None, "time": time.perf_counter() - start}
+
+    if anomalies:
+        graph, key = _run_stage(directory, stages, key, "anomalies", {},
+                                lambda: _remove_anomalies(graph))
+    if cycles != "none":
+        graph, key = _run_stage(directory, stages, key, "cycles", {"method": cycles},
+                                lambda: _remove_cycles(graph, cycles, n_jobs))
+    return graph, key, stages, directory
+
+
+def run_pipeline(file_path, cache_dir=None, anomalies=True, cycles="scc", n_jobs=1, artificial=True,
+                 overflow="exact", method="longest") -> PipelineResult:
+    """Runs the Main Path Analysis of a .csv edge list, reusing the checkpoints
+    of the stages whose inputs and parameters did not change.
+
+        Parameters
+        ----------
+        file_path : str
+            A .csv file with the `Source`, `Target` and `pln_date` columns.
+
+        cache_dir : str, optional
+            The directory holding the checkpoints. Defaults to `.snapshots`
+            next to the .csv file, as in `load_snapshot`.
+
+        anomalies : bool, optional (default = True)
+            Whether to drop the edges citing a newer node, as
+            `remove_edge_anomalies`.
+
+        cycles : str, optional (default = 'scc')
+            The method of `remove_edge_cycles`, or 'none' for files known to
+            be acyclic.
+
+        n_jobs : int, optional (default = 1)
+            Number of worker processes of the cycle removal and of the SPLC,
+            which solves the weakly connected components in parallel when
+            `n_jobs` is not 1. The results do not depend on it.
+
+        artificial : bool, optional (default = True)
+            Whether to add the artificial `source` and `sync` nodes before
+            calculating SPLC, as `add_artificial_source_sync`. The main path
+            then runs from `source`.
+
+        overflow : str, optional (default = 'exact')
+            The overflow mode of `calculate_splc_array`. The main path is
+            the one of the counts in every mode, see `linear_weights`.
+
+        method : str, optional (default = 'longest')
+            The method of `main_path_array`.
+
+        Returns
+        -------
+        PipelineResult
+
+        Raises
+        ------
+        ValueError
+            If `cycles` or `method` is not among the supported options.
+    """
+    _check_options(cycles, method)
+    graph, key, stages, directory = _run_dag_stages(file_path, cache_dir, anomalies, cycles, n_jobs)
+    csr = _weighted_graph(graph, artificial)
+    levels = None
+
+    def shared_levels():
+        # Computed once from the dates, and only if a stage is not checkpointed.
+        nonlocal levels
+        if levels is None:
+            levels = date_levels(csr, _node_dates(graph, csr))
+        return levels
+
+    def splc_stage():
+        if n_jobs != 1:
+            # The components get their own artificial nodes, with the same weights.
+            return calculate_splc_parallel(graph.csr, None, n_jobs, overflow, csr is not graph.csr), {}
+        return calculate_splc_array(csr, None, shared_levels(), overflow), {}
+
+    # `n_jobs` is not a parameter of the stage, since the weights do not depend on it.
+    parameters = {"artificial": artificial, "overflow": overflow}
+    splc, key = _run_stage(directory, stages, key, "splc", parameters, splc_stage, _array_stage)
+
+    source = csr.number_of_nodes - 2 if artificial and csr is not graph.csr else None
+    # The log weights are turned back into counts, since their sums would rank the products.
+    weights = linear_weights(splc, overflow)
+    path, key = _run_stage(directory, stages, key, "main_path", {"method": method},
+                           lambda: (main_path_array(csr, weights, shared_levels(), method, source), {}),
+                           _array_stage)
+    labels = [str(label) for label in np.asarray(csr.nodes)[np.asarray(path)].tolist()]
+    return PipelineResult(graph, splc, labels, stages)
+
+
+def run_windows(file_path, ends=None, width=None, cache_dir=None, anomalies=True, cycles="scc", n_jobs=1,
+                artificial=True, overflow="exact", method="longest") -> WindowsResult:
+    """Runs the Main Path Analysis of every time window of a .csv edge list,
+    sharing the anomaly and cycle removal of the whole file.
+
+        Parameters
+        ----------
+        file_path : str
+            A .csv file with the `Source`, `Target` and `pln_date` columns.
+
+        ends : iterable, optional
+            The last `pln_date` of every window. Defaults to every date of
+            the edges after the cycle removal.
+
+        width : float, optional
+            The length of the windows, see `window_main_paths`. By default,
+            every window starts at the oldest edge.
+
+        Other parameters are as in `run_pipeline`.
+
+        Returns
+        -------
+        WindowsResult
+
+        Raises
+        ------
+        ValueError
+            If `cycles` or `method` is not among the supported options.
+
+        Notes
+        -----
+        Anomalies and cycles are removed from the whole file, so an edge
+        citing a node from a later window is an anomaly in every window.
+        The windows are not checkpointed.
+    """
+    _check_options(cycles, method)
+    graph, _, stages, _ = _run_dag_stages(file_path, cache_dir, anomalies, cycles, n_jobs)
+    dates = np.asarray(graph.pln_date, dtype=np.float64)
+    if ends is None:
+        ends = np.unique(dates[~np.isnan(dates)])
+
+    start = time.perf_counter()
+    with stage("windows"):
+        levels = date_levels(graph.csr, graph.node_pln_date)
+        windows = window_main_paths(graph.csr, dates, ends, width, levels, artificial, overflow, method)
+    stages["windows"] = {"key": None, "cached": False, "time": time.perf_counter() - start,
+                         "windows": len(windows)}
+    return WindowsResult(graph, windows, stages)
+
+
+def main(argv=None):
+    """Runs `run_pipeline`, or `run_windows` with `--windows`, from the command
+    line and prints the main path of the file or of every window."""
+    parser = argparse.ArgumentParser(description="Main Path Analysis of a citation edge list.")
+    parser.add_argument("file", help=".csv file with the Source, Target and pln_date columns")
+    parser.add_argument("--cache-dir", help="checkpoint directory (default: .snapshots next to file)")
+    parser.add_argument("--keep-anomalies", action="store_true", help="skip the anomaly removal")
+    parser.add_argument("--cycles", choices=("scc", "simple", "fas", "none"), default="scc")
+    parser.add_argument("--jobs", type=int, default=1, help="cycle removal and SPLC worker processes")
+    parser.add_argument("--no-artificial", action="store_true",
+                        help="do not add the artificial source and sync nodes")
+    parser.add_argument("--overflow", choices=("exact", "log", "raise"), default="exact")
+    parser.add_argument("--method", choices=("longest", "shortest"), default="longest")
+    parser.add_argument("--windows", action="store_true",
+                        help="one main path for every pln_date, from the edges up to it")
+    parser.add_argument("--window-width", type=float,
+                        help="with --windows, only the edges of the last WINDOW_WIDTH dates")
+    parser.add_argument("--output", help="file to write the main path to, one line per window")
+    parser.add_argument("--export", help="file to write the DAG with its SPLC to: .csv, .csv.gz, or "
+                                         "a new directory of binary columns otherwise")
+    parser.add_argument("--metrics", help="file to write the per-stage time, memory and counters to, "
+                                          "as JSON")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also record the peak Python allocations of each stage, slower")
+    args = parser.parse_args(argv)
+
+    options = dict(cache_dir=args.cache_dir, anomalies=not args.keep_anomalies, cycles=args.cycles,
+                   n_jobs=args.jobs, artificial=not args.no_artificial, overflow=args.overflow,
+                   method=args.method)
+    with record(args.trace_memory) as recorder:
+        if args.windows:
+            result = run_windows(args.file, width=args.window_width, **options)
+        else:
+            result = run_pipeline(args.file, **options)
+    if args.metrics:
+        recorder.to_json(args.metrics)
+    for stage, info in result.stages.items():
+        status = {None: "snapshot", True: "checkpoint", False: "computed"}[info["cached"]]
+        removed = " ({} edges removed)".format(info["removed"]) if "removed" in info else ""
+        print("{:<10} {:<10} {:8.3f}s{}".format(stage, status, info["time"], removed))
+    if args.windows:
+        for window in result.windows:
+            print("{:g}:".format(window.end), " -> ".join(window.path))
+        paths, keys = [window.path for window in result.windows], \
+            ["{:g}".format(window.end) for window in result.windows]
+    else:
+        print(*result.path, sep=" -> ")
+        paths, keys = [result.path], None
+    if args.output:
+        write_main_paths(args.output, paths, keys)
+    if args.export:
+        # The windows have no SPLC of the whole DAG, so only its edges are written.
+        splc = None if args.windows else result.splc
+        if args.export.endswith((".csv", ".csv.gz")):
+            write_edge_list(args.export, result.graph, splc)
+        else:
+            main_path = None if args.windows else result.path
+            write_columns(args.export, result.graph, splc, main_path=main_path, overflow=args.overflow)
+    return result
+
+
+if __name__ == "__main__":
+    main()
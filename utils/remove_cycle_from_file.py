@@ -1,40 +1,30 @@
 # main.py
 
+import argparse
 import os
 import sys
 import time
 import datetime
 
-import networkx as nx
-import pandas as pd
-
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 local_path = os.path.abspath(os.path.dirname(__file__))
 
 if __name__ == "__main__":
     local_path = os.path.join(local_path, "../benchmarks/data/input/")
-    from src.algorithms.dag import remove_cycles, simplify
-    n_files = len(sys.argv)
-    for i in range(1, n_files):
-        file_name = sys.argv[i]
+    from utils.loading import load_edge_list, remove_edge_cycles
+    from utils.writing import write_edge_list
+    parser = argparse.ArgumentParser(description="Remove the cycles of edge lists in benchmarks/data/input.")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--method", choices=("simple", "scc", "fas"), default="simple",
+                        help="the cycle removal of remove_edge_cycles")
+    args = parser.parse_args()
+    for file_name in args.files:
         file_path = os.path.join(local_path, file_name)
-        data = pd.read_csv(file_path)
-        G = nx.from_pandas_edgelist(
-            data,
-            source='Source',
-            target='Target',
-            create_using=nx.DiGraph(),
-            edge_attr="pln_date"
-        )
+        graph = load_edge_list(file_path)
         start = time.process_time()
-        H = simplify(G)
-        edges_to_remove = remove_cycles(H)
-        G.remove_edges_from(edges_to_remove)
+        graph, _ = remove_edge_cycles(graph, args.method)
         end = time.process_time() - start
         print("\nRunning time of {}: \t {}".format(file_name, str(datetime.timedelta(seconds=end))))
-        fh = open(file_path.replace("with", "without"), "wb")
-        header = str.encode("Source,Target,pln_date\n")
-        fh.write(header)
-        nx.write_edgelist(G, fh, data=["pln_date"], delimiter=',')
+        write_edge_list(file_path.replace("with", "without"), graph)
 
 
@@ -0,0 +1,217 @@
+"""
+Binary snapshots of loaded edge lists, reopened memory-mapped.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.algorithms.csr import CSRGraph
+from utils.loading import EdgeListGraph, load_edge_list
+
+__all__ = [
+    "file_hash",
+    "write_arrays",
+    "write_snapshot",
+    "open_snapshot",
+    "read_metadata",
+    "ensure_snapshot",
+    "load_snapshot"
+]
+
+SNAPSHOT_VERSION = 1
+ARRAYS = ("nodes", "indptr", "indices", "pln_date", "node_pln_date")
+
+
+def file_hash(file_path, block_size=2 ** 20) -> str:
+    """Returns the SHA-256 hex digest of the file content.
+
+        Parameters
+        ----------
+        file_path : str
+
+        block_size : int, optional
+            The number of bytes read at a time.
+
+        Returns
+        -------
+        str
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_arrays(path, arrays: dict, metadata=None):
+    """Writes `arrays` to the directory `path`, one .npy file per array.
+
+        Parameters
+        ----------
+        path : str
+            The directory to create. It is written next to it and renamed
+            at the end, so a reader never sees a partial directory.
+
+        arrays : dict
+            Maps a file name, without extension, to an array.
+
+        metadata : dict, optional
+            JSON serializable data stored along the arrays, in `meta.json`.
+
+        Returns
+        -------
+        None
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".staging-")
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, name + ".npy"), array)
+        with open(os.path.join(staging, "meta.json"), "w") as fh:
+            json.dump(dict(metadata or {}, version=SNAPSHOT_VERSION), fh)
+        os.rename(staging, path)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        # Another process may have written the same directory first.
+        if not os.path.isdir(path):
+            raise
+
+
+def write_snapshot(graph: EdgeListGraph, snapshot_path, metadata=None):
+    """Writes `graph` to the directory `snapshot_path` with `write_arrays`.
+
+        Parameters
+        ----------
+        graph : EdgeListGraph
+
+        snapshot_path : str
+
+        metadata : dict, optional
+            JSON serializable data stored along the arrays.
+
+        Returns
+        -------
+        None
+    """
+    arrays = (np.array(graph.csr.nodes, dtype=str), graph.csr.indptr, graph.csr.indices,
+              graph.pln_date, graph.node_pln_date)
+    write_arrays(snapshot_path, dict(zip(ARRAYS, arrays)), metadata)
+
+
+def open_snapshot(snapshot_path) -> EdgeListGraph:
+    """Returns the graph stored in `snapshot_path` with its arrays memory-mapped.
+
+        Parameters
+        ----------
+        snapshot_path : str
+            A directory written by `write_snapshot`.
+
+        Returns
+        -------
+        EdgeListGraph
+            Its arrays are read-only views of the files, so opening costs no
+            parsing and processes opening the same snapshot share its pages.
+    """
+    nodes, indptr, indices, pln_date, node_pln_date = (
+        np.load(os.path.join(snapshot_path, name + ".npy"), mmap_mode="r") for name in ARRAYS
+    )
+    return EdgeListGraph(CSRGraph(nodes, indptr, indices), pln_date, node_pln_date)
+
+
+def read_metadata(snapshot_path) -> dict:
+    """Returns the metadata written along the arrays of `snapshot_path`, or an
+    empty dict if it cannot be read."""
+    try:
+        with open(os.path.join(snapshot_path, "meta.json")) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def ensure_snapshot(file_path, cache_dir=None, source="Source", target="Target", date="pln_date"):
+    """Returns the snapshot directory of a .csv edge list, writing it if needed.
+
+        Parameters
+        ----------
+        file_path : str
+            A string with the absolute path of the .csv file.
+
+        cache_dir : str, optional
+            The directory holding the snapshots. Defaults to `.snapshots`
+            next to the .csv file.
+
+        source : str, optional (default = 'Source')
+
+        target : str, optional (default = 'Target')
+
+        date : str, optional (default = 'pln_date')
+            The columns read by `load_edge_list`.
+
+        Returns
+        -------
+        str
+            The snapshot directory. Its metadata holds the `key` that
+            identifies the content of the file and the columns.
+
+        Notes
+        -----
+        Snapshots are keyed by the SHA-256 of the file content and the column
+        names, so an edited file never reuses a stale snapshot, and the old
+        snapshots of the same file and columns are deleted when a new one is
+        written. The size
+        and modification time of the file are stored along the key: while
+        they match, the file is not hashed again.
+    """
+    file_path = os.path.abspath(file_path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(file_path), ".snapshots")
+    stat = os.stat(file_path)
+    stamp = {"source": file_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+             "columns": [source, target, date]}
+    prefix = os.path.basename(file_path) + "-"
+    existing = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+                if name.startswith(prefix)] if os.path.isdir(cache_dir) else []
+
+    for snapshot_path in existing:
+        metadata = read_metadata(snapshot_path)
+        if metadata.get("version") == SNAPSHOT_VERSION \
+                and all(metadata.get(name) == value for name, value in stamp.items()):
+            return snapshot_path
+
+    digest = hashlib.sha256(file_hash(file_path).encode())
+    digest.update(json.dumps(stamp["columns"]).encode())
+    key = digest.hexdigest()[:32]
+    snapshot_path = os.path.join(cache_dir, prefix + key)
+    if snapshot_path in existing and read_metadata(snapshot_path).get("version") == SNAPSHOT_VERSION:
+        # Same content under a new stamp, e.g., the file was touched or copied.
+        with open(os.path.join(snapshot_path, "meta.json"), "w") as fh:
+            json.dump(dict(stamp, key=key, version=SNAPSHOT_VERSION), fh)
+        return snapshot_path
+
+    for stale in existing:
+        metadata = read_metadata(stale)
+        if metadata.get("source") == file_path and metadata.get("columns") == stamp["columns"]:
+            shutil.rmtree(stale, ignore_errors=True)
+    graph = load_edge_list(file_path, source, target, date)
+    write_snapshot(graph, snapshot_path, dict(stamp, key=key))
+    return snapshot_path
+
+
+def load_snapshot(file_path, cache_dir=None, source="Source", target="Target", date="pln_date"):
+    """Returns the graph from a .csv edge list, through a snapshot cache.
+
+        Parameters
+        ----------
+        See `ensure_snapshot`.
+
+        Returns
+        -------
+        EdgeListGraph
+            Memory-mapped, as returned by `open_snapshot`.
+    """
+    return open_snapshot(ensure_snapshot(file_path, cache_dir, source, target, date))